@@ -1,8 +1,10 @@
 import streamlit as st
 import os
-import pandas as pd
-from config.models_config import MODELS_DB
+from config.models_config import CATALOG
 from modules.utils import load_local_llm, HAS_LOCAL_LIB, HAS_MISTRAL_LIB
+from modules.fake_backend import is_synthetic
+from modules.carbon import DEFAULT_CARBON_DB, load_carbon_index, source_signature
+from modules.cascade import AUTO_FAMILY, AUTO_VARIANT, build_auto_config, release_tiers
 import modules.views as views 
 
 # --- CONFIGURATION PAGE ---
@@ -38,73 +40,17 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- CHARGEMENT DATA CARBONE (ROBUSTE & MISE À JOUR) ---
-@st.cache_data(ttl=3600)
-def load_carbon_data():
-    csv_path = os.path.join("data", "carbon-intensity-electricity", "carbon-intensity-electricity.csv")
-    
-    # Données par défaut (Fallback)
-    default_data = {"France": {"val": 56, "year": 2023, "code": "FRA"}}
-    
-    if not os.path.exists(csv_path):
-        return default_data, ["France"]
-
-    try:
-        df = pd.read_csv(csv_path)
-        
-        # 1. Détection dynamique de la colonne Intensité
-        # On définit les candidats connus (nouveau format API vs ancien format CSV manuel)
-        known_columns = [
-            "co2_intensity__gco2_kwh",                  # Nouveau format API
-            "Carbon intensity of electricity - gCO2/kWh" # Ancien format
-        ]
-        
-        # On cherche d'abord une correspondance exacte
-        intensity_col = next((c for c in known_columns if c in df.columns), None)
-        
-        # Sinon, recherche plus large (insensible à la casse) contenant "gco2" ou "intensity"
-        if not intensity_col:
-            intensity_col = next((c for c in df.columns if "gco2" in c.lower() or "intensity" in c.lower()), None)
-        
-        if not intensity_col:
-            st.warning("⚠️ Colonne intensité introuvable. Utilisation des données par défaut.")
-            return default_data, ["France"]
-
-        # 2. Renommage normalisé pour la suite du script
-        # On renomme 'Entity' en 'Country' si présent, sinon on suppose que c'est déjà bon
-        if "Entity" in df.columns:
-            df = df.rename(columns={"Entity": "Country"})
-            
-        df = df.rename(columns={intensity_col: "Intensity"})
-        
-        # 3. Filtrage : On ne garde que la dernière année disponible pour chaque pays
-        if "Year" in df.columns:
-            df_sorted = df.sort_values(by="Year", ascending=False)
-            df_latest = df_sorted.drop_duplicates(subset=["Country"])
-        else:
-            df_latest = df # Si pas d'année, on prend tel quel
-            
-        df_final = df_latest.sort_values(by="Country")
-        
-        # 4. Construction du dictionnaire
-        carbon_db = {}
-        for _, row in df_final.iterrows():
-            code = row["Code"] if "Code" in row and pd.notna(row["Code"]) else ""
-            year = int(row["Year"]) if "Year" in row else 2024
-            
-            carbon_db[row["Country"]] = {
-                "val": row["Intensity"],
-                "year": year,
-                "code": code
-            }
-            
-        return carbon_db, list(carbon_db.keys())
-        
-    except Exception as e:
-        st.error(f"Erreur lecture CSV Carbone : {e}")
-        return default_data, ["France"]
+# --- CHARGEMENT DATA CARBONE (INDEX COMPACT, RECOMPILÉ SI LE CSV CHANGE) ---
+@st.cache_resource(show_spinner=False)
+def load_carbon_data(source_sig):
+    """Index pays → intensité, partagé entre sessions ; la signature du CSV invalide le cache."""
+    return load_carbon_index()
 
-CARBON_DB, SORTED_COUNTRIES = load_carbon_data()
+try:
+    CARBON_DB, SORTED_COUNTRIES = load_carbon_data(tuple(source_signature() or ()))
+except Exception as e:
+    st.error(f"Erreur lecture données Carbone : {e}")
+    CARBON_DB, SORTED_COUNTRIES = dict(DEFAULT_CARBON_DB), list(DEFAULT_CARBON_DB)
 
 # --- SIDEBAR & SETUP ---
 with st.sidebar:
@@ -118,15 +64,19 @@ with st.sidebar:
     st.header("⚙️ Moteur IA")
     
     # Sélecteurs de Modèles
-    fam_list = list(MODELS_DB.keys())
+    fam_list = CATALOG.families()
     if not fam_list:
         st.error("Aucun modèle configuré.")
         st.stop()
         
-    selected_family = st.selectbox("Famille", fam_list)
-    available_variants = list(MODELS_DB[selected_family].keys())
-    selected_variant = st.selectbox("Version", available_variants)
-    current_config = MODELS_DB[selected_family][selected_variant]
+    selected_family = st.selectbox("Famille", fam_list + [AUTO_FAMILY])
+    if selected_family == AUTO_FAMILY:
+        selected_variant = st.selectbox("Version", [AUTO_VARIANT])
+        current_config = build_auto_config()
+    else:
+        available_variants = CATALOG.variants(selected_family)
+        selected_variant = st.selectbox("Version", available_variants)
+        current_config = CATALOG.get(selected_family, selected_variant).conf
 
     # Gestion API Key
     api_key = None
@@ -134,6 +84,11 @@ with st.sidebar:
         st.info("☁️ **Mode Cloud**")
         api_key = st.text_input("Clé API Mistral", value=os.getenv("MISTRAL_API_KEY", ""), type="password")
         if not HAS_MISTRAL_LIB: st.error("Manque: `mistralai`")
+
+    if current_config["type"] == "cascade":
+        st.info("🔀 **Cascade** : " + (current_config["info"]["desc"] or "aucun niveau disponible"))
+        st.caption("Escalade vers le niveau suivant si JSON invalide ou log-prob moyenne trop basse.")
+        api_key = st.text_input("Clé API Mistral (dernier niveau, optionnelle)", value=os.getenv("MISTRAL_API_KEY", ""), type="password")
     
     if current_config["type"] == "local":
         st.caption(f"📁 `{os.path.basename(current_config['file'])}`")
@@ -147,16 +102,30 @@ with st.sidebar:
 
 # --- CHARGEMENT DU MOTEUR (LOCAL) ---
 llm_local = None
-if current_config["type"] == "local" and HAS_LOCAL_LIB:
+if current_config["type"] == "cascade" and st.session_state.get("loaded_model_name"):
+    # Le mode Auto charge ses propres niveaux : on libère le modèle manuel
+    load_local_llm.clear()
+    st.session_state.loaded_model_name = None
+if current_config["type"] == "cascade":
+    st.session_state.cascade_active = True
+elif st.session_state.get("cascade_active"):
+    # Sortie du mode Auto : les niveaux (logits_all) libèrent leur RAM avant le chargement manuel
+    release_tiers()
+    st.session_state.cascade_active = False
+if current_config["type"] == "local" and (HAS_LOCAL_LIB or is_synthetic(current_config)):
     if "loaded_model_name" not in st.session_state: st.session_state.loaded_model_name = None
     
     if st.session_state.loaded_model_name != selected_variant:
-        st.cache_resource.clear()
+        # On ne libère que le modèle (les caches de réponses / index restent en mémoire)
+        load_local_llm.clear()
         st.session_state.loaded_model_name = selected_variant
         st.toast(f"Chargement : {selected_variant}", icon="🔄")
     
     try:
-        llm_local = load_local_llm(current_config["file"], current_config["ctx"])
+        llm_local = load_local_llm(
+            current_config["file"], current_config["ctx"],
+            backend=current_config.get("backend", "llama_cpp"), options=current_config.get("synthetic")
+        )
         st.sidebar.success(f"✅ Prêt : {selected_variant}")
     except Exception as e:
         st.error(f"🚨 Erreur Chargement : {e}")
@@ -168,84 +137,119 @@ st.title("🧪 Wavestone Local AI Workbench")
 
 main_col, param_col = st.columns([7, 2], gap="small") # Ratio ajusté pour donner plus de place au contenu
 
-# --- COLONNE DROITE : RÉGLAGES (ULTRA-COMPACTS) ---
-with param_col:
+# --- FRAGMENTS : chaque panneau a son propre périmètre de rerun ---
+# Un réglage modifié ne relance que son panneau (pas le CSS, la sidebar, le chargement du modèle
+# ni l'onglet ouvert). Les valeurs sont lues dans st.session_state au moment de générer.
+DEFAULT_COUNTRY = "France" # Datacenter Mistral ou usage local standard
+
+@st.fragment
+def render_inference_panel():
     # On utilise des st.columns à l'intérieur pour gagner de la place verticale
     with st.container(border=True):
         st.markdown("##### 🎛️ Inférence")
         c1, c2 = st.columns(2)
         with c1:
-            temp = st.number_input("Temperature", 0.0, 1.5, 0.7, 0.1)
-            top_k = st.number_input("Top K", 0, 100, 40, 5)
+            st.number_input("Temperature", 0.0, 1.5, 0.7, 0.1, key="p_temperature")
+            st.number_input("Top K", 0, 100, 40, 5, key="p_top_k")
+            st.number_input("Seed", -1, 2**31 - 1, -1, 1, key="p_seed", help="-1 = aléatoire. Seed fixe ou température 0 : réponse cachable.")
         with c2:
-            top_p = st.number_input("Top P", 0.0, 1.0, 0.9, 0.05)
-            max_tokens_ui = st.number_input("Max Tokens", 128, 8192, 1024, 256)
-
+            st.number_input("Top P", 0.0, 1.0, 0.9, 0.05, key="p_top_p")
+            st.number_input("Max Tokens", 128, 8192, 1024, 256, key="p_max_tokens")
+            st.checkbox("♻️ Cache", value=True, key="use_response_cache", help="Rejoue les réponses déterministes déjà calculées (0 Wh).")
+
+def current_carbon_intensity():
+    """Intensité (gCO₂e/kWh) du pays choisi dans le panneau Green IT, ou valeur manuelle."""
+    country = st.session_state.get("carbon_country", DEFAULT_COUNTRY)
+    if country == "Personnalisé" or country not in CARBON_DB:
+        return st.session_state.get("carbon_custom", 475.0)
+    return CARBON_DB[country]["val"]
+
+@st.fragment
+def render_green_panel(model_type):
     with st.container(border=True):
         st.markdown("##### 🌱 Green IT")
         
         # 1. Logique de pré-sélection
-        # Par défaut, on cible la France (Datacenter Mistral ou usage local standard)
-        target_default = "France"
-        
         # On récupère l'index correspondant dans la liste (+1 car l'index 0 est 'Personnalisé')
-        default_index = SORTED_COUNTRIES.index(target_default) + 1 if target_default in SORTED_COUNTRIES else 0
+        default_index = SORTED_COUNTRIES.index(DEFAULT_COUNTRY) + 1 if DEFAULT_COUNTRY in SORTED_COUNTRIES else 0
         
         # 2. Menu déroulant (Toujours actif, modifiable par l'utilisateur)
         country_choice = st.selectbox(
             "Pays (Mix Électrique)", 
             ["Personnalisé"] + SORTED_COUNTRIES,
             index=default_index,
+            key="carbon_country",
             label_visibility="collapsed"
         )
         
         # 3. Affichage et Récupération de la valeur
         if country_choice == "Personnalisé":
-            carbon_intensity = st.number_input("gCO₂e/kWh", 0.0, 1000.0, 475.0)
+            st.number_input("gCO₂e/kWh", 0.0, 1000.0, 475.0, key="carbon_custom")
             st.caption("Valeur manuelle.")
         else:
             data_c = CARBON_DB[country_choice]
-            carbon_intensity = data_c["val"]
             # Affichage compact
             c_info1, c_info2 = st.columns([1, 1])
-            c_info1.metric("Intensité", f"{carbon_intensity:.0f} g")
+            c_info1.metric("Intensité", f"{data_c['val']:.0f} g")
             c_info2.caption(f"📅 {data_c['year']}\nSource: OWID")
         
         # 4. Feedback contextuel
-        if current_config["type"] == "api":
-            if country_choice == "France":
+        if model_type == "api":
+            if country_choice == DEFAULT_COUNTRY:
                 st.caption("ℹ️ *Datacenter Mistral (France) par défaut.*")
             else:
                 st.caption(f"ℹ️ *Simulation : API Mistral hébergée en {country_choice}.*")
             
         st.caption("[Ember (2025); Energy Institute - Statistical Review of World Energy (2025)](https://ourworldindata.org/electricity-mix)")
 
-# --- COLONNE GAUCHE : NAVIGATION ---
-with main_col:
-    # Menu de navigation
-    tabs_labels = ["🏢 Ops", "🤖 IoT", "📝 Synthèse", "🌐 Traduction", "💻 Code", "🧠 Logique", "💬 Chat", "ℹ️ Documentation", "⚙️ Config"]
-    selected_tab = st.radio("Nav", tabs_labels, horizontal=True, label_visibility="collapsed", key="nav")
-    st.markdown("---")
-
-    gen_kwargs = {
+def build_gen_kwargs():
+    """Paramètres de génération lus au moment de l'appel (les panneaux de réglages sont des fragments)."""
+    ss = st.session_state
+    seed = ss.get("p_seed", -1)
+    return {
         "model_type": current_config["type"],
         "model_conf": current_config,
         "llm_local": llm_local,
         "api_key": api_key,
-        "temperature": temp,
-        "max_tokens": max_tokens_ui,
-        "top_p": top_p,
-        "top_k": top_k,
-        "carbon_intensity": carbon_intensity
+        "temperature": ss.get("p_temperature", 0.7),
+        "max_tokens": ss.get("p_max_tokens", 1024),
+        "top_p": ss.get("p_top_p", 0.9),
+        "top_k": ss.get("p_top_k", 40),
+        "carbon_intensity": current_carbon_intensity(),
+        "seed": None if seed < 0 else int(seed)
     }
 
+TABS_LABELS = ["🏢 Ops", "🤖 IoT", "📝 Synthèse", "🌐 Traduction", "💻 Code", "🧠 Logique", "💬 Chat", "ℹ️ Documentation", "⚙️ Config"]
+
+@st.fragment
+def render_tab_area(selected_tab):
+    # Saisies, garde-fou de contexte et résultats ne relancent que l'onglet courant
+    gen_kwargs = build_gen_kwargs()
+
     # ROUTING
-    if selected_tab == tabs_labels[0]:   views.render_ops_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[1]: views.render_iot_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[2]: views.render_rag_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[3]: views.render_translation_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[4]: views.render_code_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[5]: views.render_logic_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[6]: views.render_chat_tab(gen_kwargs)
-    elif selected_tab == tabs_labels[7]: views.render_doc_tab(MODELS_DB)
-    elif selected_tab == tabs_labels[8]: views.render_config_tab(MODELS_DB)
\ No newline at end of file
+    if selected_tab == TABS_LABELS[0]:   views.render_ops_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[1]: views.render_iot_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[2]: views.render_rag_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[3]: views.render_translation_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[4]: views.render_code_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[5]: views.render_logic_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[6]: views.render_chat_tab(gen_kwargs)
+    elif selected_tab == TABS_LABELS[7]: views.render_doc_tab(CATALOG)
+    elif selected_tab == TABS_LABELS[8]: views.render_config_tab(CATALOG)
+
+# --- COLONNE DROITE : RÉGLAGES (ULTRA-COMPACTS) ---
+with param_col:
+    render_inference_panel()
+    render_green_panel(current_config["type"])
+    # Rempli après l'onglet : le journal inclut l'inférence lancée pendant ce run
+    whatif_slot = st.container()
+
+# --- COLONNE GAUCHE : NAVIGATION ---
+with main_col:
+    # Menu de navigation
+    selected_tab = st.radio("Nav", TABS_LABELS, horizontal=True, label_visibility="collapsed", key="nav")
+    st.markdown("---")
+    render_tab_area(selected_tab)
+
+with whatif_slot:
+    views.render_carbon_whatif(CARBON_DB)
@@ -0,0 +1,130 @@
+"""
+Benchmark hors-ligne de la branche API (`run_completion(model_type="api")`) contre le serveur
+local imitant Mistral (scripts/mock_mistral_server.py).
+
+Scénarios :
+1. Client neuf à chaque requête (comportement historique) : coût connexion + TLS à chaque appel.
+2. Client mutualisé via `run_completion`, requêtes séquentielles.
+3. Client mutualisé, requêtes concurrentes (lots, comparaisons).
+4. Idem avec erreurs injectées (429) : reprises avec backoff.
+
+Usage :
+    python benchmarks/bench_api.py --requests 40 --concurrency 8
+    python benchmarks/bench_api.py --url http://127.0.0.1:8089   (serveur déjà lancé)
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scripts.mock_mistral_server import start_server
+
+MODEL_CONF = {"type": "api", "api_id": "mock-small"}
+MESSAGES = [{"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "Explique l'intérêt des petits modèles de langage en entreprise."}]
+
+
+def percentile(values, q):
+    if not values: return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def summarize(name, results, wall_s):
+    ok = [r for r in results if not r["error"]]
+    ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+    lat = [r["duration"] for r in ok]
+    tokens = sum(r["output_tokens"] for r in ok)
+    return {
+        "Scénario": name, "Requêtes": len(results), "OK": len(ok),
+        "TTFT p50 (ms)": 1000 * percentile(ttfts, 0.5), "TTFT p95 (ms)": 1000 * percentile(ttfts, 0.95),
+        "Latence p50 (s)": percentile(lat, 0.5), "Latence p95 (s)": percentile(lat, 0.95),
+        "Débit (req/s)": len(ok) / wall_s, "Débit (tok/s)": tokens / wall_s,
+    }
+
+
+def run_fresh_client(url, n):
+    """Référence : un client Mistral créé pour chaque requête (synchrone)."""
+    from mistralai import Mistral
+    results = []
+    for _ in range(n):
+        res = {"error": None, "ttft": None, "duration": 0.0, "output_tokens": 0}
+        t0 = time.time()
+        try:
+            client = Mistral(api_key="mock", server_url=url)
+            for chunk in client.chat.stream(model=MODEL_CONF["api_id"], messages=MESSAGES, max_tokens=64):
+                if chunk.data.choices and chunk.data.choices[0].delta.content:
+                    if res["ttft"] is None: res["ttft"] = time.time() - t0
+                    res["output_tokens"] += 1
+        except Exception as e:
+            res["error"] = str(e)
+        res["duration"] = time.time() - t0
+        results.append(res)
+    return results
+
+
+def run_pooled(n, concurrency, max_tokens=64):
+    from modules.utils import run_completion
+    call = lambda _: run_completion("api", MODEL_CONF, None, "mock", MESSAGES, max_tokens=max_tokens, track_energy=False)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(call, range(n)))
+
+
+def timed(fn, *args):
+    t0 = time.time()
+    out = fn(*args)
+    return out, time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la branche API contre le serveur Mistral local.")
+    parser.add_argument("--url", help="Serveur déjà lancé (sinon démarré dans ce processus)")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tps", type=float, default=200.0, help="Débit simulé du serveur (tokens/s)")
+    parser.add_argument("--ttft", type=float, default=0.05, help="TTFT simulé du serveur (s)")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Taux de 429 du scénario 4")
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        _, url, _ = start_server(tps=args.tps, ttft=args.ttft)
+    # Le client mutualisé lit MISTRAL_SERVER_URL à l'import de la configuration
+    os.environ["MISTRAL_SERVER_URL"] = url
+
+    from modules.api_client import HAS_MISTRAL_LIB, get_api_pool
+    if not HAS_MISTRAL_LIB:
+        sys.exit("❌ Librairie `mistralai` manquante (pip install -r requirements.txt).")
+
+    print(f"🧪 Serveur : {url} | {args.requests} requêtes | concurrence {args.concurrency}\n")
+    rows = []
+    res, wall = timed(run_fresh_client, url, args.requests)
+    rows.append(summarize("1. Client neuf / requête", res, wall))
+    res, wall = timed(run_pooled, args.requests, 1)
+    rows.append(summarize("2. Pool, séquentiel", res, wall))
+    res, wall = timed(run_pooled, args.requests, args.concurrency)
+    rows.append(summarize(f"3. Pool, x{args.concurrency} concurrent", res, wall))
+
+    if not args.url:
+        _, err_url, err_state = start_server(tps=args.tps, ttft=args.ttft, error_rate=args.error_rate, retry_after=0.1)
+        get_api_pool().server_url = err_url  # Nouveau client (clé distincte) pointant vers le serveur à erreurs
+        from modules.utils import run_completion
+        call = lambda _: run_completion("api", MODEL_CONF, None, "mock-errors", MESSAGES, max_tokens=64, track_energy=False)
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            res = list(pool.map(call, range(args.requests)))
+        rows.append(summarize(f"4. Pool + {args.error_rate:.0%} de 429", res, time.time() - t0))
+        print(f"↻ Erreurs injectées : {err_state.stats['errors_injected']} | reprises client : {get_api_pool().metrics['retries']}\n")
+
+    headers = list(rows[0].keys())
+    print(" | ".join(headers))
+    for row in rows:
+        print(" | ".join(f"{v:.2f}" if isinstance(v, float) else str(v) for v in row.values()))
+
+
+if __name__ == "__main__":
+    main()
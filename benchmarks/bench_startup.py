@@ -0,0 +1,114 @@
+"""
+Coût de démarrage de l'application : imports et temps jusqu'au premier rendu.
+
+1. Rapport d'import (`python -X importtime`, processus neuf) : coût cumulé de chaque module
+   du projet, des paquets hors projet les plus lourds, et liste des bibliothèques lourdes chargées
+   dès l'import (elles devraient l'être au premier usage uniquement).
+2. Temps jusqu'au premier rendu : `app.py` exécuté à froid via `streamlit.testing`
+   (un processus neuf par mesure), onglet par onglet, puis coût d'un rerun à chaud.
+
+Usage :
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --tabs "🏢 Ops,ℹ️ Documentation" --json startup.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ce que `app.py` importe avant le premier affichage
+APP_IMPORTS = ["streamlit", "config.models_config", "modules.utils", "modules.fake_backend", "modules.cascade", "modules.views"]
+HEAVY_LIBS = ["pandas", "numpy", "pypdf", "codecarbon", "llama_cpp", "mistralai", "httpx", "psutil"]
+DEFAULT_TABS = ["🏢 Ops", "ℹ️ Documentation"]
+
+RENDER_SNIPPET = """
+import sys, time, json
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.session_state["nav"] = sys.argv[2]
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+print(json.dumps({"first_render_s": t2 - t1, "total_s": t2 - t0, "rerun_s": t3 - t2,
+                  "errors": [e.value[:200] for e in at.exception]}))
+"""
+
+
+def _python(args, **kwargs):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, text=True, **kwargs)
+
+
+def import_report():
+    """Parse la sortie `-X importtime` d'un processus neuf important les modules de l'application."""
+    code = "; ".join(f"import {m}" for m in APP_IMPORTS)
+    code += f"; import sys, json; print(json.dumps([m for m in {HEAVY_LIBS!r} if m in sys.modules]))"
+    proc = _python(["-X", "importtime", "-c", code])
+    if proc.returncode != 0:
+        sys.exit(f"❌ Import impossible :\n{proc.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        _, cum, name = line.split("|")
+        try:
+            cumulative[name.strip()] = int(cum) / 1000.0  # µs → ms
+        except ValueError:
+            continue  # En-tête
+    total = sum(ms for name, ms in cumulative.items() if "." not in name)
+    project = sorted(((n, ms) for n, ms in cumulative.items() if n.split(".")[0] in ("modules", "config")), key=lambda x: -x[1])
+    third_party = sorted(((n, ms) for n, ms in cumulative.items() if "." not in n and n not in ("modules", "config")), key=lambda x: -x[1])
+    return {"total_ms": total, "project": project, "third_party": third_party[:12], "heavy_loaded": json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def first_render(tab, runs):
+    """Médiane sur `runs` processus neufs du temps jusqu'au premier rendu de l'onglet."""
+    samples = []
+    for _ in range(runs):
+        proc = _python(["-c", RENDER_SNIPPET, os.path.join(ROOT, "app.py"), tab], timeout=600)
+        if proc.returncode != 0:
+            sys.exit(f"❌ Rendu impossible ({tab}) :\n{proc.stderr[-2000:]}")
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    med = lambda key: statistics.median(s[key] for s in samples)
+    return {
+        "Onglet": tab, "Premier rendu (s)": med("first_render_s"), "Processus → rendu (s)": med("total_s"),
+        "Rerun à chaud (s)": med("rerun_s"), "Erreurs": sum(len(s["errors"]) for s in samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût d'import et temps jusqu'au premier rendu de l'application.")
+    parser.add_argument("--runs", type=int, default=3, help="Processus neufs par onglet (médiane)")
+    parser.add_argument("--tabs", default=",".join(DEFAULT_TABS), help="Onglets à mesurer, séparés par des virgules")
+    parser.add_argument("--json", help="Enregistre les résultats (suivi dans le temps)")
+    args = parser.parse_args()
+
+    report = import_report()
+    print(f"📦 Import des modules de l'application : {report['total_ms']:.0f} ms (processus neuf)\n")
+    print("Modules du projet (cumulé, ms)")
+    for name, ms in report["project"]: print(f"  {name:<32} {ms:8.1f}")
+    print("\nPaquets hors projet les plus lourds, bibliothèque standard incluse (cumulé, ms)")
+    for name, ms in report["third_party"]: print(f"  {name:<32} {ms:8.1f}")
+    heavy = report["heavy_loaded"]
+    print(f"\n{'⚠️' if heavy else '✅'} Bibliothèques lourdes chargées à l'import : {', '.join(heavy) or 'aucune'}\n")
+
+    rows = [first_render(tab.strip(), args.runs) for tab in args.tabs.split(",")]
+    print("⏱️ Temps jusqu'au premier rendu (médiane)")
+    print(" | ".join(rows[0].keys()))
+    for row in rows:
+        print(" | ".join(f"{v:.2f}" if isinstance(v, float) else str(v) for v in row.values()))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"imports": report, "first_render": rows}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
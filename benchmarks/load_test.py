@@ -0,0 +1,279 @@
+"""
+Test de charge multi-sessions : combien d'utilisateurs simultanés un poste Workbench peut-il servir ?
+
+N utilisateurs virtuels enchaînent des requêtes (Chat, Ops, Synthèse) tirées de
+documentation/TEST_PROTOCOL.md, séparées par un temps de réflexion aléatoire (loi exponentielle).
+Chaque palier de concurrence est mesuré pendant une durée fixe.
+
+Deux modes :
+- `engine` : appelle directement `run_completion`, comme le fait l'interface. Backend synthétique
+  (modèle local partagé, verrou llama.cpp → file d'attente réelle) ou API (serveur Mistral local).
+- `app` : pilote le vrai script `app.py` via `streamlit.testing` (une session AppTest par utilisateur),
+  backend synthétique. Mesure le temps de réponse perçu, rendu et reruns compris.
+
+Rapport par palier : débit (req/s, tok/s), attente en file, TTFT perçu et latence (p50 / p95),
+erreurs, et croissance de la mémoire résidente (RSS) du processus.
+
+Usage :
+    python benchmarks/load_test.py --users 1,2,4,8 --duration 30 --think 2
+    python benchmarks/load_test.py --backend api --users 4,16 --tps 80
+    python benchmarks/load_test.py --mode app --users 1,2,4 --mix chat=2,ops=1
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Le catalogue lit ces variables à l'import : à positionner avant tout import du projet
+os.environ.setdefault("WORKBENCH_SYNTHETIC", "1")
+
+import psutil
+
+from benchmarks.bench_api import percentile
+
+PROTOCOL_PATH = os.path.join(ROOT, "documentation", "TEST_PROTOCOL.md")
+SYNTHETIC_FAMILY = "🧪 Synthétique"
+# Prompts système identiques aux valeurs par défaut des onglets (modules/views.py)
+SYSTEM_PROMPTS = {
+    "ops_triage": 'Output JSON: {"category": "...", "priority": "..."}',
+    "ops_pii": "Replace names/locations with [ANON].",
+    "rag": "You are a helpful assistant...",
+    "chat": "You are a helpful assistant.",
+}
+DEFAULT_MIX = "chat=2,ops=1,rag=1"
+
+
+# =========================================================================
+# 📋 PROMPTS (TEST_PROTOCOL.md)
+# =========================================================================
+
+def load_protocol_prompts(path=PROTOCOL_PATH):
+    """Blocs ```text du protocole, regroupés par onglet (titre de section `## ... Onglet N : Nom`)."""
+    with open(path, "r", encoding="utf-8") as f:
+        doc = f.read()
+    sections = {}
+    for title, body in re.findall(r"^## (.+?)\n(.*?)(?=^## |\Z)", doc, flags=re.M | re.S):
+        blocks = [b.strip() for b in re.findall(r"```text\n(.*?)```", body, flags=re.S)]
+        if blocks: sections[title] = blocks
+
+    def find(word):
+        return next((blocks for title, blocks in sections.items() if word in title), [])
+
+    ops, rag = find("Ops"), find("Synthèse")
+    return {
+        "ops": [("ops_triage", ops[0]), ("ops_pii", ops[1])] if len(ops) >= 2 else [("ops_triage", b) for b in ops],
+        # Synthèse : (texte, instruction)
+        "rag": [("rag", f"CTX:\n{rag[0]}\nREQ: {rag[1]}")] if len(rag) >= 2 else [],
+        # Chat : questions ouvertes des onglets Code / Logique / Traduction
+        "chat": [("chat", b) for word in ("Code", "Logique", "Traduction") for b in find(word)],
+    }
+
+
+def parse_mix(spec, prompts):
+    """'chat=2,ops=1' → liste pondérée d'onglets disponibles."""
+    weighted = []
+    for item in spec.split(","):
+        tab, _, weight = item.partition("=")
+        tab = tab.strip()
+        if tab not in prompts or not prompts[tab]:
+            sys.exit(f"❌ Onglet inconnu ou sans prompt dans le protocole : {tab}")
+        weighted += [tab] * int(weight or 1)
+    return weighted
+
+
+# =========================================================================
+# 👥 UTILISATEURS VIRTUELS
+# =========================================================================
+
+class EngineUser:
+    """Une session : historique de chat propre, appels directs au moteur."""
+
+    def __init__(self, gen_kwargs):
+        self.gen_kwargs = gen_kwargs
+        self.history = []
+
+    def request(self, tab, task, prompt):
+        from modules.utils import run_completion
+        if tab == "chat":
+            self.history.append({"role": "user", "content": prompt})
+            messages = [{"role": "system", "content": SYSTEM_PROMPTS["chat"]}] + self.history[-10:]
+        else:
+            messages = [{"role": "system", "content": SYSTEM_PROMPTS[task]}, {"role": "user", "content": prompt}]
+        res = run_completion(messages=messages, track_energy=False, **self.gen_kwargs)
+        if tab == "chat": self.history.append({"role": "assistant", "content": res["text"]})
+        return {
+            "error": res["error"], "queue_s": res["queue_s"], "output_tokens": res["output_tokens"],
+            # TTFT perçu = attente du modèle partagé + premier token
+            "ttft": res["queue_s"] + res["ttft"] if res["ttft"] is not None else None,
+        }
+
+
+class AppUser:
+    """Une session Streamlit complète (script app.py rejoué à chaque interaction)."""
+
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout).run()
+        self._widget("selectbox", "Famille").set_value(SYNTHETIC_FAMILY).run()
+        self.tab = None
+
+    def _widget(self, kind, label):
+        return next(w for w in getattr(self.at, kind) if w.label == label)
+
+    def _goto(self, label):
+        if self.tab != label:
+            self.at.radio(key="nav").set_value(label).run()
+            self.tab = label
+
+    def request(self, tab, task, prompt):
+        if tab == "chat":
+            self._goto("💬 Chat")
+            action = self.at.chat_input[0].set_value(prompt)
+        elif tab == "ops":
+            self._goto("🏢 Ops")
+            self._widget("radio", "Tâche :").set_value("📮 Triage Emails" if task == "ops_triage" else "🛡️ Anonymisation PII").run()
+            self._widget("text_area", "Email" if task == "ops_triage" else "Texte PII").set_value(prompt)
+            action = self._widget("button", "Analyser" if task == "ops_triage" else "Anonymiser").click()
+        else:
+            self._goto("📝 Synthèse")
+            self._widget("text_area", "Instruction").set_value(prompt)
+            action = self._widget("button", "Générer").click()
+        action.run()
+        errors = [e.value for e in self.at.exception] + [e.value for e in self.at.error]
+        # TTFT et file d'attente non observables depuis le rendu : seule la latence perçue est mesurée
+        return {"error": errors[0][:200] if errors else None, "queue_s": None, "ttft": None, "output_tokens": 0}
+
+
+def _user_loop(make_user, mix, prompts, think, stop_at, rng, records, lock):
+    try:
+        user = make_user()
+    except Exception as e:
+        with lock: records.append({"error": f"Session : {e}", "latency": 0.0, "queue_s": None, "ttft": None, "output_tokens": 0})
+        return
+    while time.time() < stop_at:
+        tab = rng.choice(mix)
+        task, prompt = rng.choice(prompts[tab])
+        t0 = time.time()
+        try:
+            rec = user.request(tab, task, prompt)
+        except Exception as e:
+            rec = {"error": str(e), "queue_s": None, "ttft": None, "output_tokens": 0}
+        rec.update(latency=time.time() - t0, tab=tab, end=time.time())
+        with lock: records.append(rec)
+        if think > 0: time.sleep(min(rng.expovariate(1.0 / think), max(0.0, stop_at - time.time())))
+
+
+def run_level(n_users, make_user, mix, prompts, think, duration, seed):
+    """Un palier de concurrence : n utilisateurs pendant `duration` secondes."""
+    process = psutil.Process(os.getpid())
+    rss_start = process.memory_info().rss
+    records, lock = [], threading.Lock()
+    t0 = time.time()
+    stop_at = t0 + duration
+    threads = [
+        threading.Thread(target=_user_loop, args=(make_user, mix, prompts, think, stop_at, random.Random(seed + i), records, lock), daemon=True)
+        for i in range(n_users)
+    ]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.time() - t0
+    return summarize(n_users, records, wall, rss_start, process.memory_info().rss)
+
+
+def summarize(n_users, records, wall, rss_start, rss_end):
+    ok = [r for r in records if not r["error"]]
+    queue = [r["queue_s"] for r in ok if r["queue_s"] is not None]
+    ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+    lat = [r["latency"] for r in ok]
+    ms = lambda values, q: 1000 * percentile(values, q)
+    return {
+        "Utilisateurs": n_users, "Requêtes": len(records), "Erreurs": len(records) - len(ok),
+        "Débit (req/s)": len(ok) / wall, "Débit (tok/s)": sum(r["output_tokens"] for r in ok) / wall,
+        "File p50 (ms)": ms(queue, 0.5), "File p95 (ms)": ms(queue, 0.95),
+        "TTFT p50 (ms)": ms(ttfts, 0.5), "TTFT p95 (ms)": ms(ttfts, 0.95),
+        "Latence p50 (s)": percentile(lat, 0.5), "Latence p95 (s)": percentile(lat, 0.95),
+        "RSS (Mo)": rss_end / 1024**2, "ΔRSS (Mo)": (rss_end - rss_start) / 1024**2,
+        "_errors": Counter(r["error"] for r in records if r["error"]).most_common(3),
+    }
+
+
+# =========================================================================
+# 🚀 MAIN
+# =========================================================================
+
+def _engine_kwargs(args):
+    """Paramètres de `run_completion` pour le backend choisi (même forme que gen_kwargs de l'app)."""
+    common = {"temperature": 0.7, "max_tokens": args.max_tokens, "top_p": 0.9, "top_k": 40, "carbon_intensity": 475.0}
+    if args.backend == "api":
+        from modules.api_client import HAS_MISTRAL_LIB
+        if not HAS_MISTRAL_LIB:
+            sys.exit("❌ Librairie `mistralai` manquante (pip install -r requirements.txt).")
+        return dict(common, model_type="api", model_conf={"type": "api", "api_id": "mock-small"}, llm_local=None, api_key="mock")
+
+    from config.models_config import CATALOG
+    from modules.fake_backend import SyntheticLlama
+    conf = CATALOG.get(SYNTHETIC_FAMILY, CATALOG.variants(SYNTHETIC_FAMILY)[0]).conf
+    # Un seul modèle chargé, partagé par toutes les sessions : comme `load_local_llm` dans l'app
+    llm = SyntheticLlama(tps=args.tps, ttft=args.ttft, output_tokens=args.max_tokens)
+    return dict(common, model_type="local", model_conf=conf, llm_local=llm, api_key=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge multi-sessions du Workbench.")
+    parser.add_argument("--mode", choices=["engine", "app"], default="engine")
+    parser.add_argument("--backend", choices=["synthetic", "api"], default="synthetic", help="Mode engine uniquement")
+    parser.add_argument("--url", help="Serveur Mistral local déjà lancé (backend api)")
+    parser.add_argument("--users", default="1,2,4,8", help="Paliers de concurrence, ex. 1,2,4,8")
+    parser.add_argument("--duration", type=float, default=20.0, help="Durée de chaque palier (s)")
+    parser.add_argument("--think", type=float, default=1.0, help="Temps de réflexion moyen entre deux requêtes (s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pondération des onglets, ex. chat=2,ops=1,rag=1")
+    parser.add_argument("--tps", type=float, default=60.0, help="Débit simulé (tokens/s)")
+    parser.add_argument("--ttft", type=float, default=0.15, help="Délai simulé avant premier token (s)")
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Réglages du modèle synthétique du catalogue (utilisé par le mode app)
+    os.environ.setdefault("WORKBENCH_SYNTHETIC_TPS", str(args.tps))
+    os.environ.setdefault("WORKBENCH_SYNTHETIC_TTFT", str(args.ttft))
+    os.environ.setdefault("WORKBENCH_SYNTHETIC_TOKENS", str(args.max_tokens))
+    if args.mode == "engine" and args.backend == "api" and not args.url:
+        from scripts.mock_mistral_server import start_server
+        _, args.url, _ = start_server(tps=args.tps, ttft=args.ttft, tokens=args.max_tokens)
+    if args.url: os.environ["MISTRAL_SERVER_URL"] = args.url
+
+    import modules.views  # noqa: F401  Préchauffage : imports lourds hors de la mesure RSS du premier palier
+    prompts = load_protocol_prompts()
+    mix = parse_mix(args.mix, prompts)
+    if args.mode == "engine":
+        gen_kwargs = _engine_kwargs(args)
+        make_user = lambda: EngineUser(gen_kwargs)
+        target = f"engine / {args.backend}" + (f" ({args.url})" if args.backend == "api" else "")
+    else:
+        make_user = lambda: AppUser(timeout=max(60.0, args.duration * 2))
+        target = "app.py (AppTest) / synthétique"
+
+    levels = [int(x) for x in args.users.split(",")]
+    print(f"🧪 Cible : {target} | paliers {levels} | {args.duration:.0f}s par palier | réflexion ~{args.think}s | mix {dict(Counter(mix))}\n")
+    rows = []
+    for n in levels:
+        row = run_level(n, make_user, mix, prompts, args.think, args.duration, args.seed)
+        print(f"  ✔ {n} utilisateur(s) : {row['Requêtes']} requêtes, {row['Erreurs']} erreur(s)")
+        for err, count in row.pop("_errors"): print(f"    └── ⚠️ {count}× {err}")
+        rows.append(row)
+
+    print()
+    headers = list(rows[0].keys())
+    print(" | ".join(headers))
+    for row in rows:
+        print(" | ".join(f"{v:.2f}" if isinstance(v, float) else str(v) for v in row.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Catalogue typé des modèles, chargé depuis `config/models_catalog.json`.
+
+- Chaque variante devient un `ModelEntry` (avec sa fiche `ModelInfo`) à `__slots__` : pas de
+  dictionnaire par instance, attributs fixes, validation unique au chargement.
+- Les index (type, rôle, langue) sont calculés une fois ; `query` combine les critères par
+  intersection d'ensembles et filtre sur les budgets RAM / disque.
+- `entry.conf` est le dictionnaire historique (celui de MODELS_DB), construit une seule fois :
+  le code qui attend un `model_conf` dict (génération, cascade, comparaison) reste inchangé.
+
+Ajouter un modèle = ajouter une entrée dans le JSON, sans toucher au code.
+"""
+import os
+import json
+from types import MappingProxyType
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models_catalog.json")
+CATALOG_VERSION = 1
+
+MODEL_TYPES = ("local", "api")
+# Taxonomie des rôles (role_pref), documentée dans models_config.py
+KNOWN_ROLES = frozenset({
+    "assistant_generalist", "assistant_light", "rag", "code", "reasoning", "math_stem",
+    "tool_calling", "routing_classification", "edge_on_device", "enterprise", "educational_tutor",
+})
+
+
+class CatalogError(ValueError):
+    """Entrée du catalogue invalide (champ manquant, type inattendu, rôle inconnu...)."""
+
+
+def _number(value, where):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CatalogError(f"{where} : nombre attendu, reçu {value!r}")
+    return value
+
+
+def _str_list(value, where):
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise CatalogError(f"{where} : liste de chaînes attendue, reçu {value!r}")
+    return tuple(value)
+
+
+class ModelInfo:
+    """Fiche descriptive d'un modèle (bloc "info" du catalogue)."""
+    __slots__ = ("fam", "editor", "desc", "params_tot", "params_act", "disk", "ram", "langs", "roles", "link")
+
+    def __init__(self, raw, where):
+        try:
+            self.fam, self.editor, self.desc = str(raw["fam"]), str(raw["editor"]), str(raw["desc"])
+            self.params_tot = _number(raw["params_tot"], f"{where}.params_tot")
+            self.params_act = _number(raw["params_act"], f"{where}.params_act")
+            self.disk = _number(raw["disk"], f"{where}.disk")
+            self.ram = _number(raw["ram"], f"{where}.ram")
+            self.langs = _str_list(raw["langs"], f"{where}.langs")
+            self.roles = _str_list(raw["role_pref"], f"{where}.role_pref")
+        except KeyError as e:
+            raise CatalogError(f"{where} : champ obligatoire manquant {e}") from None
+        self.link = str(raw.get("link", ""))
+        unknown = set(self.roles) - KNOWN_ROLES
+        if unknown:
+            raise CatalogError(f"{where}.role_pref : rôle(s) inconnu(s) {sorted(unknown)}")
+
+    def as_dict(self):
+        return {
+            "fam": self.fam, "editor": self.editor, "desc": self.desc,
+            "params_tot": self.params_tot, "params_act": self.params_act,
+            "disk": self.disk, "ram": self.ram,
+            "langs": list(self.langs), "role_pref": list(self.roles), "link": self.link,
+        }
+
+
+class ModelEntry:
+    """Une variante du catalogue : identité, accès (fichier GGUF ou identifiant API) et fiche."""
+    __slots__ = ("family", "name", "type", "backend", "ctx", "repo_id", "filename", "file",
+                 "api_id", "eco_ops", "synthetic", "info", "conf")
+
+    def __init__(self, family, name, raw, model_dir):
+        where = f"{family} / {name}"
+        if not isinstance(raw, dict):
+            raise CatalogError(f"{where} : objet attendu")
+        self.family, self.name = family, name
+        self.type = raw.get("type")
+        if self.type not in MODEL_TYPES:
+            raise CatalogError(f"{where} : type {self.type!r} inconnu (attendu : {', '.join(MODEL_TYPES)})")
+        self.backend = raw.get("backend", "llama_cpp" if self.type == "local" else "mistral")
+        self.ctx = int(_number(raw.get("ctx"), f"{where}.ctx"))
+        self.repo_id, self.filename = raw.get("repo_id"), raw.get("filename")
+        self.api_id = raw.get("api_id")
+        self.eco_ops = MappingProxyType(dict(raw["eco_ops"])) if "eco_ops" in raw else None
+        self.synthetic = raw.get("synthetic")
+
+        if self.type == "api" and not self.api_id:
+            raise CatalogError(f"{where} : \"api_id\" obligatoire pour un modèle API")
+        if self.type == "local" and self.backend == "llama_cpp" and not (self.repo_id and self.filename):
+            raise CatalogError(f"{where} : \"repo_id\" et \"filename\" obligatoires pour un GGUF")
+        # Chemin local déduit du nom de fichier (surcharge possible via "file")
+        self.file = raw.get("file") or (os.path.join(model_dir, self.filename) if self.type == "local" and self.filename else None)
+        self.info = ModelInfo(raw.get("info", {}), f"{where}.info")
+        self.conf = self._build_conf(raw)
+
+    @property
+    def is_api(self):
+        return self.type == "api"
+
+    @property
+    def is_local(self):
+        return self.type == "local"
+
+    def _build_conf(self, raw):
+        """Dictionnaire au format historique de MODELS_DB (clés présentes uniquement si renseignées)."""
+        conf = {"type": self.type}
+        if "backend" in raw: conf["backend"] = self.backend
+        for key in ("repo_id", "filename", "file", "api_id"):
+            value = getattr(self, key)
+            if value: conf[key] = value
+        conf["ctx"] = self.ctx
+        if self.eco_ops is not None: conf["eco_ops"] = dict(self.eco_ops)
+        if self.synthetic is not None: conf["synthetic"] = dict(self.synthetic)
+        conf["info"] = self.info.as_dict()
+        return conf
+
+    def __repr__(self):
+        return f"ModelEntry({self.family!r}, {self.name!r}, type={self.type!r})"
+
+
+class Catalog:
+    """Ensemble figé des modèles, avec index par famille, type, rôle et langue."""
+    __slots__ = ("entries", "_by_key", "_by_family", "_by_type", "_by_role", "_by_lang")
+
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        self._by_key = {(e.family, e.name): e for e in self.entries}
+        if len(self._by_key) != len(self.entries):
+            raise CatalogError("Variantes en double dans le catalogue")
+        by_family, by_type, by_role, by_lang = {}, {}, {}, {}
+        for idx, e in enumerate(self.entries):
+            by_family.setdefault(e.family, []).append(e)
+            by_type.setdefault(e.type, set()).add(idx)
+            for role in e.info.roles: by_role.setdefault(role, set()).add(idx)
+            for lang in e.info.langs: by_lang.setdefault(lang, set()).add(idx)
+        self._by_family = MappingProxyType({f: tuple(es) for f, es in by_family.items()})
+        freeze = lambda index: MappingProxyType({k: frozenset(v) for k, v in index.items()})
+        self._by_type, self._by_role, self._by_lang = freeze(by_type), freeze(by_role), freeze(by_lang)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def families(self):
+        """Familles dans l'ordre du catalogue."""
+        return list(self._by_family)
+
+    def variants(self, family):
+        """Noms des variantes d'une famille, dans l'ordre du catalogue."""
+        return [e.name for e in self._by_family.get(family, ())]
+
+    def languages(self):
+        """Codes de langue présents dans le catalogue."""
+        return list(self._by_lang)
+
+    def roles(self):
+        """Rôles présents dans le catalogue."""
+        return list(self._by_role)
+
+    def get(self, family, name):
+        """Entrée (famille, variante), None si absente."""
+        return self._by_key.get((family, name))
+
+    def family_type(self, family):
+        """"api" si la famille ne contient que des modèles API, sinon "local"."""
+        entries = self._by_family.get(family, ())
+        return "api" if entries and all(e.is_api for e in entries) else "local"
+
+    def query(self, type=None, roles=(), langs=(), any_role=False, max_ram=None, max_disk=None):
+        """
+        Entrées correspondant à TOUS les critères, dans l'ordre du catalogue :
+        type ("local" / "api"), rôles (tous, ou au moins un si `any_role`), langues (toutes),
+        budgets RAM / disque en Go.
+        """
+        ids = None
+        def narrow(current, matched):
+            return matched if current is None else current & matched
+        if type is not None:
+            ids = narrow(ids, self._by_type.get(type, frozenset()))
+        if roles:
+            sets = [self._by_role.get(r, frozenset()) for r in roles]
+            ids = narrow(ids, frozenset().union(*sets) if any_role else frozenset.intersection(*sets))
+        for lang in langs:
+            ids = narrow(ids, self._by_lang.get(lang, frozenset()))
+        candidates = self.entries if ids is None else [self.entries[i] for i in sorted(ids)]
+        return [
+            e for e in candidates
+            if (max_ram is None or e.info.ram <= max_ram) and (max_disk is None or e.info.disk <= max_disk)
+        ]
+
+    def to_models_db(self):
+        """Vue imbriquée {famille: {variante: conf}} (format historique MODELS_DB)."""
+        return {family: {e.name: e.conf for e in entries} for family, entries in self._by_family.items()}
+
+
+def load_catalog(path=CATALOG_PATH, model_dir="models_gguf", extra=None):
+    """
+    Lit et valide le catalogue JSON. `extra` : {famille: {variante: entrée}} ajoutées après le
+    fichier (ex. backend synthétique activé par variable d'environnement). Lève CatalogError.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Catalogue illisible ({path}) : {e}") from e
+    if data.get("version") != CATALOG_VERSION:
+        raise CatalogError(f"Version de catalogue {data.get('version')!r} non supportée (attendu : {CATALOG_VERSION})")
+
+    families = dict(data.get("families", {}))
+    families.update(extra or {})
+    entries = [
+        ModelEntry(family, name, raw, model_dir)
+        for family, variants in families.items()
+        for name, raw in variants.items()
+    ]
+    return Catalog(entries)
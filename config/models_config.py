@@ -3,17 +3,124 @@ Configuration centralisée (Unique Source of Truth) pour Wavestone Local AI Work
 Utilisé par :
 1. app.py (pour l'affichage et le chargement)
 2. download_gguf_models.py (pour le téléchargement)
+Les modèles eux-mêmes sont dans config/models_catalog.json (voir config/catalog.py).
 """
 import os
 
+from config.catalog import CATALOG_PATH, load_catalog
+
 # Paramètres globaux
 LOCAL_MODEL_DIR = "models_gguf"
+CACHE_DIR = ".workbench_cache"  # Index RAG, caches disque (non versionné)
+
+# Corpus RAG (indexation lexicale BM25 d'un dossier de documents)
+RAG_SETTINGS = {
+    "corpus_dir": os.path.join("data", "corpus"),
+    "index_dir": os.path.join(CACHE_DIR, "rag_index"),
+    "chunk_tokens": 350,   # Taille cible d'un passage indexé
+    "top_k": 5
+}
+
+# Extraction de texte (cache par empreinte SHA-256 + parallélisation des gros PDF)
+EXTRACTION_SETTINGS = {
+    "cache_dir": os.path.join(CACHE_DIR, "extract"),
+    "memory_entries": 32,       # Documents gardés en RAM (LRU)
+    "disk_cache_mb": 512,       # Taille max du cache disque (LRU sur mtime)
+    "parallel_min_pages": 40,   # En dessous, le coût du pool de processus n'est pas rentable
+    "max_workers": max(1, (os.cpu_count() or 2) - 1)
+}
+
+# Cache exact des réponses (requêtes déterministes : température 0 ou seed fixe)
+RESPONSE_CACHE_SETTINGS = {
+    "enabled": True,
+    "db_path": os.path.join(CACHE_DIR, "responses.sqlite"),
+    "max_mb": 64
+}
+
+# Traduction : mémoire de traduction persistante (segments déjà traduits par modèle / langue)
+TRANSLATION_SETTINGS = {
+    "tm_path": os.path.join(CACHE_DIR, "translation_memory.sqlite"),
+    "output_dir": "outputs/translations",  # Fichiers produits par la traduction par lot
+    "api_concurrency": 4                    # Requêtes API simultanées en mode lot
+}
+
+# IoT : commandes déjà interprétées par le LLM (gabarits → JSON), servies sans inférence
+IOT_SETTINGS = {
+    "commands_db": os.path.join(CACHE_DIR, "iot_commands.sqlite"),
+    "max_entries": 5000
+}
+
+# Mode "Auto" : cascade du plus petit modèle local vers un plus gros, puis l'API, selon la confiance
+CASCADE_SETTINGS = {
+    "entry_roles": ["routing_classification", "assistant_light"],   # Candidats du premier niveau
+    "escalation_roles": ["assistant_generalist"],                   # Candidats du niveau intermédiaire
+    "max_local_ram_gb": 6.0,                                       # Modèles locaux trop lourds exclus
+    "api_fallback": ("☁️ Mistral", "Mistral Small 3.2"),           # Dernier niveau (si clé API)
+    "min_avg_logprob": -1.0,    # Confiance minimale : log-prob moyenne des tokens générés
+    "logprob_ctx": 2048,        # n_ctx des niveaux locaux (logits_all coûte n_ctx x vocabulaire en RAM)
+    "logits_bytes": 4,          # Taille d'un logit (float32) pour le budget RAM des niveaux locaux
+    "max_loaded_tiers": 2,      # Niveaux locaux gardés en mémoire simultanément
+    "api_tps": 60.0             # Débit API supposé pour estimer le gain de latence
+}
+
+# Client API Mistral mutualisé (connexions réutilisées, reprises sur 429 / 5xx)
+API_CLIENT_SETTINGS = {
+    "server_url": os.getenv("MISTRAL_SERVER_URL") or None,  # Ex. serveur de test local
+    "max_connections": 32,
+    "timeout_s": 120.0,
+    "max_retries": 4,
+    "backoff_base_s": 0.5,
+    "backoff_max_s": 8.0
+}
+
+# Comparaison multi-modèles : budget des modèles locaux chargés simultanément
+COMPARISON_SETTINGS = {
+    "max_models": 4,          # Colonnes affichées côte à côte
+    "ram_margin_gb": 2.0,     # RAM laissée libre pour l'OS et l'application
+    "min_threads": 2          # Cœurs minimum par modèle local lancé en parallèle
+}
+
+# Intensité carbone de l'électricité (OWID) : lue dans l'archive du data package, index compact
+# (dernière année par pays) reconstruit si la source change. Le CSV extrait n'est qu'un repli.
+CARBON_SETTINGS = {
+    "zip_path": os.path.join("data", "carbon-intensity-electricity", "carbon-intensity-electricity.zip"),
+    "csv_path": os.path.join("data", "carbon-intensity-electricity", "carbon-intensity-electricity.csv"),
+    "index_path": os.path.join(CACHE_DIR, "carbon_index.json"),
+    "run_log_max": 200   # Inférences gardées par session pour l'analyse « et ailleurs ? »
+}
+
+# Cache sémantique (paraphrases) : modèle d'embedding GGUF local, téléchargé avec les autres modèles
+SEMANTIC_CACHE_SETTINGS = {
+    "enabled": True,
+    "tasks": ["iot", "ops_triage"],   # Onglets où une paraphrase appelle la même réponse
+    "threshold": 0.92,                # Similarité cosinus minimale
+    "max_entries": 256,               # Par espace (modèle, onglet, prompt système)
+    "max_namespaces": 32,             # Espaces conservés (les moins récemment utilisés sont évincés)
+    "embedding": {
+        "repo_id": "nomic-ai/nomic-embed-text-v1.5-GGUF",
+        "filename": "nomic-embed-text-v1.5.Q4_K_M.gguf",
+        "file": os.path.join(LOCAL_MODEL_DIR, "nomic-embed-text-v1.5.Q4_K_M.gguf"),
+        "ctx": 2048,
+        "prefix": "search_query: "    # Préfixe de tâche attendu par nomic-embed
+    }
+}
+
+# Métadonnées GGUF lues dans l'en-tête des fichiers (modules/gguf_reader.py)
+GGUF_SETTINGS = {
+    "cache_path": os.path.join(CACHE_DIR, "gguf_meta.json"),  # Invalidé par (taille, mtime) de chaque fichier
+    "kv_bytes": 2,          # Cache KV en f16 (défaut llama.cpp)
+    "overhead_gb": 0.3      # Tampons de calcul et contexte llama.cpp
+}
 
 # Configuration du téléchargement
 DOWNLOAD_SETTINGS = {
     "local_dir": LOCAL_MODEL_DIR,
-    "resume_download": True,
-    "max_workers": 2
+    "resume_download": True,     # Reprise des fichiers `.part` interrompus
+    "manifest_path": os.path.join(LOCAL_MODEL_DIR, ".manifest.json"),  # (taille, mtime, sha256) par fichier
+    "max_workers": 2,            # Téléchargements simultanés (--workers)
+    "max_bandwidth_mbps": None,  # Plafond total en Mo/s, None = aucun (--max-rate)
+    "chunk_kb": 1024,            # Taille des blocs lus / écrits
+    "progress_interval_s": 5     # Période d'affichage de la progression globale
 }
 
 # =========================================================================
@@ -33,630 +140,57 @@ DOWNLOAD_SETTINGS = {
 # - "enterprise"             : Particulièrement adapté aux cas d’usage entreprise, conformité, gouvernance
 # - "educational_tutor"      : Tutorat, pédagogie, explications pas-à-pas
 #
+# Un rôle hors de cette liste est refusé au chargement du catalogue (config/catalog.py).
+#
 # Exemple d’accès :
-#   info = MODELS_DB["🏠 Alibaba"]["Qwen 2.5 1.5B Instruct"]["info"]
-#   roles = info.get("role_pref", [])
+#   entry = CATALOG.get("🏠 Alibaba - Qwen", "Qwen 2.5 1.5B Instruct")
+#   roles = entry.info.roles
+#   petits_rag = CATALOG.query(type="local", roles=["rag"], langs=["fr"], max_ram=8)
 # =========================================================================
 
-MODELS_DB = {
-    # =========================================================================
-    # 🏠 ALIBABA (Qwen)
-    # =========================================================================
-    "🏠 Alibaba - Qwen": {
-        "Qwen 2.5 0.5B Instruct": {
-            "type": "local",
-            "repo_id": "Qwen/Qwen2.5-0.5B-Instruct-GGUF",
-            "filename": "qwen2.5-0.5b-instruct-q4_k_m.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "qwen2.5-0.5b-instruct-q4_k_m.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Qwen 2.5", "editor": "Alibaba",
-                "desc": (
-                    "Version 'nano' de Qwen 2.5. Modèle dense d’environ 0,5B paramètres, "
-                    "incroyablement léger, surprenant pour des tâches simples de "
-                    "classification, routage, extraction de mots-clés ou chat basique "
-                    "sur CPU modeste."
-                ),
-                "params_tot": 0.5, "params_act": 0.5,
-                "disk": 0.40, "ram": 1.5,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["assistant_light", "routing_classification", "edge_on_device"],
-                "link": "https://huggingface.co/Qwen/Qwen2.5-0.5B-Instruct-GGUF"
-            }
-        },
-        "Qwen 2.5 1.5B Instruct": {
-            "type": "local",
-            "repo_id": "Qwen/Qwen2.5-1.5B-Instruct-GGUF",
-            "filename": "qwen2.5-1.5b-instruct-q4_k_m.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "qwen2.5-1.5b-instruct-q4_k_m.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Qwen 2.5", "editor": "Alibaba",
-                "desc": (
-                    "Petit modèle dense (≈1,5B) très performant en multilingue, extraction, "
-                    "résumé, recherche documentaire et code. Contexte 32K. Idéal pour des "
-                    "assistants légers, du RAG court, des workflows métier automatisés ou "
-                    "comme modèle par défaut sur CPU ou GPU modeste."
-                ),
-                "params_tot": 1.54, "params_act": 1.54,
-                "disk": 1.12, "ram": 4.0,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["assistant_generalist", "rag", "code", "edge_on_device"],
-                "link": "https://huggingface.co/Qwen/Qwen2.5-1.5B-Instruct-GGUF"
-            }
-        },
-        "Qwen 2.5 3B Instruct": {
-            "type": "local",
-            "repo_id": "Qwen/Qwen2.5-3B-Instruct-GGUF",
-            "filename": "qwen2.5-3b-instruct-q4_k_m.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "qwen2.5-3b-instruct-q4_k_m.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Qwen 2.5", "editor": "Alibaba",
-                "desc": (
-                    "Modèle dense 3B multilingue long contexte (32K), très performant en "
-                    "génération structurée, code, analyse logique et scénarios agentiques. "
-                    "Excellent candidat comme SLM principal pour un assistant local "
-                    "polyvalent sur CPU puissant ou GPU."
-                ),
-                "params_tot": 3.09, "params_act": 3.09,
-                "disk": 1.93, "ram": 7.0,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["assistant_generalist", "rag", "code", "reasoning"],
-                "link": "https://huggingface.co/Qwen/Qwen2.5-3B-Instruct-GGUF"
-            }
-        }
-    },
+# Les modèles sont décrits dans config/models_catalog.json (chargé et validé par config/catalog.py).
+_EXTRA_FAMILIES = {}
 
-    # =========================================================================
-    # 🏠 GOOGLE
-    # =========================================================================
-    "🏠 Google - Gemma": {
-        "Gemma 2 2B IT": {
-            "type": "local",
-            "repo_id": "bartowski/gemma-2-2b-it-GGUF",
-            "filename": "gemma-2-2b-it-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "gemma-2-2b-it-Q4_K_M.gguf"),
-            "ctx": 8192,
-            "info": {
-                "fam": "Gemma 2", "editor": "Google",
-                "desc": (
-                    "Modèle 2B open-weight de Google (famille Gemma / Gemini), très bon en "
-                    "rédaction, Q&A, code et raisonnement léger, avec un contexte 8K. "
-                    "Fiable et plutôt sécurisé, adapté aux assistants texte généraux, à la "
-                    "documentation technique et au prototypage d’agents."
-                ),
-                "params_tot": 2.0, "params_act": 2.0,
-                "disk": 1.71, "ram": 5.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_generalist", "code"],
-                "link": "https://huggingface.co/google/gemma-2-2b-it"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 HUGGING FACE
-    # =========================================================================
-    "🏠 Hugging Face - SmolLM": {
-        "SmolLM2 1.7B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/SmolLM2-1.7B-Instruct-GGUF",
-            "filename": "SmolLM2-1.7B-Instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "SmolLM2-1.7B-Instruct-Q4_K_M.gguf"),
-            "ctx": 2048,
-            "info": {
-                "fam": "SmolLM2", "editor": "HuggingFace",
-                "desc": (
-                    "Modèle compact 1.7B conçu pour tourner on-device (contexte 2K). "
-                    "Bon en chat simple, réécriture, résumé, extraction et classification. "
-                    "Idéal pour agents embarqués, micro-services NLP et pipelines légers "
-                    "où la latence prime sur la profondeur de raisonnement."
-                ),
-                "params_tot": 1.7, "params_act": 1.7,
-                "disk": 1.06, "ram": 4.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_light", "routing_classification", "edge_on_device"],
-                "link": "https://huggingface.co/HuggingFaceTB/SmolLM2-1.7B-Instruct"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 IBM GRANITE
-    # =========================================================================
-    "🏠 IBM - Granite": {
-        "Granite 3.0 3B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/granite-3.0-3b-a800m-instruct-GGUF",
-            "filename": "granite-3.0-3b-a800m-instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "granite-3.0-3b-a800m-instruct-Q4_K_M.gguf"),
-            "ctx": 4096,
-            "info": {
-                "fam": "Granite 3.0", "editor": "IBM",
-                "desc": (
-                    "Modèle MoE 3.3B (~800M paramètres actifs) orienté entreprise. "
-                    "Multilingue, bon en résumé, classification, extraction, Q&A et code. "
-                    "Très adapté aux cas d’usage d’entreprise sérieux (cybersécurité, "
-                    "conformité, analyse documentaire) où la stabilité, la gouvernance "
-                    "et la traçabilité sont prioritaires."
-                ),
-                "params_tot": 3.3, "params_act": 0.8,
-                "disk": 2.06, "ram": 6.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_generalist", "enterprise", "rag", "routing_classification"],
-                "link": "https://huggingface.co/ibm-granite/granite-3.0-3b-a800m-instruct"
-            }
-        },
-        "Granite 3.1 2B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/granite-3.1-2b-instruct-GGUF",
-            "filename": "granite-3.1-2b-instruct-Q4_K_M.gguf",
-            "ctx": 131072,
-            "info": {
-                "fam": "Granite 3.1", "editor": "IBM",
-                "desc": (
-                    "Granite 3.1 2B dense avec contexte étendu à 128K. Meilleures "
-                    "performances en instruction-following et RAG longue portée que la "
-                    "v3.0. Intéressant pour analyser de longs rapports, procès-verbaux ou "
-                    "dossiers de conformité sur une seule requête."
-                ),
-                "params_tot": 2.5, "params_act": 2.5,
-                "disk": 1.55, "ram": 5.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_generalist", "rag", "enterprise"],
-                "link": "https://huggingface.co/ibm-granite/granite-3.1-2b-instruct"
-            }
-        },
-        "Granite 4.0 1B": {
-            "type": "local",
-            "repo_id": "ibm-granite/granite-4.0-1b-GGUF",
-            "filename": "granite-4.0-1b-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "granite-4.0-1b-Q4_K_M.gguf"),
-            "ctx": 4096,
-            "info": {
-                "fam": "Granite 4.0", "editor": "IBM",
-                "desc": (
-                    "Modèle 'nano' 1B dense/hybride, pensé pour le edge/on-device. "
-                    "Idéal pour des tâches légères : agents simples, extraction, "
-                    "classification, filtrage et routage, automatisations texte sur CPU."
-                ),
-                "params_tot": 1.0, "params_act": 1.0,
-                "disk": 1.02, "ram": 3.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_light", "routing_classification", "edge_on_device", "enterprise"],
-                "link": "https://huggingface.co/ibm-granite/granite-4.0-1b"
-            }
-        },
-        "Granite 4.0 350M": {
-            "type": "local",
-            "repo_id": "ibm-granite/granite-4.0-350m-GGUF",
-            "filename": "granite-4.0-350m-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "granite-4.0-350m-Q4_K_M.gguf"),
-            "ctx": 4096,
-            "info": {
-                "fam": "Granite 4.0", "editor": "IBM",
-                "desc": (
-                    "Micro-modèle 350M (≈0,4B) ultra-léger, optimal pour classification, "
-                    "détection d’intention, filtrage, normalisation ou routage. Très faible "
-                    "empreinte mémoire, parfait pour environnements extrêmement contraints "
-                    "ou comme brique de pré- / post-traitement."
-                ),
-                "params_tot": 0.4, "params_act": 0.4,
-                "disk": 0.24, "ram": 1.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["routing_classification", "edge_on_device", "enterprise"],
-                "link": "https://huggingface.co/ibm-granite/granite-4.0-350m"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 LG AI RESEARCH
-    # =========================================================================
-    "🏠 LG AI Research - EXAONE": {
-        "EXAONE 3.5 2.4B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/EXAONE-3.5-2.4B-Instruct-GGUF",
-            "filename": "EXAONE-3.5-2.4B-Instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "EXAONE-3.5-2.4B-Instruct-Q4_K_M.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "EXAONE 3.5", "editor": "LG AI Research",
-                "desc": (
-                    "Modèle bilingue coréen/anglais 2.4B très performant de LG. "
-                    "Architecture optimisée, long contexte 32K et bons scores sur les "
-                    "benchmarks standard pour sa taille. Intéressant comme alternative "
-                    "bilingue à Qwen/Gemma pour des cas d’usage EN/KR."
-                ),
-                "params_tot": 2.4, "params_act": 2.4,
-                "disk": 1.64, "ram": 5.0,
-                "langs": ["ko", "en"],
-                "role_pref": ["assistant_generalist", "rag"],
-                "link": "https://huggingface.co/LGAI-EXAONE/EXAONE-3.5-2.4B-Instruct"
-            }
-        }
-    },
 
-    # =========================================================================
-    # 🏠 MadeAgents
-    # =========================================================================
-    "🏠 MadeAgents - Hammer": {
-        "Hammer 2.1 0.5B": {
-            "type": "local",
-            "repo_id": "Nekuromento/Hammer2.1-0.5b-Q6_K-GGUF",
-            "filename": "hammer2.1-0.5b-q6_k.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "hammer2.1-0.5b-q6_k.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Hammer 2.1", "editor": "MadeAgents",
-                "desc": (
-                    "Modèle ultra-compact (~0,5B) spécialisé en function calling et "
-                    "pilotage d’outils. Adapté aux workflows d’agents simples, à très "
-                    "faible latence, avec un contexte 32K utile pour des traces courtes "
-                    "ou de petits plans d’action."
-                ),
-                "params_tot": 0.5, "params_act": 0.5,
-                "disk": 0.50, "ram": 2.0,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["tool_calling", "edge_on_device", "assistant_light"],
-                "link": "https://huggingface.co/MadeAgents/Hammer2.1-0.5b"
-            }
-        },
-        "Hammer 2.1 1.5B": {
-            "type": "local",
-            "repo_id": "mradermacher/Hammer2.1-1.5b-GGUF",
-            "filename": "Hammer2.1-1.5b.Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Hammer2.1-1.5b.Q4_K_M.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Hammer 2.1", "editor": "MadeAgents",
-                "desc": (
-                    "Version 1.5B de Hammer, dense, avec bon compromis taille/capacité "
-                    "pour des agents locaux complexes orientés function calling "
-                    "et orchestration d’API."
-                ),
-                "params_tot": 1.5, "params_act": 1.5,
-                "disk": 1.00, "ram": 4.0,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["tool_calling", "assistant_generalist"],
-                "link": "https://huggingface.co/MadeAgents/Hammer2.1-1.5b"
-            }
-        },
-        "Hammer 2.1 3B": {
-            "type": "local",
-            "repo_id": "mradermacher/Hammer2.1-3b-GGUF",
-            "filename": "Hammer2.1-3b.Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Hammer2.1-3b.Q4_K_M.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Hammer 2.1", "editor": "MadeAgents",
-                "desc": (
-                    "Le plus capable des 'petits' Hammers (~3B). Très robuste sur les "
-                    "appels d'outils complexes, les plans multi-étapes et les scénarios "
-                    "agentiques riches, tout en restant raisonnable en ressources."
-                ),
-                "params_tot": 3.0, "params_act": 3.0,
-                "disk": 2.00, "ram": 6.5,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["tool_calling", "assistant_generalist", "rag"],
-                "link": "https://huggingface.co/MadeAgents/Hammer2.1-3b"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 Meta Llama
-    # =========================================================================
-    "🏠 Meta - Llama": {
-        "Llama 3.2 1B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/Llama-3.2-1B-Instruct-GGUF",
-            "filename": "Llama-3.2-1B-Instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Llama-3.2-1B-Instruct-Q4_K_M.gguf"),
-            "ctx": 128000,
-            "info": {
-                "fam": "Llama 3.2", "editor": "Meta",
-                "desc": (
-                    "Petit modèle 1B multilingue optimisé pour le dialogue, le résumé, "
-                    "le tool calling léger et les applications embarquées, avec contexte "
-                    "128K. Idéal pour des assistants simples, des agents légers ou du "
-                    "traitement local à faible coût."
-                ),
-                "params_tot": 1.23, "params_act": 1.23,
-                "disk": 0.81, "ram": 3.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt", "hi", "th"],
-                "role_pref": ["assistant_light", "edge_on_device"],
-                "link": "https://huggingface.co/meta-llama/Llama-3.2-1B-Instruct"
-            }
-        },
-        "Llama 3.2 3B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/Llama-3.2-3B-Instruct-GGUF",
-            "filename": "Llama-3.2-3B-Instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Llama-3.2-3B-Instruct-Q4_K_M.gguf"),
-            "ctx": 128000,
-            "info": {
-                "fam": "Llama 3.2", "editor": "Meta",
-                "desc": (
-                    "Modèle 3B multilingue, très équilibré en génération, résumé, "
-                    "raisonnement léger et code, avec contexte 128K. Excellent compromis "
-                    "pour un assistant local généraliste sur GPU ou CPU puissant."
-                ),
-                "params_tot": 3.21, "params_act": 3.21,
-                "disk": 2.02, "ram": 6.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt", "hi", "th"],
-                "role_pref": ["assistant_generalist", "rag", "code"],
-                "link": "https://huggingface.co/meta-llama/Llama-3.2-3B-Instruct"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 Microsoft
-    # =========================================================================
-    "🏠 Microsoft - Phi": {
-        "Phi-3.5 Mini Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/Phi-3.5-mini-instruct-GGUF",
-            "filename": "Phi-3.5-mini-instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Phi-3.5-mini-instruct-Q4_K_M.gguf"),
-            "ctx": 128000,
-            "info": {
-                "fam": "Phi-3.5", "editor": "Microsoft",
-                "desc": (
-                    "Modèle 3.8B très dense en données de raisonnement, contexte 128K. "
-                    "Excellente qualité en logique, maths, explications pas-à-pas et "
-                    "programmation. Particulièrement adapté au tutorat, au RAG analytique "
-                    "et aux cas d’usage éducatifs."
-                ),
-                "params_tot": 3.8, "params_act": 3.8,
-                "disk": 2.39, "ram": 8.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt", "zh"],
-                "role_pref": [
-                    "assistant_generalist",
-                    "reasoning",
-                    "math_stem",
-                    "code",
-                    "educational_tutor",
-                    "rag"
-                ],
-                "link": "https://huggingface.co/microsoft/Phi-3.5-mini-instruct"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 Nvidia
-    # =========================================================================
-    "🏠 Nvidia - AceMath": {
-        "AceMath 1.5B Instruct": {
-            "type": "local",
-            "repo_id": "mradermacher/AceMath-1.5B-Instruct-GGUF",
-            "filename": "AceMath-1.5B-Instruct.Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "AceMath-1.5B-Instruct.Q4_K_M.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "AceMath", "editor": "Nvidia",
-                "desc": (
-                    "Modèle spécialisé en mathématiques et raisonnement STEM, basé sur "
-                    "Qwen 2.5 1.5B. Très bon sur les preuves, problèmes quantitatifs et "
-                    "explications structurées, avec contexte 32K."
-                ),
-                "params_tot": 1.54, "params_act": 1.54,
-                "disk": 1.09, "ram": 4.0,
-                "langs": ["en", "zh", "fr", "de", "es", "it", "pt", "ja", "ko", "ar", "ru"],
-                "role_pref": ["math_stem", "reasoning", "educational_tutor"],
-                "link": "https://huggingface.co/nvidia/AceMath-1.5B-Instruct"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 Salesforce
-    # =========================================================================
-    "🏠 Salesforce - xLAM": {
-        "xLAM-2 1B FC": {
-            "type": "local",
-            "repo_id": "Salesforce/xLAM-2-1b-fc-r-gguf",
-            "filename": "xLAM-2-1B-fc-r-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "xLAM-2-1B-fc-r-Q4_K_M.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "xLAM-2", "editor": "Salesforce",
-                "desc": (
-                    "Modèle 'Large Action Model' 1B spécialisé en function calling (FC). "
-                    "Idéal pour piloter des agents ou des outils API avec une très faible "
-                    "latence et un contexte 32K."
-                ),
-                "params_tot": 1.0, "params_act": 1.0,
-                "disk": 0.98, "ram": 3.5,
-                "langs": ["en"],
-                "role_pref": ["tool_calling", "edge_on_device"],
-                "link": "https://huggingface.co/Salesforce/xLAM-2-1b-fc-r"
-            }
-        }
-    },
-
-    # =========================================================================
-    # 🏠 TII UAE (Falcon)
-    # =========================================================================
-    "🏠 TII UAE - Falcon": {
-        "Falcon 3 1B Instruct": {
+# =========================================================================
+# 🧪 BACKEND SYNTHÉTIQUE (tests de charge / profilage sans GGUF)
+# -------------------------------------------------------------------------
+# Activé par WORKBENCH_SYNTHETIC=1. Débit, TTFT et longueur réglables par variables
+# d'environnement. Aucun téléchargement, aucun calcul : seul le coût de l'application est mesuré.
+# =========================================================================
+if os.getenv("WORKBENCH_SYNTHETIC") == "1":
+    _EXTRA_FAMILIES["🧪 Synthétique"] = {
+        "Synthetic Llama (déterministe)": {
             "type": "local",
-            "repo_id": "bartowski/Falcon3-1B-Instruct-GGUF",
-            "filename": "Falcon3-1B-Instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Falcon3-1B-Instruct-Q4_K_M.gguf"),
+            "backend": "synthetic",
+            "file": "synthetic://default",
             "ctx": 8192,
+            "synthetic": {
+                "tps": float(os.getenv("WORKBENCH_SYNTHETIC_TPS", "60")),
+                "ttft": float(os.getenv("WORKBENCH_SYNTHETIC_TTFT", "0.15")),
+                "output_tokens": int(os.getenv("WORKBENCH_SYNTHETIC_TOKENS", "160"))
+            },
             "info": {
-                "fam": "Falcon 3", "editor": "TII UAE",
-                "desc": (
-                    "Nouvelle génération Falcon (fin 2024). Très léger (1B), optimisé pour "
-                    "l'efficacité et le déploiement edge avec contexte 8K."
-                ),
-                "params_tot": 1.0, "params_act": 1.0,
-                "disk": 0.75, "ram": 3.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt", "ar"],
-                "role_pref": ["assistant_light", "edge_on_device"],
-                "link": "https://huggingface.co/tiiuae/Falcon3-1B-Instruct"
-            }
-        },
-        "Falcon 3 3B Instruct": {
-            "type": "local",
-            "repo_id": "bartowski/Falcon3-3B-Instruct-GGUF",
-            "filename": "Falcon3-3B-Instruct-Q4_K_M.gguf",
-            "file": os.path.join(LOCAL_MODEL_DIR, "Falcon3-3B-Instruct-Q4_K_M.gguf"),
-            "ctx": 32768,
-            "info": {
-                "fam": "Falcon 3", "editor": "TII UAE",
-                "desc": (
-                    "Grand frère du 1B. Modèle 3B performant avec contexte 32K, "
-                    "rivalisant avec Llama 3.2 3B. Bon équilibre vitesse/qualité pour un "
-                    "assistant local généraliste."
-                ),
-                "params_tot": 3.0, "params_act": 3.0,
-                "disk": 2.01, "ram": 6.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt", "ar"],
-                "role_pref": ["assistant_generalist"],
-                "link": "https://huggingface.co/tiiuae/Falcon3-3B-Instruct"
-            }
-        }
-    },
-
-    # =========================================================================
-    # ☁️ API MISTRAL (Cloud)
-    # =========================================================================
-    "☁️ Mistral": {
-        "Mistral Large 3": {
-            "type": "api",
-            "api_id": "mistral-large-latest",
-            "ctx": 256000,
-            "eco_ops": {"kwh_1k_in": 0.0003, "kwh_1k_out": 0.0006, "embodied_g_1k": 0.12},
-            "info": {
-                "fam": "Mistral Large", "editor": "Mistral AI",
-                "desc": (
-                    "Modèle généraliste multimodal SOTA (texte + vision), MoE 675B/41B "
-                    "(675B paramètres totaux, 41B actifs), contexte 256K. "
-                    "Très adapté aux assistants quotidiens haut de gamme, au RAG longue "
-                    "portée (rapports, bases documentaires), à l’agentique (tool calling, "
-                    "workflows) et aux cas d’usage d’entreprise exigeants."
-                ),
-                "params_tot": 675, "params_act": 41,
-                "disk": 0.0, "ram": 0.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": [
-                    "assistant_generalist",
-                    "rag",
-                    "reasoning",
-                    "code",
-                    "tool_calling",
-                    "enterprise"
-                ],
-                "link": "https://docs.mistral.ai/models/mistral-large-3-25-12"
-            }
-        },
-        "Mistral Small 3.2": {
-            "type": "api",
-            "api_id": "mistral-small-latest",
-            "ctx": 128000,
-            "eco_ops": {"kwh_1k_in": 0.00015, "kwh_1k_out": 0.0003, "embodied_g_1k": 0.04},
-            "info": {
-                "fam": "Mistral Small", "editor": "Mistral AI",
-                "desc": (
-                    "Modèle dense 24B multimodal (texte + vision) optimisé pour couvrir "
-                    "~80 % des cas d’usage génériques : chat, rédaction, résumé, RAG, "
-                    "requêtes métier. Contexte 128K, très bon en suivi d’instructions et "
-                    "function calling. Idéal comme 'daily driver' cloud."
-                ),
-                "params_tot": 24, "params_act": 24,
-                "disk": 0.0, "ram": 0.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_generalist", "rag", "code", "tool_calling"],
-                "link": "https://docs.mistral.ai/models/mistral-small-3-2-25-06"
-            }
-        },
-        "Magistral Small 1.2": {
-            "type": "api",
-            "api_id": "magistral-small-latest",
-            "ctx": 128000,
-            "eco_ops": {"kwh_1k_in": 0.00015, "kwh_1k_out": 0.0003, "embodied_g_1k": 0.04},
-            "info": {
-                "fam": "Magistral", "editor": "Mistral AI",
-                "desc": (
-                    "Modèle 24B orienté 'reasoning' (System 2) multimodal, dérivé de "
-                    "Mistral Small 3.2 avec traces de raisonnement (<think>) et "
-                    "entraînement supplémentaire sur des tâches complexes. "
-                    "Particulièrement adapté aux maths, au code, aux problèmes STEM et "
-                    "aux chaînes de raisonnement explicites."
-                ),
-                "params_tot": 24, "params_act": 24,
-                "disk": 0.0, "ram": 0.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["reasoning", "math_stem", "code", "assistant_generalist"],
-                "link": "https://docs.mistral.ai/models/magistral-small-1-2-25-09"
-            }
-        },
-        "Ministral 3 14B": {
-            "type": "api",
-            "api_id": "ministral-14b-latest",
-            "ctx": 256000,
-            "eco_ops": {"kwh_1k_in": 0.00010, "kwh_1k_out": 0.00020, "embodied_g_1k": 0.025},
-            "info": {
-                "fam": "Ministral 3", "editor": "Mistral AI",
-                "desc": (
-                    "Plus grand modèle dense de la famille edge (texte + vision, contexte "
-                    "256K). Offre des performances proches de Mistral Small 3.2 tout en "
-                    "restant conçu pour le déploiement local. Pertinent pour un assistant "
-                    "local multimodal 'haut de gamme', du RAG avancé, du code et des cas "
-                    "métier exigeants avec une ou plusieurs GPUs."
-                ),
-                "params_tot": 14, "params_act": 14,
-                "disk": 0.0, "ram": 0.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_generalist", "rag", "code"],
-                "link": "https://docs.mistral.ai/models/ministral-3-14b-25-12"
-            }
-        },
-        "Ministral 3 8B": {
-            "type": "api",
-            "api_id": "ministral-8b-latest",
-            "ctx": 256000,
-            "eco_ops": {"kwh_1k_in": 0.00008, "kwh_1k_out": 0.00016, "embodied_g_1k": 0.02},
-            "info": {
-                "fam": "Ministral 3", "editor": "Mistral AI",
-                "desc": (
-                    "Modèle edge 8B multimodal, puissant et efficace, pensé pour tourner "
-                    "localement (peut tenir dans ~12 Go de VRAM en FP8, moins en quantisé). "
-                    "Très bon compromis qualité/latence/coût pour un assistant local, du "
-                    "RAG sur documents d’entreprise et des tâches analytiques."
-                ),
-                "params_tot": 8, "params_act": 8,
-                "disk": 0.0, "ram": 0.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_generalist", "rag", "code", "edge_on_device"],
-                "link": "https://docs.mistral.ai/models/ministral-3-8b-25-12"
-            }
-        },
-        "Ministral 3 3B": {
-            "type": "api",
-            "api_id": "ministral-3b-latest",
-            "ctx": 256000,
-            "eco_ops": {"kwh_1k_in": 0.00005, "kwh_1k_out": 0.00010, "embodied_g_1k": 0.01},
-            "info": {
-                "fam": "Ministral 3", "editor": "Mistral AI",
+                "fam": "Synthétique", "editor": "Workbench",
                 "desc": (
-                    "Plus petit modèle dense de la famille edge, multimodal (texte + vision) "
-                    "et contexte long (256K). Conçu pour environnements très contraints "
-                    "(edge devices, petits serveurs) pour de la conversation légère, "
-                    "de la classification, du résumé court, du routage et des agents simples."
+                    "Faux modèle déterministe imitant llama.cpp (streaming, log-probs). "
+                    "Sert à profiler l'interface et à tester la montée en charge sans modèle installé."
                 ),
-                "params_tot": 3, "params_act": 3,
+                "params_tot": 0.0, "params_act": 0.0,
                 "disk": 0.0, "ram": 0.0,
-                "langs": ["en", "fr", "de", "es", "it", "pt"],
-                "role_pref": ["assistant_light", "routing_classification", "edge_on_device"],
-                "link": "https://docs.mistral.ai/models/ministral-3-3b-25-12"
+                "langs": ["fr", "en"],
+                "role_pref": ["assistant_light", "routing_classification"],
+                "link": ""
             }
         }
     }
-}
 
+
+# =========================================================================
+# 📚 CATALOGUE
+# -------------------------------------------------------------------------
+# CATALOG : entrées typées + requêtes (type, rôle, langue, budget RAM / disque).
+# MODELS_DB : vue {famille: {variante: conf}} conservée pour le code existant.
+# =========================================================================
+CATALOG = load_catalog(CATALOG_PATH, model_dir=LOCAL_MODEL_DIR, extra=_EXTRA_FAMILIES)
+MODELS_DB = CATALOG.to_models_db()
@@ -1,19 +1,34 @@
 #!/usr/bin/env python3
 """
 Script de téléchargement de modèles GGUF pour Wavestone Local AI Workbench.
-Lit la configuration directement depuis models_config.py.
+Lit la configuration directement depuis models_config.py (catalogue : config/models_catalog.json).
+
+Les fichiers sont téléchargés en parallèle (DOWNLOAD_SETTINGS["max_workers"], ou --workers),
+avec reprise sur fichier `.part`, un plafond de bande passante optionnel partagé par tous les
+téléchargements (--max-rate) et un suivi global : progression, débit, ETA par fichier.
+
+Intégrité : chaque fichier est haché (SHA-256) pendant sa réception et comparé à l'empreinte
+LFS publiée par le Hub ; les fichiers déjà présents sont vérifiés via le manifeste local
+(modules/model_integrity.py), sans relecture s'ils n'ont pas changé. `--verify` ne fait que vérifier.
 """
 
 import os
+import time
+import hashlib
 import argparse
 import sys
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from huggingface_hub import hf_hub_download, HfApi
+from huggingface_hub import HfApi, hf_hub_url, get_hf_file_metadata
+from huggingface_hub.utils import build_hf_headers
 import logging
 
 # ✅ IMPORT DE LA CONFIGURATION PYTHON
 try:
-    from config.models_config import MODELS_DB, DOWNLOAD_SETTINGS
+    from config.models_config import CATALOG, DOWNLOAD_SETTINGS, SEMANTIC_CACHE_SETTINGS
+    from modules.model_integrity import HashManifest, sha256_stream, upstream_sha256, verify_file, status_of, OK, MISMATCH, UNVERIFIED
 except ImportError:
     print("❌ Erreur : Impossible d'importer 'models_config.py'. Vérifiez qu'il est dans le même dossier.")
     sys.exit(1)
@@ -25,6 +40,109 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+GB = 1024 * MB
+# Ctrl+C : les workers s'arrêtent au bloc suivant (le `.part` permet de reprendre plus tard)
+CANCEL = threading.Event()
+
+
+def _fmt_eta(seconds):
+    if seconds is None: return "--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}" if seconds >= 3600 else f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class BandwidthLimiter:
+    """Seau à jetons partagé : le débit cumulé de tous les téléchargements reste sous `rate` octets/s."""
+
+    def __init__(self, rate):
+        self.rate = rate  # None ou 0 : pas de plafond
+        self.tokens = 0  # Seau vide au départ : pas de rafale au-dessus du plafond
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n):
+        if not self.rate: return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n
+            # Dette de jetons → attente proportionnelle (hors verrou : les autres workers avancent)
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0: time.sleep(wait)
+
+
+class DownloadProgress:
+    """Suivi global thread-safe : octets reçus par fichier, affichage périodique (débit, ETA par fichier)."""
+
+    def __init__(self, interval):
+        self.files = {}  # nom → {"total", "done", "resumed", "start", "end"}
+        self.lock = threading.Lock()
+        self.interval = interval
+        self.t0 = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def begin(self, name, total, resumed=0):
+        with self.lock:
+            self.files[name] = {"total": total, "done": resumed, "resumed": resumed, "start": time.monotonic(), "end": None}
+
+    def advance(self, name, n):
+        with self.lock:
+            self.files[name]["done"] += n
+
+    def finish(self, name):
+        with self.lock:
+            if name in self.files: self.files[name]["end"] = time.monotonic()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def report(self):
+        """Une ligne globale puis une ligne par fichier en cours (débit propre, ETA)."""
+        now = time.monotonic()
+        with self.lock:
+            files = {name: dict(f) for name, f in self.files.items()}
+        if not files: return
+        total = sum(f["total"] for f in files.values())
+        done = sum(f["done"] for f in files.values())
+        received = sum(f["done"] - f["resumed"] for f in files.values())
+        rate = received / max(now - self.t0, 1e-6)
+        active = sum(1 for f in files.values() if f["end"] is None)
+        logger.info(
+            f"📊 {len(files) - active} terminé(s), {active} en cours | {done / GB:.2f}/{total / GB:.2f} Go | "
+            f"{rate / MB:.1f} Mo/s | ETA fichiers en cours {_fmt_eta((total - done) / rate if rate > 0 else None)}"
+        )
+        for name, f in files.items():
+            if f["end"] is not None: continue
+            file_rate = (f["done"] - f["resumed"]) / max(now - f["start"], 1e-6)
+            eta = (f["total"] - f["done"]) / file_rate if file_rate > 0 else None
+            pct = 100.0 * f["done"] / f["total"] if f["total"] else 100.0
+            logger.info(f"    ├── {name[:48]:<48} {pct:5.1f}% | {file_rate / MB:6.1f} Mo/s | ETA {_fmt_eta(eta)}")
+
+    def summary(self):
+        """Octets reçus pendant cette session, durée totale et débit moyen, détail par fichier."""
+        with self.lock:
+            files = {name: dict(f) for name, f in self.files.items()}
+        wall = time.monotonic() - self.t0
+        per_file = []
+        for name, f in files.items():
+            received = f["done"] - f["resumed"]
+            duration = (f["end"] or time.monotonic()) - f["start"]
+            if received: per_file.append((name, received, duration, received / max(duration, 1e-6)))
+        received = sum(p[1] for p in per_file)
+        return {"received": received, "wall": wall, "rate": received / max(wall, 1e-6), "files": per_file}
+
+
 def check_model_availability(repo_id, filename):
     """Vérifie si le modèle existe sur HF sans le télécharger (Dry Run)"""
     api = HfApi()
@@ -36,60 +154,118 @@ def check_model_availability(repo_id, filename):
         logger.error(f"    └── ⚠️ Erreur d'accès API: {e}")
         return False
 
-def download_gguf_model(model_name, model_conf, local_dir, force=False, dry_run=False):
+
+def fetch_file(url, target_path, total, name, progress, limiter, resume=True, chunk_size=MB):
+    """
+    Télécharge `url` vers `target_path` via un fichier `.part` (reprise par en-tête Range),
+    renommé seulement si la taille reçue correspond à `total`.
+    Le SHA-256 est calculé au fil de l'eau (préfixe repris relu une fois) : retourne (chemin, sha256).
+    """
+    part_path = f"{target_path}.part"
+    offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+    if offset > total: offset = 0
+
+    progress.begin(name, total, offset)
+    try:
+        hasher = sha256_stream(part_path, limit=offset) if offset else hashlib.sha256()
+        if offset < total:
+            headers = build_hf_headers()
+            if offset: headers["Range"] = f"bytes={offset}-"
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60) as resp:
+                if offset and resp.status != 206:  # Serveur sans reprise : on repart de zéro
+                    offset = 0
+                    hasher = hashlib.sha256()
+                    progress.begin(name, total, 0)
+                with open(part_path, "ab" if offset else "wb") as f:
+                    while True:
+                        if CANCEL.is_set(): raise InterruptedError("interrompu")
+                        block = resp.read(chunk_size)
+                        if not block: break
+                        limiter.consume(len(block))
+                        f.write(block)
+                        hasher.update(block)
+                        progress.advance(name, len(block))
+
+        size = os.path.getsize(part_path)
+        if size != total:
+            raise IOError(f"taille reçue {size} octets, attendu {total} (relancez pour reprendre)")
+        os.replace(part_path, target_path)
+        return target_path, hasher.hexdigest()
+    finally:
+        progress.finish(name)
+
+
+def download_gguf_model(model_name, model_conf, local_dir, force=False, dry_run=False, progress=None, limiter=None,
+                        manifest=None, verify_only=False, offline=False, rehashed_files=None):
     """
     Gère la logique de téléchargement ou de vérification d'un modèle.
+    Exécuté dans un worker : une ligne de log par étape, préfixée par le nom du modèle.
+    `rehashed_files` (liste partagée) reçoit les fichiers relus pendant la vérification.
     """
     repo_id = model_conf.get('repo_id')
     filename = model_conf.get('filename')
-    
+
     if not repo_id or not filename:
         logger.warning(f"⚠️ Configuration incomplète pour {model_name} (repo_id ou filename manquant)")
         return None
-    
+
     target_path = os.path.join(local_dir, filename)
-    
-    logger.info(f"🤖 {model_name}")
-    logger.info(f"    ├── Repo: {repo_id}")
-    logger.info(f"    └── File: {filename}")
 
     # --- MODE DRY RUN (Test de connexion) ---
     if dry_run:
-        logger.info("    ├── 🧪 Mode Test (Dry Run)...")
-        is_available = check_model_availability(repo_id, filename)
-        if is_available:
-            logger.info("    └── ✅ DISPONIBLE (Connexion OK)")
+        if check_model_availability(repo_id, filename):
+            logger.info(f"✅ DISPONIBLE   {model_name} ({repo_id}/{filename})")
             return "dry_run_ok"
-        else:
-            logger.error("    └── ❌ INACCESSIBLE (Vérifier nom ou token)")
-            return None
+        logger.error(f"❌ INACCESSIBLE {model_name} ({repo_id}/{filename}) : vérifier nom ou token")
+        return None
+
+    if verify_only and not os.path.exists(target_path):
+        logger.info(f"∅  ABSENT       {model_name}")
+        return None
+
+    # SHA-256 attendu : celui du manifeste en vérification / hors ligne, le Hub n'est interrogé
+    # que s'il manque (ou avant un téléchargement, pour suivre une éventuelle nouvelle révision)
+    expected = manifest.expected(target_path) if (verify_only or offline) else None
+    if not expected and not offline:
+        expected = upstream_sha256(repo_id, filename)
 
-    # --- MODE TÉLÉCHARGEMENT ---
-    
-    # 1. Vérification de l'existant
+    # 1. Vérification de l'existant : empreinte comparée à l'amont (relecture seulement si le fichier a changé)
     if os.path.exists(target_path) and not force:
-        file_size_mb = os.path.getsize(target_path) / (1024 * 1024)
-        logger.info(f"    ├── ⏭️  DÉJÀ PRÉSENT ({file_size_mb:.1f} MB)")
-        logger.info(f"    └── 📍 {target_path}")
-        return target_path
+        status, _, rehashed = verify_file(target_path, manifest, expected)
+        if rehashed and rehashed_files is not None: rehashed_files.append(target_path)
+        file_size_mb = os.path.getsize(target_path) / MB
+        origin = "haché" if rehashed else "manifeste"
+        if status == OK:
+            logger.info(f"✅ VÉRIFIÉ      {model_name} ({file_size_mb:.1f} MB, SHA-256 conforme, {origin})")
+            return target_path
+        if status == UNVERIFIED:
+            logger.warning(f"⚠️  NON VÉRIFIÉ {model_name} ({file_size_mb:.1f} MB, pas d'empreinte amont disponible)")
+            return target_path
+        logger.error(f"❌ CORROMPU     {model_name} ({file_size_mb:.1f} MB, SHA-256 différent de l'amont)")
+        if verify_only: return None
+        os.remove(target_path)
+        manifest.forget(target_path)
 
-    # 2. Téléchargement réel
+    # 2. Téléchargement réel (URL résolue et taille exacte via les métadonnées du Hub)
     try:
-        logger.info("    ├── 🚀 Démarrage du téléchargement...")
-        
-        file_path = hf_hub_download(
-            repo_id=repo_id,
-            filename=filename,
-            local_dir=local_dir,
-            local_dir_use_symlinks=False,
-            resume_download=True
+        meta = get_hf_file_metadata(hf_hub_url(repo_id=repo_id, filename=filename))
+        logger.info(f"🚀 DÉMARRAGE    {model_name} ({meta.size / MB:.0f} MB)")
+        _, sha256 = fetch_file(
+            meta.location, target_path, meta.size, model_name, progress, limiter,
+            resume=DOWNLOAD_SETTINGS.get("resume_download", True) and not force,
+            chunk_size=DOWNLOAD_SETTINGS.get("chunk_kb", 1024) * 1024
         )
-        
-        logger.info("    └── ✅ TÉLÉCHARGEMENT TERMINÉ")
-        return file_path
-        
+        if expected and sha256 != expected:
+            # Fichier reçu complet mais altéré : supprimé pour ne jamais être chargé
+            os.remove(target_path)
+            manifest.forget(target_path)
+            raise IOError(f"SHA-256 reçu {sha256[:12]}… ≠ attendu {expected[:12]}… (fichier supprimé, relancez)")
+        manifest.record(target_path, sha256, expected)
+        logger.info(f"✅ TERMINÉ      {model_name} → {target_path} ({'SHA-256 conforme' if expected else 'SHA-256 non vérifiable'})")
+        return target_path
+
     except Exception as e:
-        logger.error(f"    └── ❌ ERREUR: {str(e)}")
+        logger.error(f"❌ ERREUR       {model_name} : {str(e)}")
         return None
 
 def main():
@@ -97,59 +273,96 @@ def main():
     parser = argparse.ArgumentParser(description="Téléchargeur de modèles GGUF Wavestone Workbench")
     parser.add_argument("--dry-run", action="store_true", help="Vérifie uniquement l'accès aux fichiers sans télécharger")
     parser.add_argument("--force", action="store_true", help="Force le re-téléchargement même si le fichier existe")
+    parser.add_argument("--verify", action="store_true", help="Vérifie l'intégrité (SHA-256) des fichiers présents sans rien télécharger")
+    parser.add_argument("--offline", action="store_true", help="N'interroge pas le Hub : empreintes attendues lues dans le manifeste")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_SETTINGS.get("max_workers", 2), help="Téléchargements simultanés")
+    parser.add_argument("--max-rate", type=float, default=DOWNLOAD_SETTINGS.get("max_bandwidth_mbps"),
+                        help="Plafond de bande passante total, en Mo/s (défaut : aucun)")
     args = parser.parse_args()
 
     # 1. Charger les settings depuis la config Python
     local_dir = DOWNLOAD_SETTINGS.get('local_dir', './models_gguf')
     Path(local_dir).mkdir(parents=True, exist_ok=True)
 
-    # 2. Convertir MODELS_DB (structure imbriquée) en une liste plate pour le téléchargement
-    models_to_download = []
-    
-    for family, variants in MODELS_DB.items():
-        for model_variant, config in variants.items():
-            # On ne traite que les modèles de type "local"
-            if config.get("type") == "local":
-                # On injecte le nom du variant pour l'affichage
-                # On crée une copie pour ne pas modifier le dictionnaire original en mémoire
-                download_item = config.copy()
-                download_item['name'] = f"{family} - {model_variant}"
-                models_to_download.append(download_item)
+    # 2. Liste plate des GGUF du catalogue (hors backend synthétique : rien à télécharger)
+    models_to_download = [
+        # Copie de la conf avec le nom affiché : le catalogue partagé n'est pas modifié
+        dict(entry.conf, name=f"{entry.family} - {entry.name}")
+        for entry in CATALOG.query(type="local")
+        if entry.backend != "synthetic"
+    ]
+
+    # Modèle d'embedding du cache sémantique (hors catalogue de chat)
+    embedding_conf = SEMANTIC_CACHE_SETTINGS.get("embedding")
+    if SEMANTIC_CACHE_SETTINGS.get("enabled") and embedding_conf:
+        models_to_download.append(dict(embedding_conf, name="🧠 Embedding (cache sémantique)"))
+
+    # Plus gros d'abord : les petits fichiers comblent la fin du lot au lieu de laisser un worker seul
+    models_to_download.sort(key=lambda conf: conf.get("info", {}).get("disk", 0), reverse=True)
+    workers = max(1, args.workers)
 
     # Header
-    mode_str = "🧪 MODE TEST (DRY RUN)" if args.dry_run else "⬇️  MODE TÉLÉCHARGEMENT"
+    mode_str = "🧪 MODE TEST (DRY RUN)" if args.dry_run else "🔐 MODE VÉRIFICATION" if args.verify else "⬇️  MODE TÉLÉCHARGEMENT"
     logger.info("=" * 60)
     logger.info(f"📦 WAVESTONE LOCAL AI WORKBENCH - MODEL DOWNLOADER")
     logger.info(f"{mode_str}")
     logger.info(f"📂 Destination: {local_dir}")
     logger.info(f"🔢 Modèles locaux identifiés: {len(models_to_download)}")
+    logger.info(f"🧵 Téléchargements simultanés: {workers} | Plafond: {f'{args.max_rate:g} Mo/s' if args.max_rate else 'aucun'}")
     logger.info("=" * 60 + "\n")
 
     success_count = 0
-    
+
     if not models_to_download:
-        logger.warning("⚠️ Aucun modèle local trouvé dans models_config.py.")
+        logger.warning("⚠️ Aucun modèle local trouvé dans config/models_catalog.json.")
         return
 
-    for i, model_conf in enumerate(models_to_download, 1):
-        logger.info(f"[{i}/{len(models_to_download)}]")
-        result = download_gguf_model(
-            model_name=model_conf['name'], 
-            model_conf=model_conf, 
-            local_dir=local_dir, 
-            force=args.force, 
-            dry_run=args.dry_run
-        )
-        
-        if result:
-            success_count += 1
-        logger.info("-" * 60)
+    progress = DownloadProgress(DOWNLOAD_SETTINGS.get("progress_interval_s", 5))
+    limiter = BandwidthLimiter(args.max_rate * MB if args.max_rate else None)
+    manifest = HashManifest()
+    started_at = time.time()
+    rehashed_files = []
+    show_progress = not (args.dry_run or args.verify)
+    if show_progress: progress.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gguf-dl") as pool:
+            futures = [
+                pool.submit(download_gguf_model, model_conf['name'], model_conf, local_dir,
+                            args.force, args.dry_run, progress, limiter, manifest, args.verify, args.offline, rehashed_files)
+                for model_conf in models_to_download
+            ]
+            try:
+                for future in as_completed(futures):
+                    if future.result():
+                        success_count += 1
+            except KeyboardInterrupt:
+                CANCEL.set()
+                pool.shutdown(cancel_futures=True)
+                raise
+    finally:
+        if show_progress: progress.stop()
 
     # Résumé
     logger.info("\n" + "=" * 60)
     if args.dry_run:
         logger.info(f"📋 RÉSULTAT DU TEST: {success_count}/{len(models_to_download)} modèles accessibles")
+    elif args.verify:
+        # Statuts relus dans le manifeste (aucun nouveau hachage)
+        entries = [manifest.lookup(os.path.join(local_dir, conf["filename"])) for conf in models_to_download if conf.get("filename")]
+        statuses = [status_of(e) for e in entries if e]
+        rehashed = len(rehashed_files)
+        logger.info(
+            f"🔐 INTÉGRITÉ: {statuses.count(OK)} conformes, {statuses.count(UNVERIFIED)} non vérifiables, "
+            f"{statuses.count(MISMATCH)} corrompus, {len(models_to_download) - len(statuses)} absents "
+            f"| {rehashed} fichier(s) relu(s), les autres via le manifeste ({_fmt_eta(time.time() - started_at)})"
+        )
+        if statuses.count(MISMATCH):
+            logger.info("👉 Relancez sans --verify pour re-télécharger les fichiers corrompus.")
     else:
+        stats = progress.summary()
+        for name, received, duration, rate in sorted(stats["files"], key=lambda f: -f[1]):
+            logger.info(f"    ├── {name[:48]:<48} {received / MB:8.0f} MB en {_fmt_eta(duration):>7} ({rate / MB:.1f} Mo/s)")
+        logger.info(f"📶 Débit global: {stats['received'] / GB:.2f} Go reçus en {_fmt_eta(stats['wall'])} ({stats['rate'] / MB:.1f} Mo/s)")
         logger.info(f"📋 RÉSULTAT FINAL: {success_count}/{len(models_to_download)} modèles prêts")
         if success_count == len(models_to_download):
             logger.info("\n🎉 Tout est prêt ! Vous pouvez lancer: streamlit run app.py")
@@ -159,4 +372,4 @@ if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        logger.info("\n🛑 Interrompu par l'utilisateur")
\ No newline at end of file
+        logger.info("\n🛑 Interrompu par l'utilisateur")
@@ -0,0 +1,142 @@
+"""
+Client API Mistral mutualisé : une boucle asyncio dédiée (thread daemon) et un client par
+clé API, réutilisés entre les reruns Streamlit et entre les threads de travail.
+
+- Les connexions HTTPS (pool httpx) sont conservées : pas de nouvelle poignée de main TLS
+  à chaque requête, le premier token arrive plus vite.
+- Tous les streams concurrents (lots, comparaisons) sont multiplexés sur la même boucle.
+- Les erreurs 429 / 5xx survenant avant le premier token sont rejouées avec un backoff
+  exponentiel (en-tête Retry-After respecté).
+- `server_url` (ou la variable d'environnement MISTRAL_SERVER_URL) permet de cibler un
+  serveur de test local.
+"""
+import queue
+import random
+import asyncio
+import hashlib
+import threading
+
+from config.models_config import API_CLIENT_SETTINGS
+
+from modules.optional_deps import HAS_MISTRAL_LIB  # SDK importé à la création du premier client
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_DONE = object()
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _status_of(exc):
+    """Code HTTP d'une erreur SDK / httpx (None si inconnu)."""
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = getattr(exc.response, "status_code", None)
+    return status
+
+
+def _retry_after(exc):
+    response = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class ApiClientPool:
+    """Boucle asyncio partagée + clients Mistral (un par clé API)."""
+
+    def __init__(self, server_url=None, settings=None):
+        self.settings = dict(API_CLIENT_SETTINGS, **(settings or {}))
+        self.server_url = server_url or self.settings["server_url"]
+        self._clients = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mistral-api-loop", daemon=True)
+        self._thread.start()
+        self.metrics = {"requests": 0, "retries": 0, "clients": 0}
+
+    def _client(self, api_key):
+        """Client (et pool de connexions) propre à une clé ; créé dans la boucle au premier usage."""
+        key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        if key not in self._clients:
+            import httpx
+            from mistralai import Mistral
+            s = self.settings
+            http = httpx.AsyncClient(
+                timeout=httpx.Timeout(s["timeout_s"], connect=10.0),
+                limits=httpx.Limits(max_connections=s["max_connections"], max_keepalive_connections=s["max_connections"])
+            )
+            kwargs = {"api_key": api_key, "async_client": http}
+            if self.server_url: kwargs["server_url"] = self.server_url
+            self._clients[key] = Mistral(**kwargs)
+            self.metrics["clients"] += 1
+        return self._clients[key]
+
+    async def astream_chat(self, api_key, **params):
+        """
+        Générateur asynchrone : produit ("delta", texte) puis ("usage", prompt_tokens, completion_tokens).
+        Les erreurs réessayables avant le premier token déclenchent un backoff exponentiel.
+        """
+        import httpx
+        s = self.settings
+        client = self._client(api_key)
+        self.metrics["requests"] += 1
+        for attempt in range(s["max_retries"] + 1):
+            started = False
+            try:
+                stream = await client.chat.stream_async(**params)
+                async for chunk in stream:
+                    data = chunk.data
+                    if data.choices:
+                        content = data.choices[0].delta.content
+                        if content:
+                            started = True
+                            yield ("delta", content)
+                    if getattr(data, "usage", None):
+                        yield ("usage", data.usage.prompt_tokens, data.usage.completion_tokens)
+                return
+            except Exception as e:
+                status = _status_of(e)
+                retryable = status in RETRYABLE_STATUS or isinstance(e, (httpx.ConnectError, httpx.ReadTimeout))
+                if started or not retryable or attempt == s["max_retries"]:
+                    raise
+                self.metrics["retries"] += 1
+                delay = _retry_after(e) or min(s["backoff_base_s"] * 2 ** attempt, s["backoff_max_s"])
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))  # Jitter : évite les rafales synchronisées
+
+    def stream_chat(self, api_key, on_delta, **params):
+        """
+        Façade synchrone (threads Streamlit / workers) : `on_delta(texte)` est appelé dans le
+        thread appelant. Retourne (prompt_tokens, completion_tokens) ou (None, None).
+        """
+        events = queue.Queue()
+
+        async def _pump():
+            try:
+                async for event in self.astream_chat(api_key, **params):
+                    events.put(event)
+            except Exception as e:
+                events.put(("error", e))
+            finally:
+                events.put(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(_pump(), self._loop)
+        usage = (None, None)
+        try:
+            while (event := events.get()) is not _DONE:
+                if event[0] == "delta": on_delta(event[1])
+                elif event[0] == "usage": usage = event[1:]
+                else: raise event[1]
+        finally:
+            # Consommateur interrompu (exception dans on_delta, arrêt du rerun) : le flux HTTP est fermé
+            future.cancel()
+        return usage
+
+
+def get_api_pool():
+    """Pool partagé par le processus (survit aux reruns Streamlit)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ApiClientPool()
+        return _POOL
@@ -0,0 +1,157 @@
+"""
+Traduction par lot d'un document vers plusieurs langues cibles en parallèle.
+
+Le document est segmenté une seule fois. Pour chaque langue, les segments absents de la
+mémoire de traduction sont découpés en lots, placés dans une file de travail commune,
+puis consommés simultanément par les workers disponibles : le modèle local (un worker,
+llama.cpp étant sérialisé) et, en option, l'API Mistral (plusieurs workers).
+Une langue terminée est immédiatement réassemblée et écrite sur disque.
+"""
+import os
+import time
+import queue
+import threading
+
+from modules.response_cache import model_identity
+from modules.translation import segment_text, translate_missing, _batches
+from modules.utils import count_tokens_approx, effective_ctx, start_energy_tracker, stop_energy_tracker
+
+LANG_CODES = {"Anglais": "en", "Espagnol": "es", "Allemand": "de", "Chinois": "zh", "Italien": "it"}
+
+
+class _CallLog:
+    """Adaptateur `.add(res)` (interface JobMeter) qui trace les appels d'un worker pour une langue."""
+
+    def __init__(self, stats, worker_type, lock):
+        self.stats, self.worker_type, self.lock = stats, worker_type, lock
+
+    def add(self, res):
+        with self.lock:
+            self.stats["calls"] += 1
+            self.stats["input_tokens"] += res["input_tokens"]
+            self.stats["output_tokens"] += res["output_tokens"]
+            self.stats["energy_kwh"] += res["energy_kwh"]
+            self.stats["co2_g"] += res["co2_g"]
+            if self.worker_type == "local":
+                self.stats["local_busy_s"] += res["duration"]
+
+
+def batch_translate(text, langs, sys_prompt_tpl, workers, tm, output_path_tpl=None, on_event=None):
+    """
+    - `langs` : libellés de langues cibles ("Anglais", ...).
+    - `sys_prompt_tpl` : prompt système avec `{lang}`.
+    - `workers` : liste de dicts {"label", "gen_kwargs", "concurrency"}.
+    - `output_path_tpl` : chemin avec `{code}` ; chaque langue terminée y est écrite.
+    - `on_event(type, lang, payload)` : appelé depuis le thread appelant ("progress", "done", "error").
+    Retourne {langue: stats} (texte, débit, énergie, fichier...).
+    """
+    segments = segment_text(text)
+    unique = list(dict.fromkeys(seg for seg, _ in segments if seg.strip()))
+    stats_lock = threading.Lock()
+    events = queue.Queue()
+    tasks = queue.Queue()
+
+    # --- 1. MÉMOIRE DE TRADUCTION (toute traduction connue d'un des modèles engagés est réutilisée) ---
+    model_ids = [model_identity(w["gen_kwargs"]["model_conf"]) for w in workers]
+    budget = min(
+        max(min((effective_ctx(w["gen_kwargs"]["model_conf"]) - count_tokens_approx(sys_prompt_tpl)) // 2,
+                w["gen_kwargs"].get("max_tokens", 1024)), 128)
+        for w in workers
+    )
+    results = {}
+    start = time.time()
+    for lang in langs:
+        known = {}
+        for model_id in model_ids:
+            known.update({s: t for s, t in tm.lookup_many(unique, lang, model_id).items() if s not in known})
+        misses = [s for s in unique if s not in known]
+        batches = _batches(misses, budget)
+        results[lang] = {
+            "translations": known, "tm_hits": len(known), "to_translate": len(misses),
+            "pending_batches": len(batches), "done_segments": 0, "calls": 0,
+            "input_tokens": 0, "output_tokens": 0, "energy_kwh": 0.0, "co2_g": 0.0,
+            "local_busy_s": 0.0, "duration": 0.0, "error": None, "path": None, "text": ""
+        }
+        # Ordre langue par langue : les premières langues se terminent (et s'écrivent) au plus tôt
+        for batch in batches: tasks.put((lang, batch))
+
+    # --- 2. WORKERS (file de travail partagée : le plus rapide prend le lot suivant) ---
+    def _worker(worker):
+        gen_kwargs = worker["gen_kwargs"]
+        worker_type, model_id = gen_kwargs["model_type"], model_identity(gen_kwargs["model_conf"])
+        while True:
+            try:
+                lang, batch = tasks.get_nowait()
+            except queue.Empty:
+                return
+            stats = results[lang]
+            try:
+                if stats["error"]: raise RuntimeError(stats["error"])
+                fresh = translate_missing(
+                    batch, lang, sys_prompt_tpl.format(lang=lang), gen_kwargs,
+                    _CallLog(stats, worker_type, stats_lock)
+                )
+                tm.store_many(fresh.items(), lang, model_id)
+                with stats_lock:
+                    stats["translations"].update(fresh)
+                    stats["done_segments"] += len(batch)
+                events.put(("progress", lang, worker["label"]))
+            except Exception as e:
+                with stats_lock: stats["error"] = stats["error"] or str(e)
+                events.put(("progress", lang, worker["label"]))
+            finally:
+                with stats_lock: stats["pending_batches"] -= 1
+
+    tracker = start_energy_tracker() if any(w["gen_kwargs"]["model_type"] == "local" for w in workers) else None
+    threads = [
+        threading.Thread(target=_worker, args=(w,), daemon=True)
+        for w in workers for _ in range(max(1, w["concurrency"]))
+    ]
+    for t in threads: t.start()
+
+    # --- 3. BOUCLE DU THREAD APPELANT : progression + finalisation des langues terminées ---
+    finished = set()
+
+    def _finalize_ready():
+        for lang in langs:
+            stats = results[lang]
+            if lang in finished or stats["pending_batches"] > 0: continue
+            finished.add(lang)
+            stats["duration"] = time.time() - start
+            trans = stats["translations"]
+            stats["text"] = "".join((trans.get(seg, seg) if seg.strip() else seg) + sep for seg, sep in segments)
+            if output_path_tpl and not stats["error"]:
+                path = output_path_tpl.format(code=LANG_CODES.get(lang, lang.lower()))
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f: f.write(stats["text"])
+                stats["path"] = path
+            if on_event: on_event("error" if stats["error"] else "done", lang, stats)
+
+    _finalize_ready()  # Langues entièrement servies par la mémoire de traduction
+    while len(finished) < len(langs):
+        try:
+            kind, lang, payload = events.get(timeout=0.2)
+            if on_event: on_event(kind, lang, results[lang])
+        except queue.Empty:
+            if not any(t.is_alive() for t in threads) and events.empty():
+                # Sécurité : plus aucun worker, on clôt ce qui reste
+                for stats in results.values(): stats["pending_batches"] = 0
+        _finalize_ready()
+    for t in threads: t.join()
+
+    # --- 4. BILAN GREEN IT PAR LANGUE ---
+    # L'énergie CPU mesurée globalement est répartie au prorata du temps d'occupation du modèle local
+    cpu_energy_kwh = stop_energy_tracker(tracker)
+    total_busy = sum(s["local_busy_s"] for s in results.values())
+    local_workers = [w for w in workers if w["gen_kwargs"]["model_type"] == "local"]
+    for stats in results.values():
+        if local_workers and total_busy > 0 and stats["local_busy_s"] > 0:
+            share = stats["local_busy_s"] / total_busy
+            lw = local_workers[0]["gen_kwargs"]
+            cpu_kwh = cpu_energy_kwh * share
+            stats["energy_kwh"] += cpu_kwh
+            stats["co2_g"] += cpu_kwh * lw.get("carbon_intensity", 475.0)
+        duration = max(stats["duration"], 1e-6)
+        stats["segments_per_s"] = len(unique) / duration
+        stats["tokens_per_s"] = stats["output_tokens"] / duration
+    return results
@@ -0,0 +1,147 @@
+"""
+Intensité carbone de l'électricité par pays (Our World in Data).
+
+Les données OWID (~5 700 lignes, toutes les années) sont lues en streaming directement dans
+l'archive `.zip` du data package (pas de CSV extrait sur disque), en ne convertissant que les
+colonnes utiles avec un type explicite. Le schéma est validé à la compilation, puis le résultat
+est stocké en un index JSON compact : dernière année disponible par pays, triée par nom.
+L'index porte la signature (taille, mtime) de la source et n'est reconstruit que si celle-ci
+change (mise à jour via scripts/update_carbon_data.py). Aucune dépendance à pandas.
+
+`what_if_matrix` recalcule l'empreinte d'inférences déjà mesurées pour tous les pays à la fois.
+"""
+import io
+import os
+import csv
+import json
+import zipfile
+
+from config.models_config import CARBON_SETTINGS
+
+INDEX_VERSION = 2
+DEFAULT_CARBON_DB = {"France": {"val": 56, "year": 2023, "code": "FRA"}}
+# Colonne intensité : nouveau format API, puis ancien format CSV manuel
+INTENSITY_COLUMNS = ["co2_intensity__gco2_kwh", "Carbon intensity of electricity - gCO2/kWh"]
+# Colonnes projetées et leur type ; les autres colonnes (futures séries OWID) sont ignorées
+SCHEMA = {"country": str, "code": str, "year": int, "intensity": float}
+
+
+def source_path():
+    """Archive du data package si présente, sinon CSV extrait (ancien format)."""
+    zip_path = CARBON_SETTINGS["zip_path"]
+    return zip_path if os.path.exists(zip_path) else CARBON_SETTINGS["csv_path"]
+
+
+def source_signature(path=None):
+    """(taille, mtime_ns) de la source, None si elle est absente."""
+    try:
+        st = os.stat(path or source_path())
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _intensity_column(columns):
+    col = next((c for c in INTENSITY_COLUMNS if c in columns), None)
+    # Sinon, recherche plus large (insensible à la casse)
+    return col or next((c for c in columns if "gco2" in c.lower() or "intensity" in c.lower()), None)
+
+
+def resolve_schema(header):
+    """
+    Validation du schéma (une fois par compilation) : position de chaque colonne projetée.
+    Lève ValueError si une colonne obligatoire manque.
+    """
+    positions = {
+        "country": next((header.index(c) for c in ("Entity", "Country") if c in header), None),
+        "code": header.index("Code") if "Code" in header else None,
+        "year": header.index("Year") if "Year" in header else None,
+        "intensity": header.index(_intensity_column(header)) if _intensity_column(header) else None,
+    }
+    missing = [name for name in ("country", "intensity") if positions[name] is None]
+    if missing:
+        raise ValueError(f"Schéma carbone invalide, colonnes manquantes : {', '.join(missing)} (en-tête : {header})")
+    return positions
+
+
+def compile_rows(header, rows):
+    """Lignes OWID → [[pays, intensité, année, code], ...] : dernière année par pays, tri par nom."""
+    positions = resolve_schema(header)
+    projected = [(name, pos, SCHEMA[name]) for name, pos in positions.items() if pos is not None]
+    latest = {}
+    for row in rows:
+        rec = {name: cast(row[pos]) if pos < len(row) and row[pos] != "" else None for name, pos, cast in projected}
+        if rec["intensity"] is None: continue
+        country, year = rec["country"], rec.get("year") or 2024
+        if country not in latest or year > latest[country][2]:
+            latest[country] = [country, rec["intensity"], year, rec.get("code") or ""]
+    return [latest[c] for c in sorted(latest)]
+
+
+def _open_source(path):
+    """Flux texte du CSV : membre `.csv` de l'archive lu sans extraction, ou fichier CSV."""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        member = next((n for n in archive.namelist() if n.endswith(".csv")), None)
+        if member is None:
+            archive.close()
+            raise ValueError(f"Aucun CSV dans l'archive {path}")
+        return io.TextIOWrapper(archive.open(member), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def build_index(path=None, index_path=None):
+    """Compile la source (zip ou CSV) en index JSON (écriture atomique). Retourne le contenu de l'index."""
+    path = path or source_path()
+    index_path = index_path or CARBON_SETTINGS["index_path"]
+    with _open_source(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = compile_rows(header, reader)
+    index = {"version": INDEX_VERSION, "source": source_signature(path), "rows": rows}
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+    return index
+
+
+def load_carbon_index(path=None, index_path=None):
+    """
+    Retourne (carbon_db, pays_triés) ; carbon_db[pays] = {"val", "year", "code"}.
+    Index réutilisé tel quel si sa signature correspond à la source, sinon reconstruit.
+    """
+    path = path or source_path()
+    index_path = index_path or CARBON_SETTINGS["index_path"]
+    signature = source_signature(path)
+    index = None
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if signature is None and index is None:
+        return dict(DEFAULT_CARBON_DB), list(DEFAULT_CARBON_DB)
+    if signature is not None and (not index or index.get("version") != INDEX_VERSION or index.get("source") != signature):
+        index = build_index(path, index_path)
+
+    carbon_db = {country: {"val": val, "year": year, "code": code} for country, val, year, code in index["rows"]}
+    return carbon_db, [row[0] for row in index["rows"]]
+
+
+def what_if_matrix(runs, carbon_db):
+    """
+    Empreinte (gCO2e) de chaque inférence si l'électricité venait de chaque pays, en un seul calcul vectorisé.
+    Seul le Scope 2 dépend du mix : co2' = co2 + énergie × (intensité_pays − intensité_utilisée).
+    Retourne (pays, intensités, matrice [inférences × pays]).
+    """
+    import numpy as np
+    countries = list(carbon_db)
+    intensity = np.fromiter((carbon_db[c]["val"] for c in countries), dtype=np.float64, count=len(countries))
+    energy = np.fromiter((r["energy_kwh"] for r in runs), dtype=np.float64, count=len(runs))
+    co2 = np.fromiter((r["co2_g"] for r in runs), dtype=np.float64, count=len(runs))
+    ref = np.fromiter((r["ref_intensity"] for r in runs), dtype=np.float64, count=len(runs))
+    matrix = co2[:, None] + energy[:, None] * (intensity[None, :] - ref[:, None])
+    return countries, intensity, matrix
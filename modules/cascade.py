@@ -0,0 +1,199 @@
+"""
+Mode "Auto" : routage en cascade du plus petit modèle adapté vers les plus gros.
+
+1. Les niveaux sont déduits du catalogue : plus petit modèle local "routing_classification" /
+   "assistant_light", puis plus petit "assistant_generalist" plus gros, puis l'API Mistral.
+2. Chaque niveau répond ; un contrôle de confiance peu coûteux (JSON valide si le prompt
+   système en demande, log-prob moyenne des tokens générés) décide de l'escalade.
+3. Le résultat indique le niveau qui a servi et le gain estimé par rapport à un appel direct
+   au dernier niveau (négatif si les tentatives ratées ont coûté plus qu'elles n'ont économisé).
+"""
+import os
+import math
+import streamlit as st
+
+from config.models_config import CATALOG, CASCADE_SETTINGS
+from modules.fake_backend import SyntheticLlama, is_synthetic
+from modules.gguf_reader import get_gguf_metadata, estimate_ram_gb, deferred_writes
+from modules.iot_router import parse_llm_json
+
+AUTO_FAMILY = "🔀 Auto"
+AUTO_VARIANT = "Cascade économe"
+
+
+def _tier_ctx(conf, meta=None):
+    """n_ctx d'un niveau local : contexte du catalogue borné par `logprob_ctx` et le contexte d'entraînement."""
+    return min(conf["ctx"], CASCADE_SETTINGS["logprob_ctx"], (meta or {}).get("ctx_train") or conf["ctx"])
+
+
+def tier_ram_gb(conf):
+    """
+    RAM d'un niveau local chargé par la cascade : poids + cache KV + tampon de logits.
+    `logits_all` conserve n_ctx x vocabulaire logits float32 : ~1 Go à 2048 tokens pour 128k tokens de vocabulaire.
+    """
+    meta = get_gguf_metadata(conf.get("file"))
+    if not meta:
+        from modules.utils import model_memory
+        return model_memory(conf)[1]
+    n_ctx = _tier_ctx(conf, meta)
+    logits_gb = n_ctx * meta["vocab_size"] * CASCADE_SETTINGS["logits_bytes"] / (1024 ** 3)
+    return estimate_ram_gb(meta, n_ctx) + logits_gb
+
+
+def _local_candidates(roles, min_params=0.0):
+    """Modèles locaux présents sur disque, ayant l'un des rôles, triés du plus petit au plus gros."""
+    found = [
+        (e.info.params_act, e.name, e.conf)
+        for e in CATALOG.query(type="local", roles=roles, any_role=True)
+        if e.info.params_act > min_params and (is_synthetic(e.conf) or os.path.exists(e.file or ""))
+        # Budget RAM : en-tête GGUF (poids + cache KV + logits) plutôt que l'estimation du catalogue
+        and tier_ram_gb(e.conf) <= CASCADE_SETTINGS["max_local_ram_gb"]
+    ]
+    return sorted(found, key=lambda x: x[0])
+
+
+def build_auto_config():
+    """Configuration pseudo-modèle du mode Auto (type "cascade") avec la liste ordonnée des niveaux."""
+    tiers = []
+    with deferred_writes():
+        entry = _local_candidates(CASCADE_SETTINGS["entry_roles"])
+        if entry:
+            params, label, conf = entry[0]
+            tiers.append({"label": label, "conf": conf, "logprobs": True})
+            bigger = _local_candidates(CASCADE_SETTINGS["escalation_roles"], min_params=params)
+            if bigger:
+                tiers.append({"label": bigger[0][1], "conf": bigger[0][2], "logprobs": True})
+    family, variant = CASCADE_SETTINGS["api_fallback"]
+    api_entry = CATALOG.get(family, variant)
+    if api_entry:
+        tiers.append({"label": variant, "conf": api_entry.conf, "logprobs": False})
+
+    return {
+        "type": "cascade",
+        "tiers": tiers,
+        "ctx": max((t["conf"].get("ctx", 0) for t in tiers), default=CASCADE_SETTINGS["logprob_ctx"]),
+        "info": {"fam": "Auto", "desc": " → ".join(t["label"] for t in tiers)}
+    }
+
+
+@st.cache_resource(show_spinner="Chargement d'un niveau de la cascade...", max_entries=CASCADE_SETTINGS["max_loaded_tiers"])
+def _load_tier_model(path, n_ctx):
+    """Modèle llama.cpp d'un niveau local ; logits_all est requis pour les log-probs."""
+    from modules.utils import HAS_LOCAL_LIB
+    if not HAS_LOCAL_LIB: raise ImportError("Librairie `llama-cpp-python` manquante.")
+    from llama_cpp import Llama
+    return Llama(model_path=path, n_ctx=n_ctx, n_gpu_layers=-1, logits_all=True, verbose=False)
+
+
+def _load_tier(conf):
+    """Charge (une fois, dans la limite de `max_loaded_tiers`) un modèle de la cascade."""
+    if is_synthetic(conf):
+        return SyntheticLlama(**conf.get("synthetic", {}))
+    return _load_tier_model(os.path.abspath(conf["file"]), _tier_ctx(conf, get_gguf_metadata(conf["file"])))
+
+
+def release_tiers():
+    """Libère les modèles de la cascade (appelé quand l'utilisateur quitte le mode Auto)."""
+    _load_tier_model.clear()
+
+
+def check_confidence(text, logprobs, expects_json):
+    """Retourne (confiant, raison, log-prob moyenne ou None)."""
+    if not text.strip():
+        return False, "réponse vide", None
+    if expects_json and parse_llm_json(text) is None:
+        return False, "JSON invalide", None
+    avg = sum(logprobs) / len(logprobs) if logprobs else None
+    if avg is not None and avg < CASCADE_SETTINGS["min_avg_logprob"]:
+        return False, f"log-prob {avg:.2f} < {CASCADE_SETTINGS['min_avg_logprob']}", avg
+    return True, "ok", avg
+
+
+def _baseline(top, final_tier, final_res):
+    """Estimation (durée s, énergie kWh, gCO2e) d'un appel direct au dernier niveau disponible."""
+    import psutil
+    from modules.utils import compute_footprint, estimate_model_performance, model_memory
+    if top is final_tier:
+        return final_res["duration"], final_res["energy_kwh"], final_res["co2_g"]
+    out_tokens = final_res["output_tokens"]
+    if top["conf"]["type"] == "api":
+        kwh, co2 = compute_footprint("api", top["conf"], final_res["input_tokens"], out_tokens, 0.0)
+        return out_tokens / CASCADE_SETTINGS["api_tps"], kwh, co2
+    # Local : débit théorique du gros modèle, énergie au prorata du temps de calcul
+    total_ram = psutil.virtual_memory().total / (1024 ** 3)
+    _, tps = estimate_model_performance(model_memory(top["conf"])[0] or 1.0, total_ram)
+    duration = out_tokens / max(tps, 0.1)
+    ratio = duration / final_res["duration"] if final_res["duration"] > 0 else 1.0
+    return duration, final_res["energy_kwh"] * ratio, final_res["co2_g"] * ratio
+
+
+def run_cascade(model_conf, api_key, messages, on_update=None, **sampling):
+    """
+    Exécute la cascade (mêmes paramètres d'échantillonnage que `run_completion`).
+    Retourne le dict de `run_completion` du niveau retenu, cumulé sur toutes les tentatives,
+    plus tier_label, attempts, saved_s, saved_kwh.
+    """
+    from modules.utils import run_completion, count_tokens_approx
+    sampling.pop("track_energy", None)  # Chaque niveau mesure sa propre énergie (local ou API)
+    sys_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+    expects_json = "json" in sys_prompt.lower()
+    prompt_tokens = count_tokens_approx(" ".join(m["content"] for m in messages))
+
+    tiers = [t for t in model_conf["tiers"] if t["conf"]["type"] == "local" or api_key]
+    if not tiers:
+        return {"text": "", "input_tokens": 0, "output_tokens": 0, "duration": 0.0, "ttft": None, "queue_s": 0.0,
+                "energy_kwh": 0.0, "co2_g": 0.0, "cache_hit": False, "error": "❌ Aucun niveau disponible pour le mode Auto."}
+
+    attempts, served = [], None
+    totals = {"input_tokens": 0, "output_tokens": 0, "duration": 0.0, "energy_kwh": 0.0, "co2_g": 0.0, "queue_s": 0.0}
+    for i, tier in enumerate(tiers):
+        conf, is_last = tier["conf"], i == len(tiers) - 1
+        if conf["type"] == "local":
+            # Un niveau dont le contexte ne tient pas est sauté (sauf s'il est le dernier)
+            if not is_last and prompt_tokens + sampling.get("max_tokens", 1024) > _tier_ctx(conf, get_gguf_metadata(conf.get("file"))):
+                attempts.append({"tier": tier["label"], "ok": False, "reason": "contexte insuffisant", "duration": 0.0})
+                continue
+            try:
+                llm = _load_tier(conf)
+            except Exception as e:
+                attempts.append({"tier": tier["label"], "ok": False, "reason": str(e), "duration": 0.0})
+                continue
+            res = run_completion("local", conf, llm, None, messages, on_update=on_update,
+                                 logprobs=tier["logprobs"], **sampling)
+        else:
+            res = run_completion("api", conf, None, api_key, messages, on_update=on_update, **sampling)
+
+        ttft_offset = totals["duration"]
+        for key in totals: totals[key] += res[key]
+        if res["error"]:
+            attempts.append({"tier": tier["label"], "ok": False, "reason": res["error"], "duration": res["duration"]})
+            continue
+        ok, reason, avg = check_confidence(res["text"], res.get("logprobs"), expects_json)
+        attempts.append({"tier": tier["label"], "ok": ok, "reason": reason, "avg_logprob": avg, "duration": res["duration"]})
+        # Une réponse peu confiante reste la meilleure disponible si les niveaux suivants échouent
+        served = (tier, res, ttft_offset)
+        if ok: break
+
+    if served is None:
+        return dict(totals, text="", ttft=None, cache_hit=False, attempts=attempts,
+                    error=attempts[-1]["reason"] if attempts else "❌ Aucun niveau n'a pu répondre.")
+
+    tier, res, ttft_offset = served
+    base_s, base_kwh, _ = _baseline(tiers[-1], tier, res)
+    return dict(
+        totals, text=res["text"], error=None, cache_hit=False,
+        ttft=ttft_offset + res["ttft"] if res["ttft"] is not None else None,
+        tier_label=f"{tiers.index(tier) + 1}/{len(tiers)} · {tier['label']}", attempts=attempts,
+        saved_s=base_s - totals["duration"], saved_kwh=base_kwh - totals["energy_kwh"]
+    )
+
+
+def describe_attempts(attempts):
+    """Résumé lisible des tentatives (ex. "Qwen 0.5B ✗ JSON invalide → Qwen 1.5B ✓")."""
+    parts = []
+    for a in attempts:
+        detail = "" if a["ok"] else f" {a['reason']}"
+        if a.get("avg_logprob") is not None and not math.isnan(a["avg_logprob"]):
+            detail += f" (lp {a['avg_logprob']:.2f})"
+        parts.append(f"{a['tier']} {'✓' if a['ok'] else '✗'}{detail}")
+    return " → ".join(parts)
@@ -0,0 +1,77 @@
+"""
+Vue d'affichage du catalogue de modèles pour l'onglet Documentation.
+
+Construite une seule fois par processus à partir du catalogue typé (config/catalog.py) :
+- une ligne d'affichage par variante (libellés langues / rôles déjà formatés) ;
+- les DataFrames Local / Cloud complets, indexés par position dans le catalogue ;
+- les options de filtres (libellés) et leur correspondance vers les codes.
+Le filtrage reste celui de `Catalog.query` (index par type, rôle et langue) : un filtre devient
+un appel à `query` suivi d'une sélection `.loc` sur le tableau en cache.
+"""
+from types import MappingProxyType
+
+# Libellés d'affichage au lieu des codes techniques
+LANG_MAP = {
+    "en": "🇬🇧 Anglais", "fr": "🇫🇷 Français", "de": "🇩🇪 Allemand",
+    "es": "🇪🇸 Espagnol", "it": "🇮🇹 Italien", "pt": "🇵🇹 Portugais",
+    "zh": "🇨🇳 Chinois", "ja": "🇯🇵 Japonais", "ko": "🇰🇷 Coréen",
+    "ru": "🇷🇺 Russe", "ar": "🇸🇦 Arabe", "hi": "🇮🇳 Hindi", "th": "🇹🇭 Thaï"
+}
+
+ROLE_MAP = {
+    "assistant_generalist":   "🧠 Assistant Polyvalent",
+    "assistant_light":        "⚡ Assistant Léger / Rapide",
+    "rag":                    "📝 Synthèse & RAG",
+    "code":                   "💻 Code & Dev",
+    "reasoning":              "🧩 Raisonnement & Logique",
+    "math_stem":              "📐 Maths & Sciences",
+    "tool_calling":           "🛠️ Agents & Outils",
+    "routing_classification": "🔀 Routage & Classification",
+    "edge_on_device":         "📱 Edge / Embarqué",
+    "enterprise":             "🏢 Entreprise & Conformité",
+    "educational_tutor":      "🎓 Tutorat & Pédagogie"
+}
+
+
+class CatalogIndex:
+    """Vue figée du catalogue : options de filtres et tableaux prêts à afficher."""
+
+    def __init__(self, catalog):
+        import pandas as pd
+        self.catalog = catalog
+        rows, kinds = [], {"local": [], "api": []}
+        for row_id, entry in enumerate(catalog):
+            info = entry.info
+            kinds[entry.type].append(row_id)
+            rows.append({
+                "Famille": entry.family,
+                "Modèle": entry.name,
+                # On garde le code brut si jamais il manque dans le dictionnaire de libellés
+                "Langues": ", ".join(LANG_MAP.get(k, k) for k in info.langs),
+                "Rôles Clés": ", ".join(ROLE_MAP.get(k, k) for k in info.roles),
+                "Description": info.desc,
+                "Taille": f"{info.disk} Go",
+                "Params Totaux": f"{info.params_tot}B",
+                "Params Actifs": f"{info.params_act}B",
+            })
+
+        self._row_ids = {(e.family, e.name): i for i, e in enumerate(catalog)}
+        self._lang_codes = MappingProxyType({LANG_MAP.get(k, k): k for k in catalog.languages()})
+        self._role_codes = MappingProxyType({ROLE_MAP.get(k, k): k for k in catalog.roles()})
+        self.lang_options = tuple(sorted(self._lang_codes))
+        self.role_options = tuple(sorted(self._role_codes))
+        frame = pd.DataFrame(rows)
+        self.frames = MappingProxyType({kind: frame.loc[ids] for kind, ids in kinds.items()})
+        self.size = len(rows)
+
+    def query(self, kind, langs=(), roles=()):
+        """Modèles `kind` ("local" / "api") couvrant TOUTES les langues et TOUS les rôles sélectionnés (libellés)."""
+        frame = self.frames[kind]
+        if not langs and not roles:
+            return frame
+        entries = self.catalog.query(
+            type=kind,
+            langs=[self._lang_codes.get(label, label) for label in langs],
+            roles=[self._role_codes.get(label, label) for label in roles],
+        )
+        return frame.loc[[self._row_ids[(e.family, e.name)] for e in entries]]
@@ -0,0 +1,161 @@
+"""
+Comparaison côte à côte : un même prompt envoyé simultanément à N modèles du catalogue.
+
+- Les modèles API tournent chacun dans leur thread, en même temps que les modèles locaux.
+- Les modèles locaux sont chargés dans des instances Llama dédiées, par vagues qui tiennent
+  dans le budget RAM (RAM disponible - marge) et cœurs (au moins `min_threads` par modèle).
+  Un modèle qui dépasse seul ce budget n'est pas chargé : résultat "RAM insuffisante".
+- Les workers publient leurs deltas dans une file ; seul le thread appelant (Streamlit) affiche.
+- L'énergie CPU est mesurée par un tracker global et répartie entre modèles locaux au
+  prorata de leur temps de génération.
+"""
+import os
+import time
+import queue
+import threading
+
+from config.models_config import CATALOG, COMPARISON_SETTINGS
+from modules.fake_backend import SyntheticLlama, is_synthetic
+from modules.gguf_reader import deferred_writes
+from modules.utils import (
+    HAS_LOCAL_LIB, effective_ctx, model_memory, run_completion, compute_footprint,
+    start_energy_tracker, stop_energy_tracker
+)
+
+
+def model_choices():
+    """Libellés "Famille / Version" → config, pour les modèles utilisables ici (GGUF présent ou API)."""
+    return {
+        f"{e.family} / {e.name}": e.conf
+        for e in CATALOG
+        if e.is_api or is_synthetic(e.conf) or os.path.exists(e.file or "")
+    }
+
+
+def plan_local_waves(entries):
+    """
+    Regroupe les modèles locaux en vagues exécutables en parallèle (RAM et cœurs).
+    Retourne (vagues, écartés) : [[(index, conf), ...], ...] et [(index, motif), ...] pour
+    les modèles dont le besoin dépasse à lui seul le budget RAM (jamais chargés).
+    """
+    import psutil
+    ram_budget = psutil.virtual_memory().available / (1024 ** 3) - COMPARISON_SETTINGS["ram_margin_gb"]
+    cores = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    max_parallel = max(1, cores // COMPARISON_SETTINGS["min_threads"])
+
+    waves, skipped, current, used = [], [], [], 0.0
+    with deferred_writes():
+        needs = {idx: model_memory(conf)[1] for idx, conf in entries}  # En-tête GGUF si présent, sinon catalogue
+    for idx, conf in sorted(entries, key=lambda e: needs[e[0]]):
+        need = needs[idx]
+        if need > ram_budget:
+            skipped.append((idx, f"RAM insuffisante : ~{need:.1f} Go requis, {max(ram_budget, 0):.1f} Go disponibles (marge déduite)"))
+            continue
+        if current and (used + need > ram_budget or len(current) >= max_parallel):
+            waves.append(current)
+            current, used = [], 0.0
+        current.append((idx, conf))
+        used += need
+    if current: waves.append(current)
+    return waves, skipped
+
+
+def compare_models(entries, messages, sampling, api_key=None, on_event=None):
+    """
+    - `entries` : [(libellé, conf)] des modèles à comparer.
+    - `sampling` : temperature, max_tokens, top_p, top_k, seed, carbon_intensity.
+    - `on_event(type, index, payload)` appelé depuis le thread appelant :
+      "status" (texte), "delta" (texte partiel), "done" (résultat).
+    Retourne la liste des résultats (dict `run_completion` + label, load_s), dans l'ordre d'entrée.
+    """
+    import psutil
+    events = queue.Queue()
+    results = [None] * len(entries)
+    cores = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+
+    def _emit(kind, idx, payload):
+        events.put((kind, idx, payload))
+
+    def _finish(idx, res):
+        results[idx] = res
+        _emit("done", idx, res)
+
+    def _run_api(idx, conf):
+        res = run_completion(
+            "api", conf, None, api_key, messages, track_energy=False,
+            on_update=lambda txt: _emit("delta", idx, txt), **sampling
+        )
+        _finish(idx, dict(res, load_s=0.0))
+
+    def _run_local(idx, conf, n_threads):
+        _emit("status", idx, f"⏳ Chargement ({n_threads} threads)...")
+        t0 = time.time()
+        try:
+            if is_synthetic(conf):
+                llm = SyntheticLlama(**conf.get("synthetic", {}))
+            else:
+                if not HAS_LOCAL_LIB: raise ImportError("Librairie `llama-cpp-python` manquante.")
+                from llama_cpp import Llama
+                llm = Llama(model_path=os.path.abspath(conf["file"]), n_ctx=effective_ctx(conf),
+                            n_threads=n_threads, n_gpu_layers=-1, verbose=False)
+        except Exception as e:
+            _finish(idx, {"error": f"Erreur Llama-cpp : {e}", "text": "", "load_s": time.time() - t0})
+            return
+        load_s = time.time() - t0
+        res = run_completion(
+            "local", conf, llm, None, messages, track_energy=False, local_lock=threading.Lock(),
+            on_update=lambda txt: _emit("delta", idx, txt), **sampling
+        )
+        del llm  # Libère la RAM avant la vague suivante
+        _finish(idx, dict(res, load_s=load_s))
+
+    def _run_local_waves(waves):
+        for wave in waves:
+            n_threads = max(1, cores // len(wave))
+            threads = [threading.Thread(target=_run_local, args=(idx, conf, n_threads), daemon=True) for idx, conf in wave]
+            for t in threads: t.start()
+            for t in threads: t.join()
+
+    api_entries = [(i, conf) for i, (_, conf) in enumerate(entries) if conf["type"] == "api"]
+    local_entries = [(i, conf) for i, (_, conf) in enumerate(entries) if conf["type"] == "local"]
+    waves, skipped = plan_local_waves(local_entries)
+    for idx, reason in skipped:
+        _finish(idx, {"error": reason, "text": "", "load_s": 0.0})
+    for n, wave in enumerate(waves):
+        for idx, _ in wave: _emit("status", idx, f"⏳ En attente (vague {n + 1}/{len(waves)})")
+
+    tracker = start_energy_tracker() if waves else None
+    workers = [threading.Thread(target=_run_api, args=e, daemon=True) for e in api_entries]
+    if waves: workers.append(threading.Thread(target=_run_local_waves, args=(waves,), daemon=True))
+    for t in workers: t.start()
+
+    # Boucle d'affichage : on ne garde que le dernier delta de chaque modèle par tour
+    while any(t.is_alive() for t in workers) or not events.empty():
+        latest = {}
+        try:
+            kind, idx, payload = events.get(timeout=0.1)
+            while True:
+                if kind == "delta": latest[idx] = payload
+                else:
+                    if kind == "done": latest.pop(idx, None)  # Le texte final remplace le dernier delta
+                    if on_event: on_event(kind, idx, payload)
+                kind, idx, payload = events.get_nowait()
+        except queue.Empty:
+            pass
+        if on_event:
+            for idx, txt in latest.items(): on_event("delta", idx, txt)
+    for t in workers: t.join()
+
+    # Répartition de l'énergie CPU mesurée entre les modèles locaux (temps de génération)
+    cpu_energy_kwh = stop_energy_tracker(tracker)
+    local_ok = [i for i, _ in local_entries if not results[i].get("error")]
+    total_busy = sum(results[i]["duration"] for i in local_ok)
+    for i in local_ok:
+        res, conf = results[i], entries[i][1]
+        share = res["duration"] / total_busy if total_busy > 0 else 0.0
+        res["energy_kwh"], res["co2_g"] = compute_footprint(
+            "local", conf, res["input_tokens"], res["output_tokens"], res["duration"],
+            cpu_energy_kwh=cpu_energy_kwh * share, carbon_intensity=sampling.get("carbon_intensity", 475.0)
+        )
+    for i, (label, _) in enumerate(entries): results[i]["label"] = label
+    return results
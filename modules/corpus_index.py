@@ -0,0 +1,246 @@
+"""
+Index lexical BM25 persistant pour le RAG multi-documents.
+
+Un dossier de documents (PDF/TXT/MD) est découpé en passages puis indexé dans une
+base SQLite (index inversé : terme -> passages). L'ingestion est incrémentale :
+seuls les fichiers nouveaux ou modifiés (taille / mtime) sont ré-indexés.
+Aucun modèle d'embedding n'est nécessaire.
+"""
+import os
+import re
+import math
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+
+from modules.extraction import iter_pdf_pages
+from modules.text_utils import split_into_chunks
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+COMMIT_EVERY_PAGES = 20  # Les premières pages d'un gros PDF sont interrogeables pendant l'indexation
+SQL_MAX_VARS = 500       # Limite de variables d'une requête SQLite (IN (...))
+
+# --- PARAMÈTRES BM25 (valeurs usuelles Okapi) ---
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Mots vides FR/EN (volontairement courts : le BM25 pénalise déjà les termes fréquents)
+STOPWORDS = frozenset("""
+le la les un une des du de d l au aux et ou ni mais donc or car ce cet cette ces
+son sa ses leur leurs mon ma mes ton ta tes notre nos votre vos qui que quoi dont
+ou est sont etre avoir a ont pas ne plus en dans par pour sur avec sans sous entre
+il elle ils elles on nous vous je tu se s y c qu n j m t
+the a an of to in on for and or is are was were be been with by as at from that this
+it its not but if then than so such into
+""".split())
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL REFERENCES docs(id) ON DELETE CASCADE,
+    page INTEGER,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    chunk_id INTEGER NOT NULL REFERENCES chunks(id) ON DELETE CASCADE,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term_id, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);
+"""
+
+
+def tokenize(text: str) -> list:
+    """Minuscules, suppression des accents, découpage en mots et filtrage des mots vides."""
+    if not text: return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+
+def iter_document_pages(path):
+    """Génère (numéro_page, texte) au fil de la lecture (page None pour le texte brut)."""
+    if path.lower().endswith(".pdf"):
+        yield from iter_pdf_pages(path)
+        return
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        yield None, f.read()
+
+
+class CorpusIndex:
+    """Index BM25 d'un dossier, stocké dans un fichier SQLite."""
+
+    def __init__(self, db_path, chunk_tokens=350):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.chunk_tokens = chunk_tokens
+        # Partagé entre les sessions Streamlit (threads) : accès sérialisé par un verrou
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    # --- INGESTION ---
+    def sync_directory(self, folder, progress_cb=None):
+        """
+        Met l'index en cohérence avec le dossier : ajoute/ré-indexe les fichiers nouveaux
+        ou modifiés, supprime ceux qui ont disparu. Retourne un dict de statistiques.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "errors": []}
+        on_disk = {}
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.abspath(os.path.join(root, name))
+                    try:
+                        st_ = os.stat(path)
+                    except OSError:
+                        continue  # Supprimé entre le listage et le stat : traité comme absent
+                    on_disk[path] = (st_.st_mtime_ns, st_.st_size)
+
+        with self._lock:
+            known = {p: (m, s) for p, m, s in self._conn.execute("SELECT path, mtime_ns, size FROM docs")}
+
+        # Fichiers supprimés du dossier (uniquement ceux de ce dossier)
+        root_abs = os.path.abspath(folder) + os.sep
+        for path in known:
+            if path.startswith(root_abs) and path not in on_disk:
+                with self._lock, self._conn:
+                    self._conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+                stats["removed"] += 1
+
+        todo = [p for p, sig in on_disk.items() if known.get(p) != sig]
+        stats["unchanged"] = len(on_disk) - len(todo)
+
+        for i, path in enumerate(todo, 1):
+            if progress_cb: progress_cb(i, len(todo), path)
+            try:
+                self._index_document(path, on_disk[path], iter_document_pages(path))
+            except Exception as e:
+                # Document partiel retiré : pas de résultats tronqués (ré-indexé à la prochaine synchro)
+                with self._lock, self._conn:
+                    self._conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+                stats["errors"].append(f"{os.path.basename(path)} : {e}")
+                continue
+            stats["updated" if path in known else "added"] += 1
+
+        if todo or stats["removed"]:
+            with self._lock, self._conn:
+                # Nettoyage des termes orphelins (garde l'index compact)
+                self._conn.execute("DELETE FROM terms WHERE id NOT IN (SELECT DISTINCT term_id FROM postings)")
+        return stats
+
+    def _index_document(self, path, signature, pages):
+        """
+        Indexe un document page par page. Les pages sont validées par lots : la signature
+        (mtime, taille) n'est écrite qu'à la fin, un document interrompu sera donc ré-indexé.
+        """
+        mtime_ns, size = signature
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+            doc_id = self._conn.execute(
+                "INSERT INTO docs (path, mtime_ns, size) VALUES (?, -1, -1)", (path,)
+            ).lastrowid
+
+        batch = []
+        for page in pages:
+            batch.append(page)
+            if len(batch) >= COMMIT_EVERY_PAGES:
+                self._index_pages(doc_id, batch)
+                batch = []
+        self._index_pages(doc_id, batch)
+
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE docs SET mtime_ns = ?, size = ? WHERE id = ?", (mtime_ns, size, doc_id))
+
+    def _term_ids(self, terms):
+        """{terme: id} pour les termes déjà connus, en une requête IN (...) par lot (appelé sous verrou)."""
+        terms, ids = list(terms), {}
+        for i in range(0, len(terms), SQL_MAX_VARS):
+            batch = terms[i:i + SQL_MAX_VARS]
+            ids.update(self._conn.execute(
+                f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return ids
+
+    def _index_pages(self, doc_id, pages):
+        with self._lock, self._conn:
+            for page_no, page_text in pages:
+                for chunk in split_into_chunks(page_text, self.chunk_tokens):
+                    tokens = tokenize(chunk)
+                    if not tokens: continue
+                    chunk_id = self._conn.execute(
+                        "INSERT INTO chunks (doc_id, page, length, text) VALUES (?, ?, ?, ?)",
+                        (doc_id, page_no, len(tokens), chunk)
+                    ).lastrowid
+                    tfs = Counter(tokens)
+                    self._conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", ((t,) for t in tfs))
+                    term_ids = self._term_ids(tfs)
+                    self._conn.executemany(
+                        "INSERT INTO postings (term_id, chunk_id, tf) VALUES (?, ?, ?)",
+                        [(term_ids[term], chunk_id, tf) for term, tf in tfs.items()]
+                    )
+
+    # --- REQUÊTES ---
+    def stats(self):
+        """Nombre de documents, de passages et de termes distincts."""
+        with self._lock:
+            n_docs = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            n_chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            n_terms = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {"docs": n_docs, "chunks": n_chunks, "terms": n_terms}
+
+    def search(self, query, k=5):
+        """Top-k passages BM25 pour la requête. Retourne une liste de dicts triés par score."""
+        q_terms = set(tokenize(query))
+        if not q_terms: return []
+
+        with self._lock:
+            n_chunks, total_len = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+            if n_chunks == 0: return []
+            avg_len = total_len / n_chunks
+
+            scores = Counter()
+            for term_id in self._term_ids(q_terms).values():
+                postings = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id WHERE p.term_id = ?",
+                    (term_id,)
+                ).fetchall()
+                df = len(postings)
+                idf = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+                    scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            results = []
+            for chunk_id, score in scores.most_common(k):
+                if score <= 0: break
+                path, page, text = self._conn.execute(
+                    "SELECT d.path, c.page, c.text FROM chunks c JOIN docs d ON d.id = c.doc_id WHERE c.id = ?",
+                    (chunk_id,)
+                ).fetchone()
+                results.append({"path": path, "page": page, "text": text, "score": score})
+        return results
+
+
+def index_path_for(folder, index_dir):
+    """Un fichier d'index par dossier source (nom dérivé du chemin absolu)."""
+    slug = re.sub(r"[^\w]+", "_", os.path.abspath(folder)).strip("_")[-80:]
+    return os.path.join(index_dir, f"{slug}.sqlite")
@@ -0,0 +1,207 @@
+"""
+Extraction de texte des documents (PDF / TXT) avec cache, parallélisation et streaming.
+
+- Cache à deux niveaux indexé par l'empreinte SHA-256 du contenu :
+  RAM (LRU en nombre de documents) puis disque (LRU en taille, pages au format JSON).
+  Le cache est tenu page par page (null = page pas encore lue) : une plage déjà extraite
+  n'est pas relue, une nouvelle plage complète l'entrée du document.
+- Les pages sont produites au fil de l'eau (générateur) avec sélection de plage,
+  pour alimenter le découpage / l'indexation avant la fin de la lecture.
+- Les gros PDF sont découpés en courtes plages de pages réparties sur un pool de
+  processus ; une fenêtre bornée de tâches en vol limite la mémoire consommée.
+"""
+import io
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+from config.models_config import EXTRACTION_SETTINGS
+
+PAGES_PER_TASK = 16  # Granularité du streaming en mode parallèle
+
+_MEMORY_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_POOL = None
+
+
+def content_digest(data: bytes) -> str:
+    """Empreinte SHA-256 du contenu (clé de cache indépendante du nom de fichier)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+# --- EXTRACTION PDF EN STREAMING (SÉQUENTIELLE / PARALLÈLE) ---
+def _extract_page_range(path, start, stop):
+    """Exécuté dans un processus fils : extrait les pages [start, stop[ d'un PDF sur disque."""
+    import pypdf
+    reader = pypdf.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _get_pool():
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=EXTRACTION_SETTINGS["max_workers"])
+    return _POOL
+
+
+def iter_pdf_pages(path, first_page=1, last_page=None):
+    """
+    Génère (numéro_page, texte) dans l'ordre, au fur et à mesure de l'extraction.
+    `first_page` / `last_page` (inclus, base 1) restreignent la lecture à une plage.
+    """
+    import pypdf
+    reader = pypdf.PdfReader(path)
+    n_pages = len(reader.pages)
+    first, last = max(1, first_page), min(last_page or n_pages, n_pages)
+    workers = EXTRACTION_SETTINGS["max_workers"]
+
+    if last - first + 1 < EXTRACTION_SETTINGS["parallel_min_pages"] or workers < 2:
+        for i in range(first - 1, last):
+            yield i + 1, reader.pages[i].extract_text() or ""
+        return
+
+    # Mode parallèle : les workers relisent le PDF depuis le disque (pas d'octets sérialisés),
+    # on garde au plus 2 tâches par worker en vol et on restitue les pages dans l'ordre.
+    del reader
+    ranges = deque((s, min(s + PAGES_PER_TASK, last)) for s in range(first - 1, last, PAGES_PER_TASK))
+    pending = deque()
+    while ranges or pending:
+        while ranges and len(pending) < workers * 2:
+            start, stop = ranges.popleft()
+            pending.append((start, _get_pool().submit(_extract_page_range, path, start, stop)))
+        start, fut = pending.popleft()
+        for offset, text in enumerate(fut.result()):
+            yield start + offset + 1, text
+
+
+# --- CACHE (RAM + DISQUE LRU SUR MTIME) ---
+def _disk_path(digest):
+    return os.path.join(EXTRACTION_SETTINGS["cache_dir"], f"{digest}.pages.json")
+
+
+def _disk_get(digest):
+    path = _disk_path(digest)
+    try:
+        with open(path, "r", encoding="utf-8") as f: pages = json.load(f)
+    except (OSError, ValueError):
+        return None
+    os.utime(path)  # Marque l'entrée comme récemment utilisée
+    return pages
+
+
+def _disk_put(digest, pages):
+    cache_dir = EXTRACTION_SETTINGS["cache_dir"]
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = _disk_path(digest) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: json.dump(pages, f, ensure_ascii=False)
+    os.replace(tmp_path, _disk_path(digest))
+
+    # Éviction des entrées les moins récemment utilisées au-delà de la taille max
+    entries = []
+    for name in os.listdir(cache_dir):
+        st_ = os.stat(os.path.join(cache_dir, name))
+        entries.append((st_.st_mtime, st_.st_size, name))
+    total = sum(e[1] for e in entries)
+    limit = EXTRACTION_SETTINGS["disk_cache_mb"] * 1024 * 1024
+    for _, size, name in sorted(entries):
+        if total <= limit: break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            total -= size
+        except OSError: pass
+
+
+def _cache_get(digest):
+    with _CACHE_LOCK:
+        if digest in _MEMORY_CACHE:
+            _MEMORY_CACHE.move_to_end(digest)
+            return _MEMORY_CACHE[digest]
+    pages = _disk_get(digest)
+    if pages is not None: _memory_put(digest, pages)
+    return pages
+
+
+def _memory_put(digest, pages):
+    with _CACHE_LOCK:
+        _MEMORY_CACHE[digest] = pages
+        while len(_MEMORY_CACHE) > EXTRACTION_SETTINGS["memory_entries"]:
+            _MEMORY_CACHE.popitem(last=False)
+
+
+def is_cached(data: bytes, first_page=1, last_page=None) -> bool:
+    """Vrai si toutes les pages de la plage (tout le document par défaut) sont déjà extraites."""
+    pages = _cache_get(content_digest(data))
+    if pages is None: return False
+    last = min(last_page or len(pages), len(pages))
+    return all(pages[i] is not None for i in range(max(1, first_page) - 1, last))
+
+
+# --- POINTS D'ENTRÉE ---
+def pdf_page_count(data: bytes) -> int:
+    """Nombre de pages (lecture de la table des objets uniquement si non caché)."""
+    pages = _cache_get(content_digest(data))
+    if pages is not None: return len(pages)
+    import pypdf
+    return len(pypdf.PdfReader(io.BytesIO(data)).pages)
+
+
+def _write_temp_pdf(data):
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f: f.write(data)
+    return tmp_path
+
+
+def iter_pages_cached(data: bytes, first_page=1, last_page=None):
+    """
+    Pages d'un PDF (numéro, texte) servies depuis le cache, les pages manquantes de la plage
+    étant extraites en streaming puis ajoutées à l'entrée du document (même si la lecture est interrompue).
+    """
+    digest = content_digest(data)
+    cached = _cache_get(digest)
+    tmp_path, extracted = None, False
+    try:
+        if cached is None:
+            import pypdf
+            tmp_path = _write_temp_pdf(data)
+            cached = [None] * len(pypdf.PdfReader(tmp_path).pages)
+        pages = list(cached)  # Copie : la liste en cache peut être lue par d'autres sessions
+        first, last = max(1, first_page), min(last_page or len(pages), len(pages))
+
+        i = first - 1
+        while i < last:
+            if pages[i] is not None:
+                yield i + 1, pages[i]
+                i += 1
+                continue
+            # Trou contigu [i, end[ extrait d'un bloc (parallélisable)
+            end = i
+            while end < last and pages[end] is None: end += 1
+            tmp_path = tmp_path or _write_temp_pdf(data)
+            for page_no, text in iter_pdf_pages(tmp_path, i + 1, end):
+                pages[page_no - 1] = text
+                extracted = True
+                yield page_no, text
+            i = end
+    finally:
+        if extracted:
+            _memory_put(digest, pages)
+            try: _disk_put(digest, pages)
+            except OSError: pass  # Cache disque non critique (disque plein, droits...)
+        if tmp_path:
+            try: os.remove(tmp_path)
+            except OSError: pass
+
+
+def extract_text_cached(data: bytes, mime_type: str) -> str:
+    """Texte brut complet d'un document (PDF ou TXT), servi depuis le cache si déjà extrait."""
+    if mime_type == "text/plain":
+        return data.decode("utf-8")
+    if mime_type != "application/pdf":
+        return ""
+    # Assemblage par join (pas de concaténation += quadratique)
+    return "".join(text + "\n" for _, text in iter_pages_cached(data) if text)
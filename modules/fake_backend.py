@@ -0,0 +1,86 @@
+"""
+Backend LLM synthétique et déterministe, interchangeable avec `llama_cpp.Llama`.
+
+Reproduit `create_chat_completion` (streamé ou non, log-probs optionnelles) avec un débit,
+un délai avant premier token et une longueur de sortie réglables, sans GGUF ni calcul.
+Sert à mesurer le coût propre de l'application (rendu, métriques, reruns, files d'attente)
+et à la tester en charge sur une machine sans modèle.
+
+Sélection : variable d'environnement WORKBENCH_SYNTHETIC=1 → famille "🧪 Synthétique" dans le catalogue (CATALOG).
+"""
+import json
+import time
+import uuid
+import random
+import hashlib
+
+VOCAB = (
+    "le la les un une des modèle local inférence énergie réponse données latence contexte "
+    "token serveur utilisateur résultat analyse requête mémoire sobriété performance "
+    "est sont reste permet réduit mesure produit traite et ou donc mais avec pour sur dans"
+).split()
+
+
+def is_synthetic(model_conf):
+    return model_conf.get("backend") == "synthetic"
+
+
+class SyntheticLlama:
+    """
+    Même interface que `llama_cpp.Llama` pour les usages de l'application.
+    La sortie ne dépend que des messages et de la seed : deux appels identiques donnent le même texte.
+    """
+
+    def __init__(self, tps=60.0, ttft=0.15, output_tokens=160, **_ignored):
+        self.tps, self.ttft, self.output_tokens = float(tps), float(ttft), int(output_tokens)
+
+    def _tokens(self, messages, max_tokens, seed):
+        raw = json.dumps(messages, sort_keys=True, ensure_ascii=False) + f"|{seed}"
+        rng = random.Random(hashlib.sha256(raw.encode("utf-8")).hexdigest())
+        n = max(1, min(self.output_tokens, max_tokens or self.output_tokens))
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        if "json" in system.lower():
+            # Réponse JSON valide (onglets IoT / triage, contrôle de confiance du mode Auto)
+            words = [rng.choice(VOCAB) for _ in range(max(1, n - 6))]
+            body = json.dumps({"result": " ".join(words), "confidence": round(rng.random(), 2)}, ensure_ascii=False)
+            return [body[i:i + 4] for i in range(0, len(body), 4)], rng
+        tokens = []
+        for i in range(n):
+            word = rng.choice(VOCAB)
+            tokens.append((word.capitalize() if i == 0 else word) + ("." if i == n - 1 else " "))
+        return tokens, rng
+
+    def _stream(self, tokens, rng, top_logprobs):
+        completion_id = f"chatcmpl-synth-{uuid.uuid4().hex[:8]}"
+        yield {"id": completion_id, "object": "chat.completion.chunk",
+               "choices": [{"index": 0, "delta": {"role": "assistant"}, "logprobs": None, "finish_reason": None}]}
+        time.sleep(self.ttft)
+        for i, tok in enumerate(tokens):
+            if i: time.sleep(1.0 / self.tps)
+            lp = None
+            if top_logprobs is not None:
+                # Même forme que les chunks convertis par llama-cpp-python (chat ← complétion)
+                logprob = -rng.random() * 0.8
+                alternatives = [{"token": tok, "logprob": logprob, "bytes": None}]
+                alternatives += [{"token": rng.choice(VOCAB), "logprob": logprob - 1.0 - k, "bytes": None} for k in range(top_logprobs - 1)]
+                lp = {"content": [{"token": tok, "logprob": logprob, "bytes": None, "top_logprobs": alternatives[:top_logprobs]}],
+                      "refusal": None}
+            yield {"id": completion_id, "object": "chat.completion.chunk",
+                   "choices": [{"index": 0, "delta": {"content": tok}, "logprobs": lp, "finish_reason": None}]}
+        yield {"id": completion_id, "object": "chat.completion.chunk",
+               "choices": [{"index": 0, "delta": {}, "logprobs": None, "finish_reason": "stop"}]}
+
+    def create_chat_completion(self, messages, stream=False, max_tokens=None, seed=None, logprobs=False, top_logprobs=None, **_sampling):
+        tokens, rng = self._tokens(messages, max_tokens, seed)
+        # Comme llama.cpp : `logprobs=True` seul ne suffit pas, le gestionnaire de chat transmet
+        # `logprobs=top_logprobs if logprobs else None` à la complétion
+        chunks = self._stream(tokens, rng, top_logprobs if logprobs else None)
+        if stream:
+            return chunks
+        text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+        prompt_tokens = int(sum(len(m["content"]) for m in messages) / 2.7)
+        return {
+            "id": f"chatcmpl-synth-{uuid.uuid4().hex[:8]}", "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+        }
@@ -0,0 +1,263 @@
+"""
+Lecture des métadonnées d'un fichier GGUF sans charger les poids.
+
+Le fichier est projeté en mémoire (mmap) et seul l'en-tête est parcouru : paires clé/valeur
+(architecture, couches, dimensions, têtes d'attention, contexte d'entraînement, tokenizer)
+puis descripteurs de tenseurs (nombre exact de paramètres). Les pages des poids ne sont jamais lues.
+
+Les résultats sont mis en cache (mémoire + JSON dans CACHE_DIR) et invalidés quand la
+signature (taille, mtime) du fichier change : relire tout `models_gguf/` ne coûte qu'un `stat` par fichier.
+Le JSON est lu une fois par processus ; dans un bloc `deferred_writes()` il n'est réécrit qu'une
+fois, en sortie, quel que soit le nombre de fichiers lus.
+Les tailles du catalogue (`disk`, `ram`, `ctx`) restent la valeur par défaut quand le GGUF est absent.
+"""
+import os
+import json
+import mmap
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+
+from config.models_config import GGUF_SETTINGS
+
+GGUF_MAGIC = b"GGUF"
+READER_VERSION = 1
+
+# Types de valeurs GGUF → format struct (little-endian)
+_SCALARS = {0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i", 6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d"}
+_STRING, _ARRAY = 8, 9
+# Au-delà, un tableau n'est pas conservé (ex. vocabulaire du tokenizer) : seule sa longueur l'est.
+# Les tableaux par couche (ex. head_count_kv de certaines architectures) restent sous ce seuil.
+_MAX_ARRAY_ITEMS = 256
+
+# general.file_type (llama_ftype) → libellé de quantification
+FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1",
+    10: "Q2_K", 11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M",
+    16: "Q5_K_S", 17: "Q5_K_M", 18: "Q6_K", 19: "IQ2_XXS", 20: "IQ2_XS", 21: "Q2_K_S",
+    22: "IQ3_XS", 23: "IQ3_XXS", 24: "IQ1_S", 25: "IQ4_NL", 26: "IQ3_S", 27: "IQ3_M",
+    28: "IQ2_S", 29: "IQ2_M", 30: "IQ4_XS", 31: "IQ1_M", 32: "BF16",
+}
+
+logger = logging.getLogger(__name__)
+
+_MEMO = {}
+_LOCK = threading.RLock()
+_DISK = None        # Cache disque, chargé au premier besoin
+_DIRTY = False      # Entrées disque modifiées depuis la dernière écriture
+_DEFERRED = 0       # > 0 : écriture repoussée à la sortie du bloc `deferred_writes`
+
+
+class _Cursor:
+    """Lecture séquentielle dans le mmap (seules les pages parcourues sont chargées)."""
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf):
+        self.buf, self.pos = buf, 0
+
+    def scalar(self, fmt):
+        value = struct.unpack_from(fmt, self.buf, self.pos)[0]
+        self.pos += struct.calcsize(fmt)
+        return value
+
+    def string(self):
+        length = self.scalar("<Q")
+        raw = self.buf[self.pos:self.pos + length]
+        self.pos += length
+        return raw.decode("utf-8", errors="replace")
+
+    def skip_string(self):
+        length = self.scalar("<Q")
+        self.pos += length
+
+    def value(self, vtype):
+        if vtype in _SCALARS: return self.scalar(_SCALARS[vtype])
+        if vtype == _STRING: return self.string()
+        if vtype == _ARRAY:
+            item_type, count = self.scalar("<I"), self.scalar("<Q")
+            if count > _MAX_ARRAY_ITEMS:
+                self._skip_array(item_type, count)
+                return {"array_len": count}
+            return [self.value(item_type) for _ in range(count)]
+        raise ValueError(f"Type de valeur GGUF inconnu : {vtype}")
+
+    def _skip_array(self, item_type, count):
+        if item_type in _SCALARS:
+            self.pos += struct.calcsize(_SCALARS[item_type]) * count
+        elif item_type == _STRING:
+            for _ in range(count): self.skip_string()
+        else:
+            for _ in range(count): self.value(item_type)
+
+
+def parse_header(buf):
+    """En-tête GGUF (v2 / v3) → (version, {clé: valeur}, [(nom, dimensions, type)]). Lève ValueError."""
+    if buf[:4] != GGUF_MAGIC:
+        raise ValueError("Pas un fichier GGUF (signature absente)")
+    cur = _Cursor(buf)
+    cur.pos = 4
+    version = cur.scalar("<I")
+    if version < 2:
+        raise ValueError(f"GGUF v{version} non supporté (v2 ou plus requis)")
+    n_tensors, n_kv = cur.scalar("<Q"), cur.scalar("<Q")
+
+    kv = {}
+    for _ in range(n_kv):
+        key = cur.string()
+        kv[key] = cur.value(cur.scalar("<I"))
+
+    tensors = []
+    for _ in range(n_tensors):
+        name = cur.string()
+        dims = [cur.scalar("<Q") for _ in range(cur.scalar("<I"))]
+        ggml_type = cur.scalar("<I")
+        cur.pos += 8  # offset des données
+        tensors.append((name, dims, ggml_type))
+    return version, kv, tensors
+
+
+def _first(value):
+    """Certaines architectures déclarent une valeur par couche : on garde le maximum."""
+    if isinstance(value, list): return max(value) if value else None
+    return None if isinstance(value, dict) else value
+
+
+def summarize(version, kv, tensors, size_bytes):
+    """Métadonnées utiles à l'application, à partir de l'en-tête brut."""
+    arch = kv.get("general.architecture", "")
+    get = lambda name: _first(kv.get(f"{arch}.{name}"))
+    heads = get("attention.head_count")
+    embedding = get("embedding_length")
+    head_dim = get("attention.key_length") or (embedding // heads if embedding and heads else None)
+    tokens = kv.get("tokenizer.ggml.tokens")
+    params = 0
+    for _, dims, _ in tensors:
+        n = 1
+        for d in dims: n *= d
+        params += n
+    file_type = kv.get("general.file_type")
+    return {
+        "gguf_version": version,
+        "arch": arch,
+        "name": kv.get("general.name", ""),
+        "layers": get("block_count"),
+        "embedding": embedding,
+        "heads": heads,
+        "kv_heads": get("attention.head_count_kv") or heads,
+        "head_dim": head_dim,
+        "ctx_train": get("context_length"),
+        "quant": FILE_TYPES.get(file_type, f"type {file_type}" if file_type is not None else "?"),
+        "tokenizer": kv.get("tokenizer.ggml.model", ""),
+        "vocab_size": tokens["array_len"] if isinstance(tokens, dict) else len(tokens or []),
+        "params_b": round(params / 1e9, 3),
+        "n_tensors": len(tensors),
+        "size_bytes": size_bytes,
+    }
+
+
+def read_gguf_metadata(path):
+    """Lit l'en-tête d'un GGUF (mmap en lecture seule, sans toucher aux poids). Lève OSError / ValueError."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 24:
+            raise ValueError("Fichier GGUF tronqué")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            try:
+                version, kv, tensors = parse_header(buf)
+            except struct.error as e:
+                raise ValueError(f"En-tête GGUF tronqué : {e}") from e
+    return summarize(version, kv, tensors, size)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _load_disk_cache():
+    try:
+        with open(GGUF_SETTINGS["cache_path"], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("entries", {}) if data.get("version") == READER_VERSION else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_disk_cache(entries):
+    path = GGUF_SETTINGS["cache_path"]
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": READER_VERSION, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Cache facultatif : la lecture de l'en-tête reste possible
+
+
+def _flush():
+    """Réécrit le cache disque s'il a changé (appelé sous `_LOCK`)."""
+    global _DIRTY
+    if _DIRTY and not _DEFERRED:
+        _save_disk_cache(_DISK)
+        _DIRTY = False
+
+
+@contextmanager
+def deferred_writes():
+    """Lecture d'un lot de fichiers : une seule réécriture du cache disque, en sortie."""
+    global _DEFERRED
+    with _LOCK: _DEFERRED += 1
+    try:
+        yield
+    finally:
+        with _LOCK:
+            _DEFERRED -= 1
+            _flush()
+
+
+def get_gguf_metadata(path):
+    """
+    Métadonnées du GGUF `path`, None si absent ou illisible.
+    Cache mémoire puis disque, clé = chemin absolu, validé par (taille, mtime).
+    """
+    global _DISK, _DIRTY
+    if not path or "://" in path: return None  # Backends sans fichier (synthétique)
+    key = os.path.abspath(path)
+    signature = _signature(key)
+    if signature is None: return None
+
+    with _LOCK:
+        hit = _MEMO.get(key)
+        if hit and hit[0] == signature: return hit[1]
+        if _DISK is None: _DISK = _load_disk_cache()
+        cached = _DISK.get(key)
+        if cached and cached.get("source") == signature:
+            meta = cached["meta"]
+        else:
+            try:
+                meta = read_gguf_metadata(key)
+            except (OSError, ValueError) as e:
+                logger.warning("⚠️ [GGUF] %s : %s", os.path.basename(key), e)
+                meta = None
+            _DISK[key] = {"source": signature, "meta": meta}
+            _DIRTY = True
+            _flush()
+        _MEMO[key] = (signature, meta)
+        return meta
+
+
+def kv_cache_gb(meta, n_ctx):
+    """Taille du cache KV (clés + valeurs, f16) pour `n_ctx` tokens."""
+    if not (meta and meta.get("layers") and meta.get("kv_heads") and meta.get("head_dim")): return 0.0
+    per_token = 2 * meta["layers"] * meta["kv_heads"] * meta["head_dim"] * GGUF_SETTINGS["kv_bytes"]
+    return per_token * n_ctx / (1024 ** 3)
+
+
+def estimate_ram_gb(meta, n_ctx):
+    """RAM nécessaire au chargement : poids (taille du fichier) + cache KV + tampons de calcul."""
+    return meta["size_bytes"] / (1024 ** 3) + kv_cache_gb(meta, n_ctx) + GGUF_SETTINGS["overhead_gb"]
@@ -0,0 +1,234 @@
+"""
+Interpréteur IoT à trois niveaux (du plus rapide au plus coûteux) :
+
+1. ⚡ Grammaire : expressions régulières précompilées (action, appareil, pièce, valeurs) ;
+   seules les commandes simples (une action, un appareil, valeur absolue) y sont résolues.
+2. 🗃️ Cache de commandes : commandes déjà interprétées par le LLM, normalisées en gabarits
+   (les nombres deviennent des emplacements, ex. "clim salon <n0> °c") et persistées en SQLite.
+3. 🧠 LLM : uniquement en cas d'échec des deux premiers ; un JSON valide produit par le
+   modèle alimente le cache (apprentissage).
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+
+# --- GRAMMAIRE (synonymes → valeur canonique) ---
+ACTIONS = {
+    "on": ["allume", "allumer", "active", "activer", "demarre", "demarrer", "lance", "lancer", "ouvre", "ouvrir", "mets en marche"],
+    "off": ["eteins", "eteindre", "eteint", "coupe", "couper", "arrete", "arreter", "desactive", "desactiver", "ferme", "fermer"],
+    "set": ["regle", "regler", "mets", "mettre", "baisse", "baisser", "monte", "monter", "augmente", "augmenter", "diminue", "diminuer", "passe", "passer"],
+}
+DEVICES = {
+    "ac": ["climatisation", "climatiseur", "clim"],
+    "light": ["lumieres", "lumiere", "lampes", "lampe", "eclairage", "spots"],
+    "heater": ["chauffage", "radiateur", "radiateurs"],
+    "shutter": ["volets", "volet", "stores", "store"],
+    "tv": ["television", "tele", "tv"],
+    "fan": ["ventilateur", "ventilo"],
+}
+ROOMS = ["salle de bain", "salle a manger", "salon", "cuisine", "chambre", "bureau", "garage", "entree", "jardin", "couloir"]
+
+
+def _alternation(words):
+    # Plus longs d'abord pour que "mets en marche" l'emporte sur "mets"
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+def _compile_map(mapping):
+    return [(canonical, re.compile(rf"\b(?:{_alternation(words)})\b")) for canonical, words in mapping.items()]
+
+
+_ACTION_RES = _compile_map(ACTIONS)
+_DEVICE_RES = _compile_map(DEVICES)
+_ROOM_RE = re.compile(rf"\b({_alternation(ROOMS)})\b")
+# "°" n'est pas un caractère de mot : pas de \b après un "°" seul (« 21° »)
+_TEMP_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:°\s*c\b|°|degres?\b)")
+_PERCENT_RE = re.compile(r"(\d+)\s*(?:%|pour ?cent)")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+# Formes que la grammaire ne sait pas traduire : laissées au LLM plutôt que mal interprétées
+_NEGATION_RE = re.compile(r"\bne\b|\bn'|\b(?:pas|jamais|plus|rien)\b")
+_RELATIVE_RE = re.compile(r"\bde\s+\d|\bd'une?\s+(?:degre|cran|point)|\b(?:moins|davantage|un peu)\b")
+_CLAUSE_RE = re.compile(r"[,;:]\s+\D|\bpuis\b")
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commands (
+    key TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+
+def normalize(command):
+    """Minuscules, sans accents ni ponctuation finale, espaces réduits."""
+    text = unicodedata.normalize("NFKD", command.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[!?.;,]+(\s|$)", r"\1", text.replace("’", "'"))
+    return " ".join(text.split())
+
+
+def _to_number(raw):
+    value = float(raw.replace(",", "."))
+    return int(value) if value.is_integer() else value
+
+
+def _mentions(compiled, text):
+    """Occurrences [(canonique, début)] sans chevauchement : "mets en marche" n'est pas aussi un "mets"."""
+    spans = sorted(
+        ((m.start(), m.end(), canonical) for canonical, rx in compiled for m in rx.finditer(text)),
+        key=lambda s: (s[0], -s[1])
+    )
+    found, last_end = [], -1
+    for start, end, canonical in spans:
+        if start >= last_end:
+            found.append((canonical, start))
+            last_end = end
+    return found
+
+
+def parse_with_grammar(command):
+    """
+    Retourne le dict de commande si la grammaire reconnaît UNE action sur UN appareil, sinon None.
+    Négations, commandes multiples, variations relatives (« de 2° ») et valeurs incompatibles
+    avec l'action sont renvoyées au LLM.
+    """
+    if _CLAUSE_RE.search(command.lower()):
+        return None  # Plusieurs propositions (« Éteins la clim, il fait 19° »)
+    text = normalize(command)
+    if _NEGATION_RE.search(text) or _RELATIVE_RE.search(text):
+        return None
+    devices, actions = _mentions(_DEVICE_RES, text), _mentions(_ACTION_RES, text)
+    rooms = _ROOM_RE.findall(text)
+    if len(devices) != 1 or len(actions) != 1 or len(rooms) > 1:
+        return None
+    device, action = devices[0][0], actions[0][0]
+
+    params = {}
+    if m := _TEMP_RE.search(text): params["temperature"] = _to_number(m.group(1))
+    if m := _PERCENT_RE.search(text): params["level"] = int(m.group(1))
+    # Un "mets / règle" sans valeur n'est pas une commande complète ; "éteins ... à 19°" est contradictoire
+    if (action == "set" and not params) or (action == "off" and params):
+        return None
+    return {"device": device, "action": action, "room": rooms[0] if rooms else None, "params": params}
+
+
+def parse_llm_json(text):
+    """Extrait l'objet JSON d'une réponse de LLM (bloc ```json toléré) ; None si invalide."""
+    cleaned = _FENCE_RE.sub("", text.strip())
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        payload = json.loads(cleaned[start:end + 1])
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+# --- GABARITS (les nombres de la commande deviennent des emplacements) ---
+def _template(command):
+    numbers = []
+
+    def _slot(m):
+        numbers.append(_to_number(m.group(0)))
+        return f"<n{len(numbers) - 1}>"
+
+    return _NUMBER_RE.sub(_slot, normalize(command)), numbers
+
+
+def extract_numbers(command):
+    """Nombres de la commande, dans l'ordre (« 21,5 °C » → [21.5])."""
+    return _template(command)[1]
+
+
+def _slot_payload(node, numbers):
+    """Remplace dans le JSON les valeurs égales à un nombre (unique) de la commande par son emplacement."""
+    if isinstance(node, dict): return {k: _slot_payload(v, numbers) for k, v in node.items()}
+    if isinstance(node, list): return [_slot_payload(v, numbers) for v in node]
+    if isinstance(node, (int, float)) and not isinstance(node, bool) and numbers.count(node) == 1:
+        return {"$slot": numbers.index(node)}
+    return node
+
+
+def _fill_payload(node, numbers):
+    if isinstance(node, dict):
+        if set(node) == {"$slot"}: return numbers[node["$slot"]]
+        return {k: _fill_payload(v, numbers) for k, v in node.items()}
+    if isinstance(node, list): return [_fill_payload(v, numbers) for v in node]
+    return node
+
+
+class IotRouter:
+    """Résolution rapide des commandes IoT ; persistance SQLite partagée entre sessions."""
+
+    def __init__(self, db_path, max_entries=5000):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def namespace(sys_prompt):
+        """Les correspondances apprises dépendent du schéma demandé dans le prompt système."""
+        return hashlib.sha256((sys_prompt or "").encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _key(template, namespace):
+        return hashlib.sha256(f"{namespace}\x1f{template}".encode("utf-8")).hexdigest()
+
+    def resolve(self, command, namespace, use_grammar=True):
+        """Retourne (niveau, commande JSON ou None, durée en ms). Niveau : "grammar", "cache" ou None."""
+        t0 = time.perf_counter()
+        if use_grammar and (payload := parse_with_grammar(command)) is not None:
+            return "grammar", payload, (time.perf_counter() - t0) * 1000
+
+        template, numbers = _template(command)
+        key = self._key(template, namespace)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT payload FROM commands WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE commands SET hits = hits + 1, last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        if row:
+            try:
+                return "cache", _fill_payload(json.loads(row[0]), numbers), (time.perf_counter() - t0) * 1000
+            except (ValueError, IndexError):
+                pass  # Gabarit incohérent : on laisse le LLM répondre et réapprendre
+        return None, None, (time.perf_counter() - t0) * 1000
+
+    def learn(self, command, namespace, llm_text):
+        """Mémorise la réponse du LLM si c'est un JSON valide. Retourne le JSON (ou None)."""
+        payload = parse_llm_json(llm_text)
+        if payload is None:
+            return None
+        template, numbers = _template(command)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO commands (key, template, payload, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self._key(template, namespace), template,
+                 json.dumps(_slot_payload(payload, numbers), ensure_ascii=False), now, now)
+            )
+            # Éviction LRU au-delà du plafond
+            self._conn.execute(
+                "DELETE FROM commands WHERE key IN (SELECT key FROM commands ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        return payload
+
+    def stats(self):
+        with self._lock:
+            n, hits = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM commands").fetchone()
+        return {"entries": n, "hits": hits}
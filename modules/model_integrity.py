@@ -0,0 +1,128 @@
+"""
+Intégrité des fichiers GGUF : SHA-256 en streaming et manifeste local.
+
+- Hachage par blocs dans un tampon réutilisé (`readinto`) : mémoire constante, et hashlib
+  relâche le GIL sur les gros blocs, donc plusieurs fichiers se hachent en parallèle.
+- Le manifeste (JSON à côté des modèles) associe à chaque fichier (taille, mtime, sha256) et le
+  SHA-256 attendu côté Hugging Face (LFS). Un fichier dont taille et mtime n'ont pas changé n'est
+  pas relu : revérifier tout le dossier ne coûte qu'un `stat` par fichier.
+- Le SHA-256 attendu est mémorisé : une vérification ultérieure fonctionne hors ligne.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+from config.models_config import DOWNLOAD_SETTINGS
+
+MANIFEST_VERSION = 1
+# Statuts de vérification
+OK, MISMATCH, UNVERIFIED, MISSING = "ok", "mismatch", "unverified", "missing"
+
+
+def sha256_stream(path, chunk_size=8 * 1024 * 1024, hasher=None, limit=None):
+    """SHA-256 de `path` (ou de ses `limit` premiers octets) lu par blocs. `hasher` permet de poursuivre un calcul."""
+    hasher = hasher or hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    remaining = limit
+    with open(path, "rb", buffering=0) as f:
+        while remaining is None or remaining > 0:
+            n = f.readinto(view if remaining is None or remaining >= chunk_size else view[:remaining])
+            if not n: break
+            hasher.update(view[:n])
+            if remaining is not None: remaining -= n
+    return hasher
+
+
+def upstream_sha256(repo_id, filename):
+    """SHA-256 publié par le Hub pour un fichier LFS (None si indisponible : hors ligne, fichier non LFS)."""
+    from huggingface_hub import HfApi
+    try:
+        infos = HfApi().get_paths_info(repo_id, [filename])
+    except Exception:
+        return None
+    lfs = getattr(infos[0], "lfs", None) if infos else None
+    return getattr(lfs, "sha256", None)
+
+
+class HashManifest:
+    """Manifeste {fichier: {size, mtime_ns, sha256, expected, checked_at}} partagé entre threads."""
+
+    def __init__(self, path=None):
+        self.path = path or DOWNLOAD_SETTINGS["manifest_path"]
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _key(path):
+        return os.path.basename(path)
+
+    def lookup(self, path):
+        """Entrée du manifeste si elle correspond encore au fichier (taille et mtime inchangés), sinon None."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(self._key(path))
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return entry
+        return None
+
+    def expected(self, path):
+        """SHA-256 attendu mémorisé (même si le fichier a changé depuis)."""
+        with self.lock:
+            return (self.entries.get(self._key(path)) or {}).get("expected")
+
+    def record(self, path, sha256, expected=None):
+        st = os.stat(path)
+        with self.lock:
+            previous = self.entries.get(self._key(path)) or {}
+            self.entries[self._key(path)] = {
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256,
+                "expected": expected or previous.get("expected"), "checked_at": round(time.time(), 3),
+            }
+            self._save()
+
+    def forget(self, path):
+        with self.lock:
+            if self.entries.pop(self._key(path), None) is not None: self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def status_of(entry):
+    """Statut d'une entrée du manifeste : ok / mismatch / unverified (pas de SHA-256 attendu)."""
+    if not entry.get("expected"): return UNVERIFIED
+    return OK if entry["sha256"] == entry["expected"] else MISMATCH
+
+
+def verify_file(path, manifest, expected=None):
+    """
+    Vérifie `path` contre `expected` (ou le SHA-256 attendu mémorisé).
+    Retourne (statut, sha256, rehashed) ; le fichier n'est relu que si taille ou mtime ont changé.
+    """
+    if not os.path.exists(path): return MISSING, None, False
+    expected = expected or manifest.expected(path)
+    entry = manifest.lookup(path)
+    rehashed = entry is None
+    sha256 = entry["sha256"] if entry else sha256_stream(path).hexdigest()
+    # Écriture du manifeste seulement si quelque chose a changé (fichier relu ou nouvelle empreinte amont)
+    if rehashed or (expected and entry.get("expected") != expected):
+        manifest.record(path, sha256, expected)
+        entry = manifest.lookup(path)
+    return status_of(entry), sha256, rehashed
@@ -0,0 +1,22 @@
+"""
+Détection des dépendances optionnelles SANS les importer.
+
+`importlib.util.find_spec` ne fait que localiser le paquet : les drapeaux HAS_* coûtent
+quelques microsecondes au démarrage. Les bibliothèques lourdes (llama_cpp, mistralai,
+codecarbon, pypdf, pandas, numpy) sont importées au premier usage, dans les fonctions.
+"""
+from importlib.util import find_spec
+
+
+def has_module(*names):
+    """True si tous les paquets sont installés (aucun n'est chargé)."""
+    try:
+        return all(find_spec(name) is not None for name in names)
+    except (ImportError, ValueError):
+        return False
+
+
+HAS_LOCAL_LIB = has_module("llama_cpp")
+# Le SDK Mistral v1 (client asynchrone) repose sur httpx
+HAS_MISTRAL_LIB = has_module("mistralai", "httpx")
+HAS_CODECARBON = has_module("codecarbon")
@@ -0,0 +1,110 @@
+"""
+Cache exact des réponses pour les requêtes déterministes (température 0 ou seed fixe).
+
+Clé = SHA-256 de (modèle, messages, paramètres d'échantillonnage). Stockage SQLite
+avec plafond de taille et éviction LRU (date de dernier accès).
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    ttft REAL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses(last_access);
+"""
+
+
+def is_deterministic(temperature, seed):
+    """Seules les requêtes reproductibles sont cachables."""
+    return temperature == 0 or seed is not None
+
+
+def model_identity(model_conf):
+    """Identifiant stable du modèle (id API ou fichier GGUF)."""
+    if model_conf.get("type") == "api":
+        return f"api:{model_conf.get('api_id')}"
+    if model_conf.get("type") == "cascade":
+        return "cascade:" + ">".join(model_identity(t["conf"]) for t in model_conf.get("tiers", []))
+    return f"local:{os.path.basename(model_conf.get('file', ''))}"
+
+
+def make_key(model_conf, messages, **sampling):
+    payload = {"model": model_identity(model_conf), "messages": messages, "sampling": sampling}
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class ResponseCache:
+    """Cache SQLite borné en taille (LRU)."""
+
+    def __init__(self, db_path, max_mb=64):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key):
+        """Retourne l'entrée (dict) et rafraîchit sa date d'accès, ou None."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT model, text, input_tokens, output_tokens, duration, ttft FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row: return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+        model, text, input_tokens, output_tokens, duration, ttft = row
+        return {
+            "model": model, "text": text, "input_tokens": input_tokens,
+            "output_tokens": output_tokens, "duration": duration, "ttft": ttft
+        }
+
+    def put(self, key, model, result):
+        """Enregistre une réponse réussie puis applique l'éviction LRU."""
+        size = len(result["text"].encode("utf-8")) + 256  # + surcoût approximatif de la ligne
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, text, input_tokens, output_tokens, duration, ttft, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, result["text"], result["input_tokens"], result["output_tokens"],
+                 result["duration"], result["ttft"], size, now, now)
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes: return
+            # Suppression des entrées les plus anciennement utilisées jusqu'à repasser sous le plafond
+            for old_key, old_size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC"
+            ).fetchall():
+                if total <= self.max_bytes: break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= old_size
+
+    def stats(self):
+        with self._lock:
+            n, size, hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+            ).fetchone()
+        return {"entries": n, "size_mb": size / (1024 * 1024), "hits": hits}
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
@@ -0,0 +1,117 @@
+"""
+Cache sémantique des réponses : réutilise la réponse d'une requête déjà traitée
+lorsque la nouvelle demande en est une paraphrase (similarité cosinus des embeddings).
+
+Un index NumPy (matrice pré-allouée de vecteurs normalisés) est tenu par espace de
+noms (modèle, onglet, prompt système). Chaque espace est borné et évincé en LRU, tout comme
+le nombre d'espaces.
+
+Une entrée peut porter une étiquette (ex. les nombres de la commande) : elle n'est servie
+qu'à une requête de même étiquette, « règle le chauffage à 21 » et « à 19 » restant distinctes
+malgré leur similarité.
+"""
+import time
+import hashlib
+import threading
+
+import numpy as np
+
+
+def namespace_key(model_id, task, sys_prompt):
+    """Les réponses ne sont partagées qu'entre requêtes de même modèle, onglet et prompt système."""
+    sys_hash = hashlib.sha256((sys_prompt or "").encode("utf-8")).hexdigest()[:16]
+    return f"{model_id}|{task}|{sys_hash}"
+
+
+class _Namespace:
+    def __init__(self, dim, capacity):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries = [None] * capacity
+        self.tags = [None] * capacity
+        self.last_access = np.zeros(capacity, dtype=np.float64)
+        self.last_used = time.time()
+        self.size = 0
+
+
+class SemanticCache:
+    """
+    `embed_fn(texte) -> vecteur` est fourni par l'appelant (modèle d'embedding local).
+    Les appels à `embed_fn` sont sérialisés (llama.cpp n'est pas thread-safe).
+    """
+
+    def __init__(self, embed_fn, threshold=0.92, max_entries=256, max_namespaces=32):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self._spaces = {}
+        self._lock = threading.Lock()
+        self.metrics = {"lookups": 0, "hits": 0, "saved_s": 0.0, "embed_s": 0.0}
+
+    def embed(self, text):
+        t0 = time.perf_counter()
+        with self._lock:
+            vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+        if vec.ndim > 1: vec = vec.mean(axis=0)  # Embeddings par token : mean pooling
+        norm = np.linalg.norm(vec)
+        self.metrics["embed_s"] += time.perf_counter() - t0
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, ns_key, query, tag=None):
+        """
+        Retourne (entrée, similarité, vecteur requête). Entrée None si aucun voisin assez proche
+        ou si les voisins proches portent une autre étiquette que `tag`.
+        """
+        t0 = time.perf_counter()
+        vec = self.embed(query)
+        with self._lock:
+            self.metrics["lookups"] += 1
+            space = self._spaces.get(ns_key)
+            if space is None or space.size == 0 or space.vectors.shape[1] != vec.shape[0]:
+                return None, 0.0, vec
+            space.last_used = time.time()
+            sims = space.vectors[:space.size] @ vec
+            mismatch = np.fromiter((t != tag for t in space.tags[:space.size]), dtype=bool, count=space.size)
+            sims = np.where(mismatch, -1.0, sims)
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            if similarity < self.threshold:
+                return None, similarity, vec
+            space.last_access[best] = time.time()
+            entry = space.entries[best]
+            self.metrics["hits"] += 1
+            # Gain net : durée de l'inférence d'origine moins le coût de la recherche
+            self.metrics["saved_s"] += max(entry["duration"] - (time.perf_counter() - t0), 0.0)
+            return entry, similarity, vec
+
+    def add(self, ns_key, vec, entry, tag=None):
+        """Ajoute (ou remplace le moins récemment utilisé si l'espace est plein)."""
+        with self._lock:
+            space = self._spaces.get(ns_key)
+            if space is None:
+                if len(self._spaces) >= self.max_namespaces:
+                    # Espace le moins récemment utilisé évincé en entier
+                    del self._spaces[min(self._spaces, key=lambda k: self._spaces[k].last_used)]
+                space = self._spaces[ns_key] = _Namespace(vec.shape[0], self.max_entries)
+            space.last_used = time.time()
+            if space.size < self.max_entries:
+                slot = space.size
+                space.size += 1
+            else:
+                slot = int(np.argmin(space.last_access))
+            space.vectors[slot] = vec
+            space.entries[slot] = entry
+            space.tags[slot] = tag
+            space.last_access[slot] = time.time()
+
+    def stats(self):
+        lookups = self.metrics["lookups"]
+        return {
+            "entries": sum(s.size for s in self._spaces.values()),
+            "namespaces": len(self._spaces),
+            "lookups": lookups,
+            "hits": self.metrics["hits"],
+            "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+            "saved_s": self.metrics["saved_s"],
+            "avg_embed_ms": 1000 * self.metrics["embed_s"] / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,135 @@
+"""
+Synthèse Map-Reduce pour les documents plus longs que la fenêtre de contexte.
+
+1. MAP    : le document est découpé en extraits qui tiennent dans le contexte,
+            chaque extrait est résumé (en parallèle pour l'API Mistral).
+2. REDUCE : les résumés partiels sont fusionnés. Si leur concaténation dépasse
+            encore le contexte, on réduit par groupes (hiérarchique) jusqu'à un seul appel final.
+            Les résumés sont plafonnés à la moitié du budget de fusion : deux résumés tiennent
+            toujours dans un appel, et chaque niveau réduit effectivement leur nombre.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from modules.utils import count_tokens_approx, split_into_chunks, effective_ctx, run_completion, JobMeter
+
+MAP_MAX_TOKENS = 512        # Longueur max d'un résumé partiel
+MAX_CHUNK_TOKENS = 6000     # Plafond d'un extrait (même si le contexte API est immense)
+PROMPT_MARGIN_TOKENS = 256  # Marge pour le gabarit du prompt et l'imprécision de l'estimation
+MAX_REDUCE_LEVELS = 6       # Garde-fou : profondeur max de la réduction hiérarchique
+
+MAP_TEMPLATE = (
+    "EXTRAIT {i}/{n} d'un document long.\nCTX:\n{chunk}\n"
+    "REQ: Résume cet extrait en conservant les faits, chiffres et noms utiles pour la demande suivante : {instr}"
+)
+REDUCE_TEMPLATE = (
+    "Voici des résumés partiels successifs d'un même document.\nCTX:\n{summaries}\nREQ: {instr}"
+)
+
+
+def chunk_budget(model_conf, sys_prompt, instruction):
+    """Taille max (tokens) d'un extrait pour que prompt + réponse tiennent dans le contexte."""
+    overhead = count_tokens_approx(sys_prompt) + count_tokens_approx(instruction) + PROMPT_MARGIN_TOKENS
+    budget = effective_ctx(model_conf) - MAP_MAX_TOKENS - overhead
+    return max(min(budget, MAX_CHUNK_TOKENS), 256)
+
+
+def _group_to_budget(texts, budget):
+    """Regroupe des textes consécutifs en lots dont la taille cumulée reste sous le budget."""
+    groups, current, size = [], [], 0
+    for t in texts:
+        n = count_tokens_approx(t)
+        if current and size + n > budget:
+            groups.append(current)
+            current, size = [], 0
+        current.append(t)
+        size += n
+    if current: groups.append(current)
+    return groups
+
+
+def _fit_to_budget(texts, budget):
+    """Re-découpe les résumés plus longs que `budget` (estimation dépassée par un modèle bavard)."""
+    fitted = []
+    for t in texts:
+        fitted.extend(split_into_chunks(t, budget) if count_tokens_approx(t) > budget else [t])
+    return fitted
+
+
+def map_reduce_summarize(text, instruction, sys_prompt, gen_kwargs, max_workers=4, on_progress=None, on_update=None):
+    """
+    Exécute la synthèse Map-Reduce complète.
+    - `on_progress(fait, total, libellé)` : avancement des étapes (appelé depuis le thread appelant).
+    - `on_update(texte_partiel)` : streaming de la réduction finale.
+    Retourne un dict agrégé (cf. `JobMeter.finish`) + text, error, n_chunks, levels.
+    """
+    model_type = gen_kwargs["model_type"]
+    model_conf = gen_kwargs["model_conf"]
+    base_kwargs = dict(gen_kwargs)
+
+    # llama.cpp sérialise de toute façon les appels : pas de parallélisme côté local
+    workers = max_workers if model_type == "api" else 1
+
+    job = {"text": "", "error": None, "levels": 0}
+
+    def _messages(user_content):
+        return [{"role": "system", "content": sys_prompt}, {"role": "user", "content": user_content}]
+
+    def _run_parallel(prompts, label):
+        """Lance une vague d'appels et renvoie les sorties dans l'ordre d'origine."""
+        outputs = [None] * len(prompts)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(run_completion, messages=_messages(p), track_energy=False, **map_kwargs): i
+                for i, p in enumerate(prompts)
+            }
+            for done, fut in enumerate(as_completed(futures), 1):
+                res = fut.result()
+                if res["error"]: raise RuntimeError(res["error"])
+                meter.add(res)
+                outputs[futures[fut]] = res["text"]
+                if on_progress: on_progress(done, len(prompts), label)
+        return outputs
+
+    budget = chunk_budget(model_conf, sys_prompt, instruction)
+    # La réduction finale répond avec max_tokens complet : on lui réserve la différence
+    final_budget = max(budget - max(0, base_kwargs.get("max_tokens", 1024) - MAP_MAX_TOKENS), 256)
+    # Résumés (map et niveaux intermédiaires) plafonnés à la moitié du budget : une paire tient toujours
+    summary_tokens = min(MAP_MAX_TOKENS, final_budget // 2)
+    map_kwargs = dict(base_kwargs, max_tokens=min(base_kwargs.get("max_tokens", 1024), summary_tokens))
+    chunks = []
+    meter = JobMeter(model_type, model_conf, gen_kwargs.get("carbon_intensity", 475.0))
+
+    try:
+        # --- 1. MAP ---
+        chunks = split_into_chunks(text, budget)
+        prompts = [MAP_TEMPLATE.format(i=i, n=len(chunks), chunk=c, instr=instruction) for i, c in enumerate(chunks, 1)]
+        summaries = _fit_to_budget(_run_parallel(prompts, "Map : résumé des extraits"), summary_tokens)
+
+        # --- 2. REDUCE HIÉRARCHIQUE (tant que la fusion ne tient pas en un appel) ---
+        # Chaque résumé tient dans la moitié du budget : les lots en regroupent au moins deux
+        groups = _group_to_budget(summaries, final_budget)
+        while len(groups) > 1:
+            if job["levels"] >= MAX_REDUCE_LEVELS:
+                raise RuntimeError(f"Réduction non convergente après {MAX_REDUCE_LEVELS} niveaux ({len(summaries)} résumés restants).")
+            job["levels"] += 1
+            prompts = [REDUCE_TEMPLATE.format(summaries="\n\n".join(g), instr=instruction) for g in groups]
+            summaries = _fit_to_budget(_run_parallel(prompts, f"Reduce niveau {job['levels']}"), summary_tokens)
+            groups = _group_to_budget(summaries, final_budget)
+
+        # --- 3. RÉDUCTION FINALE (streamée) ---
+        job["levels"] += 1
+        if on_progress: on_progress(0, 1, "Fusion finale")
+        final = run_completion(
+            messages=_messages(REDUCE_TEMPLATE.format(summaries="\n\n".join(summaries), instr=instruction)),
+            track_energy=False, on_update=on_update, **base_kwargs
+        )
+        if final["error"]: raise RuntimeError(final["error"])
+        meter.add(final)
+        job["text"] = final["text"]
+    except Exception as e:
+        job["error"] = str(e)
+
+    # --- BILAN GREEN IT DU JOB COMPLET ---
+    job.update(meter.finish())
+    job["n_chunks"] = len(chunks)
+    return job
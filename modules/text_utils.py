@@ -0,0 +1,48 @@
+"""
+Heuristiques de texte sans dépendance à l'interface (estimation de tokens, découpage en passages).
+
+Importables par les modules d'indexation et de traitement par lots sans charger Streamlit ;
+`modules.utils` les réexporte pour le code existant.
+"""
+import re
+
+
+def count_tokens_approx(text: str) -> int:
+    """Estimation rapide : 1 token ~= 2.7 caractères."""
+    if not text: return 0
+    return int(len(text) / 2.7)
+
+
+def split_into_chunks(text: str, max_tokens: int = 350) -> list:
+    """
+    Découpe un texte en passages d'environ `max_tokens` tokens (même heuristique /2.7).
+    On coupe de préférence sur les paragraphes, puis sur les phrases si un paragraphe est trop long.
+    """
+    if not text: return []
+    max_chars = max(int(max_tokens * 2.7), 200)
+
+    # 1. Unités élémentaires : paragraphes, re-découpés en phrases si nécessaire
+    units = []
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para: continue
+        if len(para) <= max_chars:
+            units.append(para)
+            continue
+        for sent in re.split(r"(?<=[.!?;])\s+", para):
+            # Phrase géante (tableau, PDF mal extrait) : coupe franche
+            while len(sent) > max_chars:
+                units.append(sent[:max_chars])
+                sent = sent[max_chars:]
+            if sent: units.append(sent)
+
+    # 2. Regroupement glouton jusqu'à la taille cible
+    chunks, current, current_len = [], [], 0
+    for unit in units:
+        if current and current_len + len(unit) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(unit)
+        current_len += len(unit) + 1
+    if current: chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,209 @@
+"""
+Moteur de traduction à mémoire de traduction (TM) pour l'onglet Traduction.
+
+1. Le texte source est segmenté en phrases (séparateurs conservés pour le réassemblage).
+2. Chaque phrase unique est cherchée dans une TM persistante (SQLite) indexée par
+   (texte source, langue cible, modèle).
+3. Seules les phrases absentes sont envoyées au modèle, numérotées, en lots qui tiennent
+   dans le contexte ; les traductions obtenues alimentent la TM.
+4. La traduction est réassemblée dans l'ordre d'origine.
+"""
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+
+from modules.response_cache import model_identity
+from modules.utils import count_tokens_approx, effective_ctx, run_completion, JobMeter
+
+# Coupure après ponctuation forte suivie d'espaces, ou sur les sauts de ligne (séparateurs capturés)
+_SPLIT_RE = re.compile(r"((?<=[.!?…:;])[ \t]+|\s*\n\s*)")
+_NUMBERED_LINE_RE = re.compile(r"^\s*\[(\d+)\]\s?(.*)$")
+
+NUMBERING_RULE = (
+    "The input is a list of numbered segments like [1] ..., [2] .... "
+    "Translate each segment independently and output exactly one line per segment, "
+    "prefixed with the same [n] number. No comments, no extra lines."
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm (
+    key TEXT PRIMARY KEY,
+    src TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    model TEXT NOT NULL,
+    tgt TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+"""
+
+
+def segment_text(text):
+    """
+    Découpe en [(segment, séparateur_suivant)]. Les segments vides (espaces seuls)
+    sont fusionnés dans le séparateur : "".join(seg + sep) redonne le texte d'origine.
+    """
+    parts = _SPLIT_RE.split(text)
+    segments = []
+    for i in range(0, len(parts), 2):
+        seg = parts[i]
+        sep = parts[i + 1] if i + 1 < len(parts) else ""
+        if seg.strip():
+            segments.append([seg, sep])
+        elif segments:
+            segments[-1][1] += seg + sep
+        else:
+            segments.append(["", seg + sep])
+    return [tuple(s) for s in segments]
+
+
+class TranslationMemory:
+    """Mémoire de traduction persistante, partagée entre sessions."""
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(src, lang, model_id):
+        norm = " ".join(src.split())  # Insensible aux espaces multiples
+        return hashlib.sha256(f"{model_id}\x1f{lang}\x1f{norm}".encode("utf-8")).hexdigest()
+
+    def lookup_many(self, sources, lang, model_id):
+        """Retourne {source: traduction} pour les segments présents en mémoire."""
+        keys = {self.make_key(s, lang, model_id): s for s in sources}
+        found = {}
+        with self._lock, self._conn:
+            key_list = list(keys)
+            for i in range(0, len(key_list), 500):  # Limite de variables SQLite
+                batch = key_list[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, tgt FROM tm WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, tgt in rows: found[keys[key]] = tgt
+                self._conn.executemany("UPDATE tm SET hits = hits + 1 WHERE key = ?", [(k,) for k, _ in rows])
+        return found
+
+    def store_many(self, pairs, lang, model_id):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tm (key, src, lang, model, tgt, created) VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.make_key(s, lang, model_id), s, lang, model_id, t, now) for s, t in pairs]
+            )
+
+    def stats(self):
+        with self._lock:
+            n, hits = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM tm").fetchone()
+        return {"segments": n, "hits": hits}
+
+
+def _batches(segments, budget_tokens):
+    """Lots de segments numérotables dont la taille estimée reste sous le budget."""
+    batches, current, size = [], [], 0
+    for seg in segments:
+        n = count_tokens_approx(seg) + 4
+        if current and size + n > budget_tokens:
+            batches.append(current)
+            current, size = [], 0
+        current.append(seg)
+        size += n
+    if current: batches.append(current)
+    return batches
+
+
+def parse_numbered(output, expected):
+    """Extrait {index: traduction} des lignes "[n] ..." (index 1..expected)."""
+    found = {}
+    for line in output.splitlines():
+        m = _NUMBERED_LINE_RE.match(line)
+        if m and 1 <= int(m.group(1)) <= expected:
+            found[int(m.group(1))] = m.group(2).strip()
+    return found
+
+
+def translate_missing(segments, lang, sys_prompt, gen_kwargs, meter, on_partial=None):
+    """
+    Traduit une liste de segments uniques (absents de la TM) par lots numérotés.
+    Les segments non restitués par le modèle sont retraduits un par un.
+    Retourne {segment: traduction}.
+    """
+    max_tokens = gen_kwargs.get("max_tokens", 1024)
+    # La sortie fait à peu près la taille de l'entrée : on partage le contexte en deux
+    budget = max(min((effective_ctx(gen_kwargs["model_conf"]) - count_tokens_approx(sys_prompt)) // 2, max_tokens), 128)
+    batch_sys = f"{sys_prompt}\n{NUMBERING_RULE}"
+    results = {}
+
+    for batch in _batches(segments, budget):
+        user = "\n".join(f"[{i}] {' '.join(seg.split())}" for i, seg in enumerate(batch, 1))
+
+        def _on_update(partial, batch=batch):
+            if on_partial:
+                parsed = parse_numbered(partial, len(batch))
+                on_partial({batch[i - 1]: t for i, t in parsed.items()})
+
+        res = run_completion(
+            messages=[{"role": "system", "content": batch_sys}, {"role": "user", "content": user}],
+            track_energy=False, on_update=_on_update, **gen_kwargs
+        )
+        if res["error"]: raise RuntimeError(res["error"])
+        meter.add(res)
+        for i, tgt in parse_numbered(res["text"], len(batch)).items():
+            if tgt: results[batch[i - 1]] = tgt
+
+        # Repli : segments perdus par le modèle (numérotation non respectée)
+        for seg in batch:
+            if seg in results: continue
+            res = run_completion(
+                messages=[{"role": "system", "content": sys_prompt}, {"role": "user", "content": seg}],
+                track_energy=False, **gen_kwargs
+            )
+            if res["error"]: raise RuntimeError(res["error"])
+            meter.add(res)
+            results[seg] = res["text"].strip()
+            if on_partial: on_partial({seg: results[seg]})
+    return results
+
+
+def translate_with_memory(text, lang, sys_prompt, gen_kwargs, tm, on_update=None):
+    """
+    Traduction complète avec TM. `on_update(texte_partiel)` reçoit le texte réassemblé
+    au fil de l'eau (segments connus immédiatement, puis ceux traduits par le modèle).
+    Retourne un dict (cf. `JobMeter.finish`) + text, error, segments, unique, tm_hits, translated.
+    """
+    model_id = model_identity(gen_kwargs["model_conf"])
+    segments = segment_text(text)
+    unique = list(dict.fromkeys(seg for seg, _ in segments if seg.strip()))
+
+    meter = JobMeter(gen_kwargs["model_type"], gen_kwargs["model_conf"], gen_kwargs.get("carbon_intensity", 475.0))
+    translations = tm.lookup_many(unique, lang, model_id)
+    job = {"text": "", "error": None, "segments": len(segments), "unique": len(unique), "tm_hits": len(translations)}
+
+    def _assemble(current):
+        return "".join((current.get(seg, "…") if seg.strip() else seg) + sep for seg, sep in segments)
+
+    if on_update: on_update(_assemble(translations))
+    misses = [seg for seg in unique if seg not in translations]
+    # Vue courante : TM + traductions reçues, y compris celles des lots précédents
+    shown = dict(translations)
+    try:
+        if misses:
+            def _on_partial(new):
+                shown.update(new)
+                if on_update: on_update(_assemble(shown))
+            fresh = translate_missing(misses, lang, sys_prompt, gen_kwargs, meter, on_partial=_on_partial)
+            tm.store_many(fresh.items(), lang, model_id)
+            translations.update(fresh)
+    except Exception as e:
+        job["error"] = str(e)
+
+    job["translated"] = len(misses)
+    job["text"] = _assemble(translations)
+    job.update(meter.finish())
+    return job
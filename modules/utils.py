@@ -1,11 +1,18 @@
 import os
+import re
 import time
-import pypdf
-import pandas as pd
-import psutil
+import threading
 import platform
-from io import StringIO
 import streamlit as st
+from config.models_config import RESPONSE_CACHE_SETTINGS, SEMANTIC_CACHE_SETTINGS, CARBON_SETTINGS
+from modules.api_client import get_api_pool
+from modules.extraction import extract_text_cached
+from modules.fake_backend import SyntheticLlama
+from modules.gguf_reader import get_gguf_metadata, estimate_ram_gb
+from modules.response_cache import ResponseCache, is_deterministic, model_identity, make_key as make_cache_key
+from modules.cascade import run_cascade, describe_attempts
+from modules.iot_router import extract_numbers
+from modules.text_utils import count_tokens_approx, split_into_chunks
 
 # --- CONSTANTES GREEN IT (METHODOLOGIE ROBUSTE) ---
 # 1. SCOPE 3 : Empreinte de fabrication amortie sur la durée de vie
@@ -18,29 +25,25 @@ LAPTOP_EMBODIED_G_PER_SEC = 0.0028
 # On ajoute une consommation fixe estimée pour le reste du châssis.
 LAPTOP_PERIPHERALS_WATT = 12.0 # Watts constants (Écran allumé, Wifi ON)
 
+# 3. API : datacenter Mistral (France), intensité fixe pour le Scope 2
+API_DATACENTER_INTENSITY = 56.0
+
 # --- GESTION DES IMPORTS OPTIONNELS ---
-try:
-    from llama_cpp import Llama
-    HAS_LOCAL_LIB = True
-except ImportError:
-    HAS_LOCAL_LIB = False
-
-try:
-    from mistralai import Mistral
-    HAS_MISTRAL_LIB = True
-except ImportError:
-    HAS_MISTRAL_LIB = False
-
-try:
-    from codecarbon import OfflineEmissionsTracker
-    HAS_CODECARBON = True
-except ImportError:
-    HAS_CODECARBON = False
+# Drapeaux calculés sans import : llama_cpp / codecarbon / pandas / psutil sont chargés au premier usage
+from modules.optional_deps import HAS_LOCAL_LIB, HAS_MISTRAL_LIB, HAS_CODECARBON
 
 # --- CHARGEMENT DU MOTEUR (LOCAL) ---
+LOCAL_MAX_CTX = 8192 # Plafond n_ctx au chargement (RAM d'un laptop standard)
+
+# llama.cpp n'est pas thread-safe : les sessions / workers partagent le modèle chargé via ce verrou
+LOCAL_LLM_LOCK = threading.Lock()
+
 @st.cache_resource(show_spinner="Chargement du modèle en mémoire RAM...", max_entries=1)
-def load_local_llm(path, ctx_size):
-    """Charge un modèle GGUF en mémoire avec Llama-cpp"""
+def load_local_llm(path, ctx_size, backend="llama_cpp", options=None):
+    """Charge un modèle GGUF en mémoire avec Llama-cpp (ou le backend synthétique de test)"""
+    if backend == "synthetic":
+        return SyntheticLlama(**(options or {}))
+
     abs_path = os.path.abspath(path)
     print(f"\n🔄 [DEBUG] Chargement : {abs_path}")
     
@@ -48,183 +51,263 @@ def load_local_llm(path, ctx_size):
         raise ImportError("Librairie `llama-cpp-python` manquante.")
         
     try:
-        return Llama(model_path=abs_path, n_ctx=min(ctx_size, 8192), n_gpu_layers=-1, verbose=True)
+        from llama_cpp import Llama
+        # Pas de fenêtre plus grande que le contexte d'entraînement déclaré dans l'en-tête GGUF
+        meta = get_gguf_metadata(path)
+        n_ctx = min(ctx_size, LOCAL_MAX_CTX, (meta or {}).get("ctx_train") or ctx_size)
+        return Llama(model_path=abs_path, n_ctx=n_ctx, n_gpu_layers=-1, verbose=True)
     except Exception as e:
         raise RuntimeError(f"Erreur Llama-cpp : {str(e)}")
 
 
 # --- HELPERS (TOKENS & FICHIERS) ---
-def count_tokens_approx(text: str) -> int:
-    """Estimation rapide : 1 token ~= 2.7 caractères."""
-    if not text: return 0
-    return int(len(text) / 2.7)
-
 def extract_text_from_file(uploaded_file):
-    """Extrait le texte brut d'un PDF ou TXT"""
-    text = ""
-    if uploaded_file.type == "application/pdf":
-        try:
-            pdf_reader = pypdf.PdfReader(uploaded_file)
-            for page in pdf_reader.pages: 
-                extracted = page.extract_text()
-                if extracted: text += extracted + "\n"
-        except Exception as e:
+    """Extrait le texte brut d'un PDF ou TXT (mis en cache par empreinte du contenu)"""
+    try:
+        return extract_text_cached(uploaded_file.getvalue(), uploaded_file.type)
+    except Exception as e:
+        if uploaded_file.type == "application/pdf":
             return f"[Erreur lecture PDF: {str(e)}]"
-    elif uploaded_file.type == "text/plain":
-        stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-        text = stringio.read()
-    return text
+        raise
 
 
 # --- MOTEUR DE GÉNÉRATION PRINCIPAL ---
-def generate_stream(model_type, model_conf, llm_local, api_key, messages, temperature=0.7, max_tokens=1024, top_p=0.9, top_k=40, carbon_intensity=475.0):
+def effective_ctx(model_conf):
+    """Fenêtre de contexte réellement utilisable (le chargement local plafonne n_ctx, l'en-tête GGUF aussi)."""
+    ctx = model_conf.get("ctx", 32768)
+    if model_conf.get("type") != "local": return ctx
+    meta = get_gguf_metadata(model_conf.get("file"))
+    if meta and meta.get("ctx_train"): ctx = min(ctx, meta["ctx_train"])
+    return min(ctx, LOCAL_MAX_CTX)
+
+def model_memory(model_conf):
     """
-    Gère l'inférence streamée + Calcul Green IT (Fallback Manuel pour API).
+    (poids Go, RAM Go au contexte effectif) d'un modèle local.
+    Valeurs exactes lues dans l'en-tête GGUF si le fichier est présent, sinon celles du catalogue.
     """
-    response_placeholder = st.empty()
-    
-    # Check Sécurité
-    if model_type == "local" and llm_local is None:
-        response_placeholder.error("❌ Modèle local non chargé.")
-        return ""
+    info = model_conf.get("info", {})
+    meta = get_gguf_metadata(model_conf.get("file")) if model_conf.get("type") == "local" else None
+    if not meta: return info.get("disk", 0.0), info.get("ram", 0.0)
+    return meta["size_bytes"] / (1024 ** 3), estimate_ram_gb(meta, effective_ctx(model_conf))
 
-    response_placeholder.markdown("⏳ _Réflexion..._")
+def start_energy_tracker():
+    """Démarre un tracker CodeCarbon (mesure CPU). Retourne None si indisponible."""
+    if not HAS_CODECARBON: return None
+    try:
+        from codecarbon import OfflineEmissionsTracker
+        tracker = OfflineEmissionsTracker(
+            country_iso_code="FRA", 
+            measure_power_secs=0.1, 
+            log_level="error", 
+            save_to_file=False
+        )
+        tracker.start()
+        return tracker
+    except Exception:
+        return None
+
+def stop_energy_tracker(tracker):
+    """Arrête le tracker et retourne l'énergie CPU mesurée (kWh)."""
+    if not tracker: return 0.0
+    try:
+        tracker.stop()
+        return tracker.final_emissions_data.energy_consumed
+    except Exception:
+        return 0.0
+
+def compute_footprint(model_type, model_conf, input_tokens, output_tokens, duration, cpu_energy_kwh=0.0, carbon_intensity=475.0):
+    """
+    Calcul Green IT Iso-Scope (Scope 2 + Scope 3). Retourne (énergie kWh, gCO2e).
+    """
+    if model_type == "api":
+        # Mistral (Cloud FR) - Méthode EcoLogits (Scope 2 + Scope 3 inclus dans les facteurs)
+        eco = model_conf.get("eco_ops", {"kwh_1k_in": 0.0002, "kwh_1k_out": 0.0004, "embodied_g_1k": 0.05})
+        e_in = (input_tokens / 1000) * eco["kwh_1k_in"]
+        e_out = (output_tokens / 1000) * eco["kwh_1k_out"]
+        energy_kwh = e_in + e_out
+        
+        scope2 = energy_kwh * API_DATACENTER_INTENSITY # France fixe (Datacenter)
+        scope3 = ((input_tokens + output_tokens) / 1000) * eco["embodied_g_1k"]
+        return energy_kwh, scope2 + scope3
+
+    # Local (CodeCarbon + Périphériques + Amortissement)
+    # A. Mesure CPU (Active) : fournie par l'appelant via CodeCarbon (cpu_energy_kwh)
+    # B. Estimation Périphériques (Passive : Écran, SSD...)
+    # Formule : Puissance (kW) * Temps (h)
+    peripherals_energy_kwh = (LAPTOP_PERIPHERALS_WATT / 1000) * (duration / 3600)
     
-    # --- SETUP MONITORING LOCAL (CodeCarbon) ---
-    cc_tracker = None
-    if model_type == "local" and HAS_CODECARBON:
-        try:
-            cc_tracker = OfflineEmissionsTracker(
-                country_iso_code="FRA", 
-                measure_power_secs=0.1, 
-                log_level="error", 
-                save_to_file=False
+    # Total Énergie (Scope 2 complet)
+    energy_kwh = cpu_energy_kwh + peripherals_energy_kwh
+    
+    # Calcul Carbone
+    scope2 = energy_kwh * carbon_intensity
+    
+    # C. Ajout Scope 3 (Amortissement Matériel)
+    scope3 = duration * LAPTOP_EMBODIED_G_PER_SEC
+    
+    return energy_kwh, scope2 + scope3
+
+class JobMeter:
+    """
+    Agrège les métriques d'un job multi-appels (Map-Reduce, traduction par lots...).
+    Local : un seul tracker CodeCarbon couvre toute la durée du job (appels lancés avec track_energy=False).
+    API / Auto : somme des empreintes de chaque appel (la cascade mesure elle-même ses niveaux locaux).
+    """
+    def __init__(self, model_type, model_conf, carbon_intensity=475.0):
+        self.model_type, self.model_conf, self.carbon_intensity = model_type, model_conf, carbon_intensity
+        self.totals = {"input_tokens": 0, "output_tokens": 0, "energy_kwh": 0.0, "co2_g": 0.0, "queue_s": 0.0, "n_calls": 0}
+        self.ttft = None
+        self._tracker = start_energy_tracker() if model_type == "local" else None
+        self._start = time.time()
+
+    def add(self, res):
+        if self.ttft is None and res.get("ttft") is not None:
+            self.ttft = time.time() - self._start
+        for key in ("input_tokens", "output_tokens", "energy_kwh", "co2_g", "queue_s"):
+            self.totals[key] += res[key]
+        self.totals["n_calls"] += 1
+
+    def finish(self):
+        """Arrête la mesure et retourne un dict compatible avec `render_run_metrics`."""
+        duration = time.time() - self._start
+        cpu_energy_kwh = stop_energy_tracker(self._tracker)
+        if self.model_type != "local":
+            energy_kwh, co2_g = self.totals["energy_kwh"], self.totals["co2_g"]
+        else:
+            energy_kwh, co2_g = compute_footprint(
+                self.model_type, self.model_conf, self.totals["input_tokens"], self.totals["output_tokens"],
+                duration, cpu_energy_kwh=cpu_energy_kwh, carbon_intensity=self.carbon_intensity
             )
-            cc_tracker.start()
-        except Exception: pass
+        return dict(self.totals, duration=duration, ttft=self.ttft, energy_kwh=energy_kwh, co2_g=co2_g, cache_hit=False)
 
-    start_time = time.time()
-    full_response = ""
-    input_tokens = 0
-    output_tokens = 0
-    
-    # --- BRANCHE API ---
+def _chunk_logprobs(choice):
+    """Log-probs d'un chunk streamé (format chat `content` ou format complétion `token_logprobs`)."""
+    lp = choice.get("logprobs")
+    if not lp: return []
+    if lp.get("content"): return [t["logprob"] for t in lp["content"] if t.get("logprob") is not None]
+    return [v for v in lp.get("token_logprobs") or [] if v is not None]
+
+def _stream_local(llm_local, messages, on_delta, on_logprobs=None, **sampling):
+    """Streaming llama.cpp avec fallback pour les modèles sans rôle 'system' (Gemma)."""
+    def _consume(stream):
+        for chunk in stream:
+            choice = chunk["choices"][0]
+            if "content" in choice["delta"]:
+                on_delta(choice["delta"]["content"])
+            if on_logprobs: on_logprobs(_chunk_logprobs(choice))
+
+    try:
+        _consume(llm_local.create_chat_completion(messages=messages, stream=True, **sampling))
+    except ValueError as e:
+        if "System role not supported" not in str(e): raise
+        system_msg = next((m for m in messages if m['role'] == 'system'), None)
+        new_msgs = [dict(m) for m in messages if m['role'] != 'system']
+        if not (system_msg and new_msgs and new_msgs[0]['role'] == 'user'): raise
+        new_msgs[0]['content'] = f"CTX: {system_msg['content']}\n\nQ: {new_msgs[0]['content']}"
+        _consume(llm_local.create_chat_completion(messages=new_msgs, stream=True, **sampling))
+
+def run_completion(model_type, model_conf, llm_local, api_key, messages, temperature=0.7, max_tokens=1024, top_p=0.9, top_k=40, carbon_intensity=475.0, seed=None, on_update=None, track_energy=True, logprobs=False, local_lock=None):
+    """
+    Inférence streamée SANS affichage (utilisable depuis un thread de travail).
+    `on_update(texte_partiel)` est appelé à chaque token reçu.
+    `logprobs=True` (local uniquement, modèle chargé avec logits_all) remplit `result["logprobs"]`.
+    `local_lock` : verrou propre à une instance Llama dédiée (défaut : verrou du modèle partagé).
+    Retourne un dict : text, input_tokens, output_tokens, duration, ttft, queue_s, energy_kwh, co2_g, cache_hit, error.
+    """
+    sampling_args = dict(temperature=temperature, max_tokens=max_tokens, top_p=top_p, top_k=top_k, carbon_intensity=carbon_intensity, seed=seed)
+    if model_type == "cascade":
+        return run_cascade(model_conf, api_key, messages, on_update=on_update, **sampling_args)
+
+    result = {
+        "text": "", "input_tokens": 0, "output_tokens": 0, "duration": 0.0, "ttft": None,
+        "queue_s": 0.0, "energy_kwh": 0.0, "co2_g": 0.0, "cache_hit": False, "error": None, "logprobs": None
+    }
+
+    # Check Sécurité
+    if model_type == "local" and llm_local is None:
+        result["error"] = "❌ Modèle local non chargé."
+        return result
     if model_type == "api":
         if not api_key:
-            response_placeholder.error("Clé API manquante.")
-            return ""
+            result["error"] = "Clé API manquante."
+            return result
         if not HAS_MISTRAL_LIB:
-            response_placeholder.error("Librairie `mistralai` manquante.")
-            return ""
-            
+            result["error"] = "Librairie `mistralai` manquante."
+            return result
+
+    parts = []
+    start_time = time.time()
+
+    def on_delta(content):
+        if result["ttft"] is None: result["ttft"] = time.time() - start_time
+        parts.append(content)
+        result["output_tokens"] += 1
+        if on_update: on_update("".join(parts))
+
+    # --- BRANCHE API ---
+    if model_type == "api":
         try:
-            client = Mistral(api_key=api_key)
-            stream = client.chat.stream(
+            # Client mutualisé par clé : connexions HTTPS réutilisées, reprises sur 429 / 5xx
+            prompt_tokens, _ = get_api_pool().stream_chat(
+                api_key, on_delta,
                 model=model_conf["api_id"],
                 messages=messages,
                 temperature=temperature,
                 top_p=top_p,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                random_seed=seed
             )
-            for chunk in stream:
-                content = chunk.data.choices[0].delta.content
-                if content:
-                    full_response += content
-                    output_tokens += 1
-                    response_placeholder.markdown(full_response + "▌")
-                if hasattr(chunk.data, "usage") and chunk.data.usage:
-                    input_tokens = chunk.data.usage.prompt_tokens
-                    
+            if prompt_tokens: result["input_tokens"] = prompt_tokens
         except Exception as e:
-            response_placeholder.error(f"API Error: {e}")
-            return ""
+            result["error"] = f"API Error: {e}"
+            return result
+        result["duration"] = time.time() - start_time
 
     # --- BRANCHE LOCALE ---
     else:
         prompt_str = " ".join([m["content"] for m in messages])
-        input_tokens = count_tokens_approx(prompt_str)
-        
-        try:
-            stream = llm_local.create_chat_completion(
-                messages=messages, stream=True, temperature=temperature, 
-                top_p=top_p, top_k=top_k, max_tokens=max_tokens
-            )
-            for chunk in stream:
-                if "content" in chunk["choices"][0]["delta"]:
-                    content = chunk["choices"][0]["delta"]["content"]
-                    full_response += content
-                    output_tokens += 1
-                    response_placeholder.markdown(full_response + "▌")
-        except ValueError as e:
-            # Fallback (Gemma/System role)
-            if "System role not supported" in str(e):
-                system_msg = next((m for m in messages if m['role'] == 'system'), None)
-                new_msgs = [m for m in messages if m['role'] != 'system']
-                if system_msg and new_msgs and new_msgs[0]['role'] == 'user':
-                    new_msgs[0]['content'] = f"CTX: {system_msg['content']}\n\nQ: {new_msgs[0]['content']}"
-                    try:
-                        stream = llm_local.create_chat_completion(
-                            messages=new_msgs, stream=True, temperature=temperature, 
-                            top_p=top_p, top_k=top_k, max_tokens=max_tokens
-                        )
-                        for chunk in stream:
-                            if "content" in chunk["choices"][0]["delta"]:
-                                full_response += chunk["choices"][0]["delta"]["content"]
-                                output_tokens += 1
-                                response_placeholder.markdown(full_response + "▌")
-                    except Exception: return ""
-            else: return ""
-        except Exception: return ""
-
-    # --- STOP & CALCULS GREEN IT ---
-    # --- STOP & CALCULS GREEN IT ---
-    duration = time.time() - start_time
-    speed = output_tokens / duration if duration > 0 else 0
-    
-    energy_kwh = 0.0
-    total_co2_g = 0.0
-    
-    # 1. CALCUL RÉEL (Celui du modèle utilisé)
-    if model_type == "api":
-        # Mistral (Cloud FR) - Méthode EcoLogits (Scope 2 + Scope 3 inclus dans les facteurs)
-        eco = model_conf.get("eco_ops", {"kwh_1k_in": 0.0002, "kwh_1k_out": 0.0004, "embodied_g_1k": 0.05})
-        e_in = (input_tokens / 1000) * eco["kwh_1k_in"]
-        e_out = (output_tokens / 1000) * eco["kwh_1k_out"]
-        energy_kwh = e_in + e_out
-        
-        scope2 = energy_kwh * 56.0 # France fixe (Datacenter)
-        scope3 = ((input_tokens + output_tokens) / 1000) * eco["embodied_g_1k"]
-        total_co2_g = scope2 + scope3
+        result["input_tokens"] = count_tokens_approx(prompt_str)
 
-    else:
-        # Local (CodeCarbon + Périphériques + Amortissement)
-        cpu_energy_kwh = 0.0
-        
-        # A. Mesure CPU (Active) via CodeCarbon
-        if cc_tracker:
+        # llama.cpp n'est pas thread-safe : une seule inférence à la fois sur le modèle chargé
+        t_queue = time.time()
+        with local_lock or LOCAL_LLM_LOCK:
+            result["queue_s"] = time.time() - t_queue
+            cc_tracker = start_energy_tracker() if track_energy else None
+            start_time = time.time()
             try:
-                cc_tracker.stop()
-                cpu_energy_kwh = cc_tracker.final_emissions_data.energy_consumed
-            except Exception: pass
-            
-        # B. Estimation Périphériques (Passive : Écran, SSD...)
-        # Formule : Puissance (kW) * Temps (h)
-        peripherals_energy_kwh = (LAPTOP_PERIPHERALS_WATT / 1000) * (duration / 3600)
-        
-        # Total Énergie (Scope 2 complet)
-        energy_kwh = cpu_energy_kwh + peripherals_energy_kwh
-        
-        # Calcul Carbone
-        scope2 = energy_kwh * carbon_intensity
-        
-        # C. Ajout Scope 3 (Amortissement Matériel)
-        scope3 = duration * LAPTOP_EMBODIED_G_PER_SEC
-        
-        total_co2_g = scope2 + scope3
+                sampling = {"temperature": temperature, "top_p": top_p, "top_k": top_k, "max_tokens": max_tokens}
+                if seed is not None: sampling["seed"] = seed
+                on_logprobs = None
+                if logprobs:
+                    # llama.cpp n'émet les log-probs en chat que si top_logprobs est fourni
+                    sampling["logprobs"] = True
+                    sampling["top_logprobs"] = 1
+                    result["logprobs"] = []
+                    on_logprobs = result["logprobs"].extend
+                _stream_local(llm_local, messages, on_delta, on_logprobs=on_logprobs, **sampling)
+            except Exception as e:
+                stop_energy_tracker(cc_tracker)
+                result["error"] = f"Erreur Llama-cpp : {e}"
+                return result
+            result["duration"] = time.time() - start_time
+            cpu_energy_kwh = stop_energy_tracker(cc_tracker)
+
+    result["text"] = "".join(parts)
+    result["energy_kwh"], result["co2_g"] = compute_footprint(
+        model_type, model_conf, result["input_tokens"], result["output_tokens"], result["duration"],
+        cpu_energy_kwh=cpu_energy_kwh if model_type == "local" else 0.0, carbon_intensity=carbon_intensity
+    )
+    return result
 
-    energy_wh = energy_kwh * 1000
+def render_run_metrics(result, model_type, carbon_intensity):
+    """Tableau récapitulatif (Ce Run vs estimation ChatGPT USA)."""
+    input_tokens, output_tokens = result["input_tokens"], result["output_tokens"]
+    duration = result["duration"]
+    speed = output_tokens / duration if duration > 0 else 0
+    energy_wh = result["energy_kwh"] * 1000
+    total_co2_g = result["co2_g"]
     
-    # 2. CALCUL COMPARATIF "ChatGPT" (Simulation USA)
+    # CALCUL COMPARATIF "ChatGPT" (Simulation USA)
     # Hypothèse : GPT-4o est un modèle "Large" (facteurs Mistral Large) hébergé aux USA.
     # Facteurs "Large" (MoE)
     gpt_factors = {"kwh_1k_in": 0.0003, "kwh_1k_out": 0.0006, "embodied_g_1k": 0.12}
@@ -236,9 +319,8 @@ def generate_stream(model_type, model_conf, llm_local, api_key, messages, temper
     gpt_co2_g = (gpt_energy_kwh * INTENSITY_USA) + \
                 (((input_tokens + output_tokens) / 1000) * gpt_factors["embodied_g_1k"])
 
-    response_placeholder.markdown(full_response)
-
     # --- AJOUT : MESURE MÉMOIRE RAM ---
+    import psutil
     process = psutil.Process(os.getpid())
     # On divise par 1024^3 pour avoir des Go
     ram_usage_gb = process.memory_info().rss / (1024 * 1024 * 1024)
@@ -246,32 +328,55 @@ def generate_stream(model_type, model_conf, llm_local, api_key, messages, temper
     # --- TABLEAU RÉCAPITULATIF (3 COLONNES) ---
     st.markdown("#### 📊 Métriques de la session")
     
+    # Réponse rejouée depuis le cache : aucune inférence, donc énergie nulle
+    if result.get("cache_hit"):
+        if result.get("cache_kind") == "semantic":
+            source = f"🧠 Cache sémantique (sim. {result['similarity']:.2f}, −{result.get('saved_s', 0.0):.2f}s)"
+        else:
+            source = f"♻️ Cache (−{result.get('saved_s', 0.0):.2f}s)"
+        speed_str = "—"
+    elif result.get("tier_label"):
+        source = f"🔀 Auto : niveau {result['tier_label']}"
+        speed_str = f"{speed:.1f}"
+    else:
+        source = "🧠 Inférence"
+        speed_str = f"{speed:.1f}"
+    
     metrics_data = {
         "Indicateur": [
-            "⏱️ Durée (s)", "⚡ Vitesse (tok/s)", "📥 Input (tok)", "📤 Output (tok)", 
+            "🗃️ Source", "⏱️ Durée (s)", "⚡ Vitesse (tok/s)", "📥 Input (tok)", "📤 Output (tok)", 
             "💾 RAM Actuelle (Go)", # <--- Label modifié
             "🔋 Énergie (Wh)", "🌍 Empreinte (mg CO₂e)" 
         ],
         "Ce Run": [
-            f"{duration:.2f}", f"{speed:.1f}", f"{input_tokens}", f"{output_tokens}",
+            source, f"{duration:.2f}", speed_str, f"{input_tokens}", f"{output_tokens}",
             f"{ram_usage_gb:.2f}",  # <--- Valeur modifiée (2 décimales)
             f"{energy_wh:.5f}", f"{total_co2_g * 1000:.2f}"
         ],
         "Si ChatGPT (USA) 🇺🇸": [
-            "~", "~", f"{input_tokens}", f"{output_tokens}",
+            "~", "~", "~", f"{input_tokens}", f"{output_tokens}",
             "N/A", # <--- PAS DE COMPARAISON PERTINENTE POUR LE CLOUD
             f"{gpt_energy_kwh * 1000:.5f}", f"{gpt_co2_g * 1000:.2f}"
         ]
     }
     
+    # Mode Auto : gain estimé par rapport à un appel direct au dernier niveau de la cascade
+    if result.get("tier_label") and not result.get("cache_hit"):
+        metrics_data["Indicateur"] += ["💡 Gain latence (s)", "💡 Gain énergie (Wh)"]
+        metrics_data["Ce Run"] += [f"{result['saved_s']:+.2f}", f"{result['saved_kwh'] * 1000:+.5f}"]
+        metrics_data["Si ChatGPT (USA) 🇺🇸"] += ["~", "~"]
+
     # Légendes contextuelles
     if model_type == "api":
         st.caption("ℹ️ *Ce Run (Mistral) : Datacenter France (56g).*")
+    elif model_type == "cascade":
+        st.caption(f"ℹ️ *Ce Run (Auto) : niveaux locaux au mix pays ({carbon_intensity:.0f}g), niveau API en France (56g).*")
     else:
         st.caption(f"ℹ️ *Ce Run (Local) : Mix Pays sélectionné ({carbon_intensity:.0f}g).*")
     
     st.caption("ℹ️ *Comparatif ChatGPT : Estimation 'Large Model' hébergé aux USA (367g).*")
 
+    import pandas as pd
     df_metrics = pd.DataFrame(metrics_data)
     
     # Affichage avec surbrillance
@@ -285,12 +390,144 @@ def generate_stream(model_type, model_conf, llm_local, api_key, messages, temper
             "Si ChatGPT (USA) 🇺🇸": st.column_config.TextColumn("Estimation ChatGPT", width="medium"),
         }
     )
-    
-    return full_response
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    """Cache de réponses partagé entre les sessions (SQLite)."""
+    return ResponseCache(RESPONSE_CACHE_SETTINGS["db_path"], max_mb=RESPONSE_CACHE_SETTINGS["max_mb"])
+
+def _lookup_cached_response(model_conf, messages, sampling):
+    """Retourne (clé, résultat rejoué) ; clé None si la requête n'est pas cachable."""
+    if not RESPONSE_CACHE_SETTINGS["enabled"] or not st.session_state.get("use_response_cache", True):
+        return None, None
+    if not is_deterministic(sampling["temperature"], sampling["seed"]):
+        return None, None
+
+    t0 = time.time()
+    key = make_cache_key(model_conf, messages, **sampling)
+    entry = get_response_cache().get(key)
+    if not entry: return key, None
+    return key, {
+        "text": entry["text"], "input_tokens": entry["input_tokens"], "output_tokens": entry["output_tokens"],
+        "duration": time.time() - t0, "ttft": 0.0, "queue_s": 0.0, "energy_kwh": 0.0, "co2_g": 0.0,
+        "cache_hit": True, "cache_kind": "exact", "saved_s": entry["duration"], "error": None
+    }
+
+# Raison de la désactivation du cache sémantique (affichée dans l'onglet Config)
+SEMANTIC_CACHE_STATUS = {"error": None}
+
+@st.cache_resource(show_spinner="Chargement du modèle d'embedding...")
+def get_semantic_cache():
+    """Cache sémantique partagé ; None si llama-cpp ou le modèle d'embedding est absent."""
+    conf = SEMANTIC_CACHE_SETTINGS["embedding"]
+    if not HAS_LOCAL_LIB or not os.path.exists(conf["file"]):
+        return None
+    try:
+        from llama_cpp import Llama
+        embedder = Llama(model_path=os.path.abspath(conf["file"]), embedding=True, n_ctx=conf["ctx"], verbose=False)
+    except Exception as e:
+        SEMANTIC_CACHE_STATUS["error"] = str(e)
+        return None
+    prefix = conf.get("prefix", "")
+    from modules.semantic_cache import SemanticCache
+    return SemanticCache(
+        lambda text: embedder.embed(prefix + text),
+        threshold=SEMANTIC_CACHE_SETTINGS["threshold"],
+        max_entries=SEMANTIC_CACHE_SETTINGS["max_entries"],
+        max_namespaces=SEMANTIC_CACHE_SETTINGS["max_namespaces"]
+    )
+
+def _lookup_semantic_response(model_conf, messages, task):
+    """
+    Retourne (emplacement, résultat rejoué) ; emplacement = (espace, vecteur requête, étiquette),
+    None si le cache ne s'applique pas. L'étiquette (nombres de la requête) empêche de rejouer
+    une commande qui ne diffère que par une valeur.
+    """
+    if not SEMANTIC_CACHE_SETTINGS["enabled"] or task not in SEMANTIC_CACHE_SETTINGS["tasks"]:
+        return None, None
+    if not st.session_state.get("use_response_cache", True):
+        return None, None
+    cache = get_semantic_cache()
+    if cache is None:
+        return None, None
+    from modules.semantic_cache import namespace_key  # NumPy chargé seulement si le cache existe
+
+    query = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    sys_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+    ns = namespace_key(model_identity(model_conf), task, sys_prompt)
+    tag = tuple(extract_numbers(query))
+    t0 = time.time()
+    entry, similarity, vec = cache.lookup(ns, query, tag=tag)
+    if not entry: return (ns, vec, tag), None
+    return (ns, vec, tag), {
+        "text": entry["text"], "input_tokens": entry["input_tokens"], "output_tokens": entry["output_tokens"],
+        "duration": time.time() - t0, "ttft": 0.0, "queue_s": 0.0, "energy_kwh": 0.0, "co2_g": 0.0,
+        "cache_hit": True, "cache_kind": "semantic", "similarity": similarity,
+        "saved_s": entry["duration"], "error": None
+    }
+
+def log_run(result, model_type, model_conf, carbon_intensity, task=None):
+    """
+    Journal des inférences de la session (analyse « et ailleurs ? » du panneau Green IT).
+    `ref_intensity` : intensité utilisée pour le Scope 2 du calcul d'origine.
+    """
+    run_log = st.session_state.setdefault("run_log", [])
+    run_log.append({
+        "time": time.strftime("%H:%M:%S"), "task": task or "", "model": model_identity(model_conf),
+        "energy_kwh": result["energy_kwh"], "co2_g": result["co2_g"], "output_tokens": result["output_tokens"],
+        "ref_intensity": API_DATACENTER_INTENSITY if model_type == "api" else carbon_intensity
+    })
+    del run_log[:-CARBON_SETTINGS["run_log_max"]]
+
+def generate_stream(model_type, model_conf, llm_local, api_key, messages, temperature=0.7, max_tokens=1024, top_p=0.9, top_k=40, carbon_intensity=475.0, seed=None, task=None):
+    """
+    Gère l'inférence streamée + Calcul Green IT (Fallback Manuel pour API).
+    Les requêtes déterministes identiques sont rejouées depuis le cache de réponses ;
+    pour les onglets `task` éligibles, les paraphrases sont servies par le cache sémantique.
+    """
+    response_placeholder = st.empty()
+
+    sampling = {"temperature": temperature, "max_tokens": max_tokens, "top_p": top_p, "top_k": top_k, "seed": seed}
+    cache_key, cached = _lookup_cached_response(model_conf, messages, sampling)
+    sem_slot = None
+    if not cached:
+        sem_slot, cached = _lookup_semantic_response(model_conf, messages, task)
+    if cached:
+        response_placeholder.markdown(cached["text"])
+        render_run_metrics(cached, model_type, carbon_intensity)
+        return cached["text"]
+
+    response_placeholder.markdown("⏳ _Réflexion..._")
+
+    result = run_completion(
+        model_type, model_conf, llm_local, api_key, messages,
+        temperature=temperature, max_tokens=max_tokens, top_p=top_p, top_k=top_k,
+        carbon_intensity=carbon_intensity, seed=seed,
+        on_update=lambda txt: response_placeholder.markdown(txt + "▌")
+    )
+    if result["error"]:
+        response_placeholder.error(result["error"])
+        return ""
+
+    if cache_key and result["text"]:
+        get_response_cache().put(cache_key, model_identity(model_conf), result)
+    if sem_slot and result["text"]:
+        sem_ns, sem_vec, sem_tag = sem_slot
+        get_semantic_cache().add(sem_ns, sem_vec, {
+            "text": result["text"], "input_tokens": result["input_tokens"],
+            "output_tokens": result["output_tokens"], "duration": result["duration"]
+        }, tag=sem_tag)
+
+    response_placeholder.markdown(result["text"])
+    log_run(result, model_type, model_conf, carbon_intensity, task)
+    render_run_metrics(result, model_type, carbon_intensity)
+    if result.get("attempts"): st.caption(f"🔀 {describe_attempts(result['attempts'])}")
+    return result["text"]
 
 # --- CONFIGURATION & HARDWARE ---
 def get_hardware_specs():
     """Récupère les spécifications du PC avec explications pédagogiques."""
+    import psutil
     try:
         # RAM
         mem = psutil.virtual_memory()
@@ -1,7 +1,20 @@
+import os
+import json
+import time
 import streamlit as st
-import pandas as pd
-import psutil
-from modules.utils import generate_stream, extract_text_from_file, count_tokens_approx, get_hardware_specs, estimate_model_performance
+from config.models_config import CATALOG, RAG_SETTINGS, TRANSLATION_SETTINGS, IOT_SETTINGS, COMPARISON_SETTINGS
+from modules.batch_translation import batch_translate
+from modules.carbon import what_if_matrix
+from modules.catalog_index import CatalogIndex
+from modules.comparison import compare_models, model_choices
+from modules.corpus_index import CorpusIndex, index_path_for
+from modules.iot_router import IotRouter
+from modules.extraction import is_cached, iter_pages_cached, pdf_page_count
+from modules.gguf_reader import get_gguf_metadata, deferred_writes
+from modules.model_integrity import HashManifest, status_of
+from modules.summarizer import map_reduce_summarize
+from modules.translation import TranslationMemory, translate_with_memory
+from modules.utils import generate_stream, render_run_metrics, get_response_cache, get_semantic_cache, SEMANTIC_CACHE_STATUS, extract_text_from_file, count_tokens_approx, get_hardware_specs, estimate_model_performance, model_memory, effective_ctx
 
 # --- WIDGETS UI COMMUNS ---
 
@@ -15,12 +28,12 @@ def token_guardrail(user_text, sys_text, gen_kwargs, display=True):
     Barre de progression basée sur une estimation heuristique (/2.7 chars).
     Mentionne clairement que c'est une approximation.
     """
-    # Récupération sécurisée de la config
+    # Récupération sécurisée de la config ; en local, n_ctx est plafonné au chargement
     model_conf = gen_kwargs.get("model_conf")
     if not model_conf:
         ctx_limit = 32768
     else:
-        ctx_limit = model_conf.get("ctx", 32768)
+        ctx_limit = effective_ctx(model_conf)
     
     # Comptage purement mathématique (ultra rapide)
     n_user = count_tokens_approx(user_text)
@@ -43,6 +56,63 @@ def token_guardrail(user_text, sys_text, gen_kwargs, display=True):
     
     return is_valid
 
+def comparison_picker(key_id):
+    """Sélection optionnelle de modèles à comparer. Retourne [(libellé, conf)] ; liste vide = mode normal."""
+    with st.expander("⚖️ Comparer plusieurs modèles", expanded=False):
+        choices = model_choices()
+        picked = st.multiselect(
+            "Modèles (GGUF téléchargés ou API)", list(choices), key=f"cmp_{key_id}",
+            max_selections=COMPARISON_SETTINGS["max_models"],
+            help="Le même prompt est envoyé à tous les modèles : API en parallèle, locaux par vagues selon la RAM et les cœurs."
+        )
+    return [(label, choices[label]) for label in picked]
+
+def render_comparison(messages, gen_kwargs, entries):
+    """Exécute la comparaison et affiche une colonne par modèle + un tableau de métriques commun."""
+    import pandas as pd
+    api_key = gen_kwargs.get("api_key") or os.getenv("MISTRAL_API_KEY", "")
+    cols = st.columns(len(entries))
+    placeholders = []
+    for col, (label, _) in zip(cols, entries):
+        col.markdown(f"**{label.split(' / ')[-1]}**")
+        placeholders.append(col.empty())
+
+    def _on_event(kind, idx, payload):
+        if kind == "status": placeholders[idx].caption(payload)
+        elif kind == "delta": placeholders[idx].markdown(payload + "▌")
+        elif payload.get("error"): placeholders[idx].error(payload["error"])
+        else: placeholders[idx].markdown(payload["text"])
+
+    sampling = {k: gen_kwargs[k] for k in ("temperature", "max_tokens", "top_p", "top_k", "seed", "carbon_intensity")}
+    results = compare_models(entries, messages, sampling, api_key=api_key, on_event=_on_event)
+
+    rows = []
+    for res in results:
+        if res.get("error"):
+            rows.append({"Modèle": res["label"], "Statut": "❌"})
+            continue
+        speed = res["output_tokens"] / res["duration"] if res["duration"] > 0 else 0
+        rows.append({
+            "Modèle": res["label"], "Statut": "✅",
+            "Chargement (s)": round(res["load_s"], 1),
+            "TTFT (s)": round(res["ttft"], 2) if res["ttft"] is not None else None,
+            "Vitesse (tok/s)": round(speed, 1),
+            "Durée (s)": round(res["duration"], 2),
+            "Output (tok)": res["output_tokens"],
+            "Énergie (Wh)": round(res["energy_kwh"] * 1000, 5),
+            "CO₂ (mg)": round(res["co2_g"] * 1000, 2),
+        })
+    st.markdown("#### 📊 Comparatif")
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption("ℹ️ *Énergie CPU locale mesurée globalement puis répartie au prorata du temps de génération ; API : facteurs EcoLogits.*")
+
+def generate_or_compare(messages, gen_kwargs, compare, task=None):
+    """Génération avec le modèle courant, ou comparaison si des modèles ont été sélectionnés."""
+    if compare:
+        render_comparison(messages, gen_kwargs, compare)
+        return None
+    return generate_stream(messages=messages, task=task, **gen_kwargs)
+
 # ==========================================
 # ONGLETS MÉTIERS (Refactorés pour Layout Haut)
 # ==========================================
@@ -61,6 +131,7 @@ def render_ops_tab(gen_kwargs):
         if "Triage" in task:
             content = st.text_area("Email", "Objet: Urgent #45221\nServeur prod down...", height=150)
             sys_prompt = edit_system_prompt('Output JSON: {"category": "...", "priority": "..."}', "ops_triage")
+            compare = comparison_picker("ops_triage")
             can_run = token_guardrail(content, sys_prompt, gen_kwargs)
             
             # Bouton dans col1
@@ -70,10 +141,11 @@ def render_ops_tab(gen_kwargs):
             if launch:
                 with col2: 
                     st.markdown("##### Résultat JSON") # Titre explicite
-                    generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": content}], **gen_kwargs)
+                    generate_or_compare([{"role":"system", "content": sys_prompt}, {"role":"user", "content": content}], gen_kwargs, compare, task="ops_triage")
         else:
             content = st.text_area("Texte PII", "M. Dupont habite au 12 rue de la Paix...", height=150)
             sys_prompt = edit_system_prompt('Replace names/locations with [ANON].', "ops_pii")
+            compare = comparison_picker("ops_pii")
             can_run = token_guardrail(content, sys_prompt, gen_kwargs)
             
             launch = st.button("Anonymiser", disabled=not can_run)
@@ -81,7 +153,41 @@ def render_ops_tab(gen_kwargs):
             if launch:
                 with col2: 
                     st.markdown("##### Texte Anonymisé")
-                    generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": content}], **gen_kwargs)
+                    generate_or_compare([{"role":"system", "content": sys_prompt}, {"role":"user", "content": content}], gen_kwargs, compare)
+
+@st.fragment
+def render_carbon_whatif(carbon_db):
+    """Panneau Green IT : empreinte des inférences de la session recalculée pour chaque pays, sans relancer."""
+    run_log = st.session_state.get("run_log", [])
+    current_country = st.session_state.get("carbon_country")
+    with st.expander(f"🌍 Et ailleurs ? ({len(run_log)} inférence(s))"):
+        # Fragment : une inférence lancée depuis l'onglet (autre fragment) apparaît à la prochaine interaction ici
+        st.button("🔄 Actualiser", key="whatif_refresh")
+        if not run_log:
+            st.caption("Aucune inférence mesurée dans cette session.")
+            return
+        import pandas as pd
+        scope = st.radio("Périmètre", ["Dernière", "Session"], horizontal=True, key="whatif_scope", label_visibility="collapsed")
+        only_countries = st.toggle("Pays uniquement", value=True, key="whatif_countries", help="Masque les agrégats régionaux (Monde, UE, Ember...).")
+        runs = run_log[-1:] if scope == "Dernière" else run_log
+        countries, intensity, matrix = what_if_matrix(runs, carbon_db)
+        totals = matrix.sum(axis=0)
+        df = pd.DataFrame({"Pays": countries, "gCO₂e/kWh": intensity.round(0), "mg CO₂e": (totals * 1000).round(3)})
+        if current_country in carbon_db:
+            ref = totals[countries.index(current_country)]
+            if ref > 0: df["× sélection"] = (totals / ref).round(2)
+        if only_countries:
+            codes = [carbon_db[c]["code"] for c in countries]
+            df = df[[bool(code) and not code.startswith("OWID_") for code in codes]]
+        st.dataframe(df.sort_values("mg CO₂e"), hide_index=True, height=260, use_container_width=True)
+        st.caption("ℹ️ *Seul le Scope 2 (énergie × mix) varie ; Scope 3 (matériel) inchangé. Mode Auto : tous les niveaux rapportés au mix sélectionné.*")
+
+IOT_TIER_LABELS = {"grammar": "⚡ Grammaire", "cache": "🗃️ Cache de commandes"}
+
+@st.cache_resource(show_spinner=False)
+def _get_iot_router():
+    """Routeur IoT partagé entre les sessions (grammaire + commandes apprises)."""
+    return IotRouter(IOT_SETTINGS["commands_db"], max_entries=IOT_SETTINGS["max_entries"])
 
 def render_iot_tab(gen_kwargs):
     """Onglet 2 : IoT"""
@@ -90,15 +196,140 @@ def render_iot_tab(gen_kwargs):
     
     with col1:
         cmd = st.text_input("Commande", "Allume la clim salon 22°C.")
-        sys_prompt = edit_system_prompt("Convert to JSON command...", "iot")
+        sys_prompt = edit_system_prompt(
+            "Convert the home-automation command to JSON with keys device, action (on/off/set), room, params. "
+            "Output ONLY the JSON.", "iot"
+        )
+        use_fast_path = st.toggle("⚡ Voie rapide (grammaire + commandes apprises)", value=True, key="iot_fast",
+                                  help="Les commandes reconnues sont traduites sans LLM ; le LLM n'intervient qu'en cas d'échec et ses réponses JSON sont mémorisées.")
+        compare = comparison_picker("iot")
         can_run = token_guardrail(cmd, sys_prompt, gen_kwargs)
         
         if st.button("Interpréter", disabled=not can_run):
+            router = _get_iot_router()
+            namespace = IotRouter.namespace(sys_prompt)
             with col2: 
                 st.markdown("##### Commande JSON")
+                if compare:  # Comparaison : tous les modèles répondent, sans voie rapide
+                    render_comparison([{"role":"system", "content": sys_prompt}, {"role":"user", "content": cmd}], gen_kwargs, compare)
+                    return
+                if use_fast_path:
+                    tier, payload, elapsed_ms = router.resolve(cmd, namespace)
+                    if payload is not None:
+                        st.code(json.dumps(payload, indent=2, ensure_ascii=False), language="json")
+                        st.caption(f"{IOT_TIER_LABELS[tier]} · {elapsed_ms:.2f} ms · aucune inférence (0 Wh)")
+                        return
                 st.markdown("```json") # Ouverture bloc code
-                generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": cmd}], **gen_kwargs)
+                text = generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": cmd}], task="iot", **gen_kwargs)
                 st.markdown("```")
+                if use_fast_path and text:
+                    learned = router.learn(cmd, namespace, text)
+                    st.caption("🧠 LLM · correspondance mémorisée pour les prochaines commandes" if learned
+                               else "🧠 LLM · réponse non JSON, non mémorisée")
+
+@st.cache_resource(show_spinner=False)
+def _get_corpus_index(folder):
+    """Index BM25 partagé entre les sessions (un par dossier)."""
+    index_file = index_path_for(folder, RAG_SETTINGS["index_dir"])
+    return CorpusIndex(index_file, chunk_tokens=RAG_SETTINGS["chunk_tokens"])
+
+def _render_corpus_source(instr):
+    """Sélection / indexation du dossier corpus puis recherche BM25. Retourne le contexte construit."""
+    folder = st.text_input("Dossier du corpus", RAG_SETTINGS["corpus_dir"], key="rag_corpus_dir")
+    if not os.path.isdir(folder):
+        st.warning("📂 Dossier introuvable.")
+        return "", []
+
+    index = _get_corpus_index(folder)
+    c_idx1, c_idx2 = st.columns([1, 1])
+    if c_idx1.button("🔄 Indexer / Mettre à jour"):
+        bar = st.progress(0.0)
+        t0 = time.time()
+        res = index.sync_directory(folder, progress_cb=lambda i, n, p: bar.progress(i / n, text=os.path.basename(p)))
+        bar.empty()
+        st.success(
+            f"Index à jour en {time.time() - t0:.1f}s : +{res['added']} ajoutés, "
+            f"{res['updated']} modifiés, {res['removed']} supprimés, {res['unchanged']} inchangés."
+        )
+        for err in res["errors"]: st.caption(f"⚠️ {err}")
+
+    stats = index.stats()
+    c_idx2.caption(f"🗂️ {stats['docs']} docs · {stats['chunks']} passages · {stats['terms']} termes")
+
+    top_k = st.slider("Passages retenus (top-k)", 1, 20, RAG_SETTINGS["top_k"], key="rag_top_k")
+    t0 = time.perf_counter()
+    hits = index.search(instr, k=top_k) if instr else []
+    search_ms = (time.perf_counter() - t0) * 1000
+
+    if hits:
+        with st.expander(f"🔎 {len(hits)} passages trouvés ({search_ms:.1f} ms)", expanded=False):
+            for h in hits:
+                page = f" p.{h['page']}" if h["page"] else ""
+                st.markdown(f"**{os.path.basename(h['path'])}{page}** — score {h['score']:.2f}")
+                st.caption(h["text"][:400] + ("…" if len(h["text"]) > 400 else ""))
+    elif stats["chunks"]:
+        st.caption("Aucun passage pertinent pour cette requête.")
+
+    ctx = "\n\n".join(
+        f"[{os.path.basename(h['path'])}{' p.' + str(h['page']) if h['page'] else ''}]\n{h['text']}" for h in hits
+    )
+    return ctx, hits
+
+def _load_uploaded_document(up):
+    """Texte du document chargé. PDF : sélection de pages + lecture progressive si non caché."""
+    if up.type != "application/pdf":
+        return extract_text_from_file(up)
+
+    data = up.getvalue()
+    try:
+        n_pages = pdf_page_count(data)
+    except Exception as e:
+        st.error(f"[Erreur lecture PDF: {str(e)}]")
+        return ""
+
+    # Clés dépendantes du fichier : les bornes se réinitialisent à chaque nouveau document
+    c_p1, c_p2 = st.columns(2)
+    first = c_p1.number_input("Page début", 1, n_pages, 1, key=f"rag_p1_{up.name}_{up.size}")
+    last = c_p2.number_input("Page fin", 1, n_pages, n_pages, key=f"rag_p2_{up.name}_{up.size}")
+    if last < first:
+        st.warning("La page de fin précède la page de début.")
+        return ""
+
+    pages = []
+    try:
+        if is_cached(data, first, last):
+            pages = [text for _, text in iter_pages_cached(data, first, last)]
+        else:
+            # Lecture en streaming : progression et aperçu pendant l'extraction
+            bar = st.progress(0.0, text="Lecture du PDF...")
+            preview = st.empty()
+            for page_no, text in iter_pages_cached(data, first, last):
+                pages.append(text)
+                bar.progress(len(pages) / (last - first + 1), text=f"Lecture page {page_no}/{last}")
+                if text: preview.caption(f"📄 p.{page_no} : {text[:160]}…")
+            bar.empty()
+            preview.empty()
+    except Exception as e:
+        st.error(f"[Erreur lecture PDF: {str(e)}]")
+        return ""
+    return "".join(text + "\n" for text in pages if text)
+
+def _render_map_reduce(txt, instr, sys_prompt, gen_kwargs, workers):
+    """Synthèse Map-Reduce avec progression et streaming de la fusion finale."""
+    bar = st.progress(0.0, text="Découpage du document...")
+    placeholder = st.empty()
+    res = map_reduce_summarize(
+        txt, instr, sys_prompt, gen_kwargs, max_workers=workers,
+        on_progress=lambda done, total, label: bar.progress(done / total, text=f"{label} ({done}/{total})"),
+        on_update=lambda partial: placeholder.markdown(partial + "▌")
+    )
+    bar.empty()
+    if res["error"]:
+        placeholder.error(f"Map-Reduce interrompu : {res['error']}")
+        return
+    placeholder.markdown(res["text"])
+    st.caption(f"🧩 {res['n_chunks']} extraits · {res['n_calls']} appels · {res['levels']} niveau(x) de réduction")
+    render_run_metrics(res, gen_kwargs["model_type"], gen_kwargs["carbon_intensity"])
 
 def render_rag_tab(gen_kwargs):
     """Onglet 3 : Synthèse & RAG"""
@@ -106,37 +337,172 @@ def render_rag_tab(gen_kwargs):
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        up = st.file_uploader("Doc", type=["txt", "pdf"], key="rag")
-        txt = extract_text_from_file(up) if up else ""
-        if txt: st.success(f"Document chargé ({len(txt)} cars)")
+        source = st.radio("Source :", ["📄 Document", "🗂️ Corpus (dossier)"], horizontal=True, key="rag_source")
+        
+        if source == "📄 Document":
+            up = st.file_uploader("Doc", type=["txt", "pdf"], key="rag")
+            txt = _load_uploaded_document(up) if up else ""
+            if txt: st.success(f"Document chargé ({len(txt)} cars)")
+            instr = st.text_area("Instruction", "Résumé structuré points clés.")
+        else:
+            # En mode corpus, l'instruction sert aussi de requête de recherche BM25
+            instr = st.text_area("Question", "Quelles sont les obligations RGPD pour les sous-traitants ?")
+            txt, _ = _render_corpus_source(instr)
         
-        instr = st.text_area("Instruction", "Résumé structuré points clés.")
         sys_prompt = edit_system_prompt("You are a helpful assistant...", "rag")
         full_user_prompt = f"CTX:\n{txt}\nREQ: {instr}"
         
         can_run = token_guardrail(full_user_prompt, sys_prompt, gen_kwargs)
         
-        if st.button("Générer", disabled=not can_run) and (txt or instr):
+        # Document plus long que le contexte : découpage Map-Reduce proposé par défaut
+        use_map_reduce, workers = False, 1
+        if source == "📄 Document" and txt:
+            use_map_reduce = st.toggle("🧩 Mode Map-Reduce (documents longs)", value=not can_run, key="rag_map_reduce")
+            if use_map_reduce and gen_kwargs["model_type"] == "api":
+                workers = st.slider("Appels API simultanés", 1, 8, 4, key="rag_mr_workers")
+        
+        if st.button("Générer", disabled=not (can_run or use_map_reduce)) and (txt or instr):
             with col2: 
                 st.markdown("##### Synthèse")
-                generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": full_user_prompt}], **gen_kwargs)
+                if use_map_reduce:
+                    _render_map_reduce(txt, instr, sys_prompt, gen_kwargs, workers)
+                else:
+                    generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": full_user_prompt}], **gen_kwargs)
+
+@st.cache_resource(show_spinner=False)
+def _get_translation_memory():
+    """Mémoire de traduction partagée entre les sessions."""
+    return TranslationMemory(TRANSLATION_SETTINGS["tm_path"])
+
+def _render_tm_translation(src, lang, sys_prompt, gen_kwargs):
+    """Traduction segmentée avec mémoire de traduction (seuls les segments inconnus vont au modèle)."""
+    placeholder = st.empty()
+    placeholder.markdown("⏳ _Recherche en mémoire de traduction..._")
+    res = translate_with_memory(
+        src, lang, sys_prompt, gen_kwargs, _get_translation_memory(),
+        on_update=lambda partial: placeholder.markdown(partial + "▌")
+    )
+    if res["error"]:
+        placeholder.error(res["error"])
+        return
+    placeholder.markdown(res["text"])
+    st.caption(
+        f"🧠 {res['segments']} segments · {res['unique']} uniques · "
+        f"{res['tm_hits']} trouvés en mémoire · {res['translated']} envoyés au modèle ({res['n_calls']} appel(s))"
+    )
+    render_run_metrics(res, gen_kwargs["model_type"], gen_kwargs["carbon_intensity"])
+
+TRANSLATION_LANGS = ["Anglais", "Espagnol", "Allemand", "Chinois", "Italien"]
+
+def _api_models():
+    """Modèles API du catalogue : libellé → conf."""
+    return {entry.name: entry.conf for entry in CATALOG.query(type="api")}
+
+def _batch_workers(gen_kwargs, api_label, api_key):
+    """Workers du lot : le modèle sélectionné (local ou cascade sérialisés, API) + renfort API optionnel."""
+    concurrency = TRANSLATION_SETTINGS["api_concurrency"]
+    # La cascade commence toujours par le modèle local : même sérialisation que le local seul
+    workers = [{
+        "label": {"local": "💻 Local", "cascade": "🔀 Auto"}.get(gen_kwargs["model_type"], "☁️ API"),
+        "gen_kwargs": gen_kwargs,
+        "concurrency": 1 if gen_kwargs["model_type"] in ("local", "cascade") else concurrency
+    }]
+    if api_label and api_key:
+        api_conf = _api_models()[api_label]
+        workers.append({
+            "label": f"☁️ {api_label}",
+            "gen_kwargs": {**gen_kwargs, "model_type": "api", "model_conf": api_conf, "llm_local": None, "api_key": api_key},
+            "concurrency": concurrency
+        })
+    return workers
+
+def _render_batch_translation(gen_kwargs):
+    """Mode lot : un fichier traduit simultanément dans plusieurs langues, un fichier produit par langue."""
+    import pandas as pd
+    up = st.file_uploader("Fichier source", type=["txt", "pdf"], key="trans_batch_file")
+    langs = st.multiselect("Langues cibles", TRANSLATION_LANGS, default=TRANSLATION_LANGS, key="trans_batch_langs")
+    sys_tpl = edit_system_prompt("Translate to {lang}. Output ONLY the translation.", "trans_batch")
+
+    api_label, api_key = None, None
+    api_models = list(_api_models())
+    if gen_kwargs["model_type"] == "local" and api_models:
+        if st.toggle("☁️ Renfort API Mistral en parallèle", key="trans_batch_api",
+                     help="Les lots de phrases sont répartis entre le modèle local et l'API : le premier libre prend le suivant."):
+            api_label = st.selectbox("Modèle API", api_models, key="trans_batch_api_model")
+            api_key = st.text_input("Clé API Mistral", value=os.getenv("MISTRAL_API_KEY", ""), type="password", key="trans_batch_api_key")
+            if not api_key: st.warning("Clé API requise pour le renfort.")
+
+    if not st.button("Traduire le lot", disabled=not (up and langs)): return
+    text = extract_text_from_file(up)
+    if not text.strip() or text.startswith("[Erreur"):
+        st.error(text or "Document vide.")
+        return
+
+    st.markdown("##### Progression par langue")
+    rows = {lang: st.empty() for lang in langs}
+    for lang in langs: rows[lang].markdown(f"⏳ **{lang}** : _en attente..._")
+    stem = os.path.splitext(os.path.basename(up.name))[0]
+
+    def _on_event(kind, lang, stats):
+        if kind == "progress":
+            total = max(stats["to_translate"], 1)
+            rows[lang].progress(min(stats["done_segments"] / total, 1.0),
+                                text=f"{lang} : {stats['done_segments']}/{stats['to_translate']} segments à traduire")
+        elif kind == "done":
+            rows[lang].markdown(f"✅ **{lang}** terminé en {stats['duration']:.1f}s → `{stats['path']}`")
+        else:
+            rows[lang].error(f"{lang} : {stats['error']}")
+
+    results = batch_translate(
+        text, langs, sys_tpl, _batch_workers(gen_kwargs, api_label, api_key), _get_translation_memory(),
+        output_path_tpl=os.path.join(TRANSLATION_SETTINGS["output_dir"], f"{stem}.{{code}}.txt"),
+        on_event=_on_event
+    )
+
+    # Bilan par langue : débit et empreinte
+    st.markdown("##### 🌿 Bilan par langue")
+    st.dataframe(pd.DataFrame([{
+        "Langue": lang,
+        "En mémoire": s["tm_hits"],
+        "Traduits": s["to_translate"],
+        "Appels": s["calls"],
+        "Durée (s)": round(s["duration"], 1),
+        "Segments/s": round(s["segments_per_s"], 2),
+        "Tokens/s": round(s["tokens_per_s"], 1),
+        "Énergie (Wh)": round(s["energy_kwh"] * 1000, 3),
+        "CO₂ (g)": round(s["co2_g"], 3),
+    } for lang, s in results.items()]), hide_index=True, use_container_width=True)
+    for lang, s in results.items():
+        if s["error"]: continue
+        st.download_button(f"⬇️ {lang}", s["text"].encode("utf-8"), file_name=os.path.basename(s["path"]),
+                           mime="text/plain", key=f"trans_batch_dl_{lang}")
 
 def render_translation_tab(gen_kwargs):
     """Onglet 4 : Traduction"""
     st.markdown("### Traduction")
+    mode = st.radio("Mode", ["✍️ Texte", "📁 Lot (fichier → plusieurs langues)"], horizontal=True, key="trans_mode")
+    if mode != "✍️ Texte":
+        _render_batch_translation(gen_kwargs)
+        return
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        lang = st.selectbox("Langue Cible", ["Anglais", "Espagnol", "Allemand", "Chinois", "Italien"])
+        lang = st.selectbox("Langue Cible", TRANSLATION_LANGS)
         src = st.text_area("Texte Source", "L'IA générative transforme les métiers du conseil.", height=150)
+        use_tm = st.toggle("🧠 Mémoire de traduction (par phrase)", value=True, key="trans_tm",
+                           help="Les phrases déjà traduites (même modèle, même langue) ne sont pas renvoyées au modèle.")
         
         sys_prompt = edit_system_prompt(f"Translate to {lang}. Output ONLY the translation.", "trans")
+        compare = comparison_picker("trans")
         can_run = token_guardrail(src, sys_prompt, gen_kwargs)
         
         if st.button("Traduire", disabled=not can_run): 
             with col2:
                 st.markdown(f"##### Traduction ({lang})")
-                generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": src}], **gen_kwargs)
+                if use_tm and not compare:
+                    _render_tm_translation(src, lang, sys_prompt, gen_kwargs)
+                else:
+                    generate_or_compare([{"role":"system", "content": sys_prompt}, {"role":"user", "content": src}], gen_kwargs, compare)
 
 def render_code_tab(gen_kwargs):
     """Onglet 5 : Code"""
@@ -148,12 +514,13 @@ def render_code_tab(gen_kwargs):
         req = st.text_area("Besoin", "Une fonction récursive pour calculer Fibonacci.", height=150)
         
         sys_prompt = edit_system_prompt(f"You are an expert {lang} coder...", "code")
+        compare = comparison_picker("code")
         can_run = token_guardrail(req, sys_prompt, gen_kwargs)
         
         if st.button("Générer Code", disabled=not can_run): 
             with col2:
                 st.markdown(f"##### Snippet {lang}")
-                generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": req}], **gen_kwargs)
+                generate_or_compare([{"role":"system", "content": sys_prompt}, {"role":"user", "content": req}], gen_kwargs, compare)
 
 def render_logic_tab(gen_kwargs):
     """Onglet 6 : Logique"""
@@ -163,12 +530,13 @@ def render_logic_tab(gen_kwargs):
     with col1:
         q = st.text_area("Énigme / Problème", "Un fermier a 17 moutons...", height=150)
         sys_prompt = edit_system_prompt("You are a logic expert. Think step-by-step...", "logic")
+        compare = comparison_picker("logic")
         can_run = token_guardrail(q, sys_prompt, gen_kwargs)
         
         if st.button("Raisonner", disabled=not can_run): 
             with col2:
                 st.markdown("##### Chain of Thought")
-                generate_stream(messages=[{"role":"system", "content": sys_prompt}, {"role":"user", "content": q}], **gen_kwargs)
+                generate_or_compare([{"role":"system", "content": sys_prompt}, {"role":"user", "content": q}], gen_kwargs, compare)
 
 def render_chat_tab(gen_kwargs):
     """Onglet 7 : Chat (Avec gestion d'historique)"""
@@ -194,110 +562,36 @@ def render_chat_tab(gen_kwargs):
                 st.error("⚠️ Limite contexte.")
                 st.session_state.history.pop() # On annule le message utilisateur
 
-def render_doc_tab(models_db):
+@st.cache_resource(show_spinner=False)
+def _get_catalog_index(_catalog):
+    """Tableaux du catalogue compilés une fois par processus (le filtrage passe par `Catalog.query`)."""
+    return CatalogIndex(_catalog)
+
+def render_doc_tab(catalog):
     """Onglet 8 : Documentation Interactive (Améliorée avec Emojis & Libellés)"""
     st.markdown("### 📚 Documentation Interactive")
-    
-    # --- 1. DICTIONNAIRES DE MAPPING (CONFIG UX) ---
-    # Pour afficher des jolis noms au lieu des codes techniques
-    
-    LANG_MAP = {
-        "en": "🇬🇧 Anglais", "fr": "🇫🇷 Français", "de": "🇩🇪 Allemand",
-        "es": "🇪🇸 Espagnol", "it": "🇮🇹 Italien", "pt": "🇵🇹 Portugais",
-        "zh": "🇨🇳 Chinois", "ja": "🇯🇵 Japonais", "ko": "🇰🇷 Coréen",
-        "ru": "🇷🇺 Russe", "ar": "🇸🇦 Arabe", "hi": "🇮🇳 Hindi", "th": "🇹🇭 Thaï"
-    }
-
-    ROLE_MAP = {
-        "assistant_generalist":   "🧠 Assistant Polyvalent",
-        "assistant_light":        "⚡ Assistant Léger / Rapide",
-        "rag":                    "📝 Synthèse & RAG",
-        "code":                   "💻 Code & Dev",
-        "reasoning":              "🧩 Raisonnement & Logique",
-        "math_stem":              "📐 Maths & Sciences",
-        "tool_calling":           "🛠️ Agents & Outils",
-        "routing_classification": "🔀 Routage & Classification",
-        "edge_on_device":         "📱 Edge / Embarqué",
-        "enterprise":             "🏢 Entreprise & Conformité",
-        "educational_tutor":      "🎓 Tutorat & Pédagogie"
-    }
+    doc_index = _get_catalog_index(catalog)
 
     doc_tab1, doc_tab2, doc_tab3 = st.tabs(["🤖 Catalogue & Filtres", "☁️ Mode Hybride", "🌱 Méthodologie Green IT"])
 
     with doc_tab1:
         st.markdown("#### 🔍 Trouver le modèle idéal")
-        
-        # --- 2. COLLECTE DES DONNÉES BRUTES ---
-        raw_langs = set()
-        raw_roles = set()
-        
-        for family, variants in models_db.items():
-            for _, config in variants.items():
-                info = config.get("info", {})
-                raw_langs.update(info.get("langs", []))
-                raw_roles.update(info.get("role_pref", []))
-        
-        # --- 3. CONVERSION EN LISTES FORMATEES POUR L'UI ---
-        # On utilise .get(k, k) pour garder le code brut si jamais il manque dans le dictionnaire
-        fmt_lang_options = sorted([LANG_MAP.get(k, k) for k in raw_langs])
-        fmt_role_options = sorted([ROLE_MAP.get(k, k) for k in raw_roles])
 
-        # --- 4. ZONE DE FILTRAGE (WIDGETS) ---
+        # --- ZONE DE FILTRAGE (WIDGETS) : options pré-calculées ---
         col_fil1, col_fil2 = st.columns(2)
         with col_fil1:
-            sel_langs_fmt = st.multiselect("🌍 Filtrer par Langue", fmt_lang_options)
+            sel_langs_fmt = st.multiselect("🌍 Filtrer par Langue", doc_index.lang_options)
         with col_fil2:
-            sel_roles_fmt = st.multiselect("🎯 Filtrer par Cas d'usage", fmt_role_options)
+            sel_roles_fmt = st.multiselect("🎯 Filtrer par Cas d'usage", doc_index.role_options)
 
         if sel_langs_fmt or sel_roles_fmt:
             st.caption(f"ℹ️ Filtres actifs : {len(sel_langs_fmt)} langue(s), {len(sel_roles_fmt)} rôle(s).")
-        
-        # --- 5. LOGIQUE DE FILTRAGE ET CRÉATION DATAFRAME ---
-        def _create_filtered_df(model_type_filter):
-            data = []
-            for family, variants in models_db.items():
-                # Filtre Type (Local vs API)
-                is_api_fam = "API" in family or "☁️" in family
-                if (model_type_filter == "local" and is_api_fam) or (model_type_filter == "api" and not is_api_fam):
-                    continue
-                
-                for name, config in variants.items():
-                    info = config["info"]
-                    # Récupération des données brutes du modèle
-                    m_langs_raw = info.get("langs", [])
-                    m_roles_raw = info.get("role_pref", [])
-
-                    # Conversion en format "Joli" pour la comparaison avec le filtre et l'affichage
-                    m_langs_fmt = [LANG_MAP.get(k, k) for k in m_langs_raw]
-                    m_roles_fmt = [ROLE_MAP.get(k, k) for k in m_roles_raw]
-
-                    # LOGIQUE DE FILTRAGE (Mode "ET" strict / Subset)
-                    # On ne garde le modèle que si TOUS les éléments sélectionnés sont présents dans ses capacités
-                    
-                    # 1. Filtre Langues (ET)
-                    if sel_langs_fmt and not set(sel_langs_fmt).issubset(set(m_langs_fmt)):
-                        continue
-                        
-                    # 2. Filtre Cas d'usage (ET)
-                    if sel_roles_fmt and not set(sel_roles_fmt).issubset(set(m_roles_fmt)):
-                        continue
-
-                    data.append({
-                        "Famille": family,
-                        "Modèle": name,
-                        "Langues": ", ".join(m_langs_fmt),
-                        "Rôles Clés": ", ".join(m_roles_fmt),
-                        "Description": info["desc"],
-                        "Taille": f"{info['disk']} Go" if "disk" in info else "N/A",
-                        "Params Totaux": f"{info['params_tot']}B",
-                        "Params Actifs": f"{info['params_act']}B",
-                    })
-            return pd.DataFrame(data)
-
-        # --- 6. AFFICHAGE DES TABLEAUX ---
+
+        # --- AFFICHAGE DES TABLEAUX ---
         
         st.markdown("##### 🏠 Modèles Locaux (Edge)")
-        df_local = _create_filtered_df("local")
+        # Filtre "ET" strict : index du catalogue (Catalog.query)
+        df_local = doc_index.query("local", sel_langs_fmt, sel_roles_fmt)
         
         if not df_local.empty:
             st.dataframe(
@@ -320,7 +614,7 @@ def render_doc_tab(models_db):
         st.divider()
         
         st.markdown("##### ☁️ Modèles Cloud (Comparaison)")
-        df_api = _create_filtered_df("api")
+        df_api = doc_index.query("api", sel_langs_fmt, sel_roles_fmt)
         if not df_api.empty:
             st.dataframe(
                 df_api, 
@@ -396,8 +690,10 @@ def render_doc_tab(models_db):
                 * Incluse dans le facteur par token. Elle représente la part d'usure des GPU (H100) partagés allouée à votre requête.
             """)
 
-def render_config_tab(models_db):
+def render_config_tab(catalog):
     """Onglet 9 : Configuration & Hardware"""
+    import psutil
+    import pandas as pd
     
     st.markdown("### ⚙️ Configuration & Hardware")
     
@@ -426,27 +722,44 @@ def render_config_tab(models_db):
     
     perf_data = []
     
-    # On boucle uniquement sur les modèles LOCAUX
-    for family, variants in models_db.items():
-        # On saute les catégories cloud
-        if "API" in family or "Mistral" in family: continue 
+    gguf_data = []
+    manifest = HashManifest()  # Lecture seule : aucun hachage depuis l'interface
+    integrity_labels = {"ok": "✅ SHA-256 conforme", "mismatch": "❌ Corrompu", "unverified": "⚠️ Non vérifiable"}
+    # On boucle uniquement sur les modèles LOCAUX (cache GGUF réécrit une seule fois pour le lot)
+    with deferred_writes():
+        for entry in catalog.query(type="local"):
+            # Poids et RAM exacts si le GGUF est présent (en-tête lu, poids non chargés), sinon catalogue
+            size_gb, ram_gb = model_memory(entry.conf)
+            meta = get_gguf_metadata(entry.file)
+            est_str, est_val = estimate_model_performance(size_gb, mem_total_gb)
         
-        for name, conf in variants.items():
-            if conf["type"] == "local":
-                size_gb = conf["info"]["disk"]
-                est_str, est_val = estimate_model_performance(size_gb, mem_total_gb)
-                
-                # Petit indicateur visuel
-                status = "🟢 Fluide"
-                if est_val < 10: status = "🟠 Lent"
-                if est_val < 1: status = "🔴 Critique"
-                
-                perf_data.append({
-                    "Famille": family.replace("🏠 ", ""), # On retire l'emoji pour la lisibilité
-                    "Modèle": name,
-                    "Poids (Go)": f"{size_gb} Go",
-                    "Estimation Vitesse": est_str,
-                    "Statut": status
+            # Petit indicateur visuel
+            status = "🟢 Fluide"
+            if est_val < 10: status = "🟠 Lent"
+            if est_val < 1: status = "🔴 Critique"
+        
+            perf_data.append({
+                "Famille": entry.family.replace("🏠 ", ""), # On retire l'emoji pour la lisibilité
+                "Modèle": entry.name,
+                "Poids (Go)": f"{size_gb:.2f} Go",
+                "RAM estimée": f"{ram_gb:.2f} Go",
+                "Source": "📄 GGUF" if meta else "📚 Catalogue",
+                "Estimation Vitesse": est_str,
+                "Statut": status
+            })
+            if meta:
+                gguf_data.append({
+                    "Modèle": entry.name,
+                    "Archi": meta["arch"],
+                    "Quant.": meta["quant"],
+                    "Params (B)": meta["params_b"],
+                    "Couches": meta["layers"],
+                    "Embedding": meta["embedding"],
+                    "Têtes (KV)": f"{meta['heads']} ({meta['kv_heads']})",
+                    "Contexte entraîné": meta["ctx_train"],
+                    "Contexte utilisé": effective_ctx(entry.conf),
+                    "Tokenizer": f"{meta['tokenizer']} ({meta['vocab_size']:,} tokens)".replace(",", " "),
+                    "Intégrité": integrity_labels[status_of(record)] if (record := manifest.lookup(entry.file)) else "❔ Non vérifié",
                 })
     
     if perf_data:
@@ -462,7 +775,43 @@ def render_config_tab(models_db):
     else:
         st.info("Aucun modèle local configuré pour l'estimation.")
 
-    # --- 3. EXPLICATION ---
+    # --- 2 bis. MÉTADONNÉES GGUF (fichiers présents) ---
+    st.markdown("#### 🔬 Métadonnées GGUF (modèles installés)")
+    if gguf_data:
+        st.dataframe(pd.DataFrame(gguf_data), use_container_width=True, hide_index=True)
+        st.caption("Lues dans l'en-tête de chaque fichier (sans charger les poids), mises en cache tant que le fichier ne change pas. "
+                   "RAM estimée = poids + cache KV (f16) au contexte utilisé + tampons de calcul. "
+                   "Intégrité : `python download_gguf_models.py --verify`.")
+    else:
+        st.info("Aucun fichier GGUF dans le dossier des modèles : valeurs du catalogue utilisées.")
+
+    # --- 3. CACHES DE RÉPONSES ---
+    st.markdown("#### ♻️ Caches de réponses")
+    c_cache1, c_cache2 = st.columns(2)
+    with c_cache1:
+        exact = get_response_cache().stats()
+        st.metric("Cache exact (entrées)", exact["entries"])
+        st.caption(f"{exact['hits']} réponses rejouées · {exact['size_mb']:.2f} Mo sur disque")
+        if st.button("🗑️ Vider le cache exact"):
+            get_response_cache().clear()
+            st.rerun()
+    with c_cache2:
+        sem_cache = get_semantic_cache()
+        if sem_cache is None:
+            st.metric("Cache sémantique", "Inactif")
+            if SEMANTIC_CACHE_STATUS["error"]:
+                st.caption(f"Modèle d'embedding non chargé : {SEMANTIC_CACHE_STATUS['error']}")
+            else:
+                st.caption("Modèle d'embedding absent (voir `download_gguf_models.py`) ou `llama-cpp-python` manquant.")
+        else:
+            sem = sem_cache.stats()
+            st.metric("Cache sémantique (hit rate)", f"{sem['hit_rate'] * 100:.0f} %")
+            st.caption(
+                f"{sem['hits']}/{sem['lookups']} requêtes servies · {sem['saved_s']:.1f} s économisées · "
+                f"{sem['entries']} entrées · embedding ~{sem['avg_embed_ms']:.0f} ms"
+            )
+
+    # --- 4. EXPLICATION ---
     with st.expander("ℹ️ Comment est calculée cette estimation ?"):
         st.markdown("""
         **La "Physique" des LLM Locaux :**
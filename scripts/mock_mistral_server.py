@@ -0,0 +1,161 @@
+"""
+Serveur local imitant l'API de chat Mistral (streaming SSE), pour tester et mesurer la
+branche API de l'application sans appel payant.
+
+- POST /v1/chat/completions : réponse complète ou streamée (`"stream": true`), avec `usage`.
+- GET  /v1/models : liste minimale.
+- Débit (tokens/s), délai avant premier token et injection d'erreurs (429 / 5xx) réglables.
+
+Usage :
+    python scripts/mock_mistral_server.py --port 8089 --tps 40 --ttft 0.3 --error-rate 0.1
+    set MISTRAL_SERVER_URL=http://127.0.0.1:8089   (puis lancer l'application / les benchmarks)
+Uniquement la bibliothèque standard : utilisable sans dépendance.
+"""
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULTS = {"tps": 40.0, "ttft": 0.3, "tokens": 64, "error_rate": 0.0, "error_status": 429, "retry_after": 1.0}
+WORDS = ("Le modèle local répond rapidement et consomme peu d'énergie sur un poste de travail standard .").split()
+
+
+def _approx_tokens(text):
+    return int(len(text) / 2.7)  # Même heuristique que l'application
+
+
+class MockState:
+    """Réglages et compteurs partagés entre les threads du serveur."""
+
+    def __init__(self, **settings):
+        self.settings = dict(DEFAULTS, **settings)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0, "streams": 0, "tokens": 0}
+
+    def count(self, key, n=1):
+        with self.lock: self.stats[key] += n
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive : permet de mesurer la réutilisation des connexions
+    state = None
+
+    def log_message(self, fmt, *args):
+        pass  # Silencieux (le benchmark affiche ses propres mesures)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-small", "object": "model"}]})
+        else:
+            self._send_json(404, {"message": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"message": "Invalid JSON"})
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            return self._send_json(404, {"message": "Not found"})
+
+        s = self.state.settings
+        self.state.count("requests")
+        if random.random() < s["error_rate"]:
+            self.state.count("errors_injected")
+            headers = {"Retry-After": str(s["retry_after"])} if s["error_status"] == 429 else {}
+            return self._send_json(s["error_status"], {"message": "Injected error", "code": s["error_status"]}, headers)
+
+        prompt = " ".join(str(m.get("content", "")) for m in req.get("messages", []))
+        n_tokens = min(int(req.get("max_tokens") or s["tokens"]), s["tokens"])
+        completion_id = f"mock-{uuid.uuid4().hex[:12]}"
+        usage = {"prompt_tokens": _approx_tokens(prompt), "completion_tokens": n_tokens,
+                 "total_tokens": _approx_tokens(prompt) + n_tokens}
+        model = req.get("model", "mock-small")
+        tokens = [WORDS[i % len(WORDS)] + " " for i in range(n_tokens)]
+
+        time.sleep(s["ttft"])
+        if not req.get("stream"):
+            time.sleep(n_tokens / s["tps"])
+            return self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+
+        # Streaming SSE (chunked) : un événement par token, `usage` dans le dernier
+        self.state.count("streams")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, tok in enumerate(tokens):
+                last = i == len(tokens) - 1
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": tok}, "finish_reason": "stop" if last else None}]
+                }
+                if last: chunk["usage"] = usage
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                self.state.count("tokens")
+                if not last: time.sleep(1.0 / s["tps"])
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client parti en cours de stream
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_server(host="127.0.0.1", port=0, **settings):
+    """Démarre le serveur dans un thread daemon. Retourne (serveur, url, état). port=0 : port libre."""
+    state = MockState(**settings)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}", state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API de chat Mistral (SSE).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--tps", type=float, default=DEFAULTS["tps"], help="Tokens par seconde")
+    parser.add_argument("--ttft", type=float, default=DEFAULTS["ttft"], help="Délai avant premier token (s)")
+    parser.add_argument("--tokens", type=int, default=DEFAULTS["tokens"], help="Longueur max de réponse (tokens)")
+    parser.add_argument("--error-rate", type=float, default=DEFAULTS["error_rate"], help="Part des requêtes en erreur (0-1)")
+    parser.add_argument("--error-status", type=int, default=DEFAULTS["error_status"], help="Code HTTP injecté (429, 500, 503...)")
+    parser.add_argument("--retry-after", type=float, default=DEFAULTS["retry_after"], help="En-tête Retry-After des 429 (s)")
+    args = parser.parse_args()
+
+    server, url, state = start_server(
+        args.host, args.port, tps=args.tps, ttft=args.ttft, tokens=args.tokens,
+        error_rate=args.error_rate, error_status=args.error_status, retry_after=args.retry_after
+    )
+    print(f"🧪 Mock Mistral prêt sur {url}  (MISTRAL_SERVER_URL={url})")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\n📊 {state.stats}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
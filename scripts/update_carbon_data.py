@@ -1,38 +1,53 @@
 """
 Script utilitaire pour mettre à jour les données d'intensité carbone.
 Source : Our World in Data (OWID)
+Seule l'archive du data package est conservée (pas de CSV extrait) ; elle est aussitôt
+compilée en index compact (modules/carbon.py), lu par l'application.
 """
 import os
+import sys
+import zipfile
 import requests
-import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.models_config import CARBON_SETTINGS
+from modules.carbon import build_index
 
 # URLs et Chemins
-DATA_URL = "https://ourworldindata.org/grapher/carbon-intensity-electricity.csv?v=1&csvType=full&useColumnShortNames=true"
-OUTPUT_DIR = os.path.join("data", "carbon-intensity-electricity")
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "carbon-intensity-electricity.csv")
+DATA_URL = "https://ourworldindata.org/grapher/carbon-intensity-electricity.zip?v=1&csvType=full&useColumnShortNames=true"
+OUTPUT_FILE = os.path.join(ROOT, CARBON_SETTINGS["zip_path"])
+OUTPUT_DIR = os.path.dirname(OUTPUT_FILE)
+INDEX_FILE = os.path.join(ROOT, CARBON_SETTINGS["index_path"])
 
 def update_data():
     print(f"🌍 Téléchargement des données depuis : {DATA_URL}")
-    
+    tmp_file = f"{OUTPUT_FILE}.part"
+
     try:
-        response = requests.get(DATA_URL)
-        response.raise_for_status()
-        
-        # Création du dossier si inexistant
+        # Streaming vers un fichier temporaire : l'archive en place n'est remplacée que si la nouvelle est valide
         os.makedirs(OUTPUT_DIR, exist_ok=True)
-        
-        # Sauvegarde brute
-        with open(OUTPUT_FILE, "wb") as f:
-            f.write(response.content)
-            
-        # Vérification rapide
-        df = pd.read_csv(OUTPUT_FILE)
-        print(f"✅ Succès ! Fichier sauvegardé : {OUTPUT_FILE}")
-        print(f"📊 Lignes : {len(df)} | Pays uniques : {df['Entity'].nunique()}")
-        print(f"📅 Plage années : {df['Year'].min()} - {df['Year'].max()}")
-        
+        with requests.get(DATA_URL, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(tmp_file, "wb") as f:
+                for block in response.iter_content(chunk_size=64 * 1024):
+                    f.write(block)
+        if not zipfile.is_zipfile(tmp_file):
+            raise ValueError("la réponse n'est pas une archive zip")
+
+        # Compilation de l'index (validation du schéma incluse) avant de remplacer l'archive
+        index = build_index(tmp_file, INDEX_FILE)
+        os.replace(tmp_file, OUTPUT_FILE)  # Le renommage conserve taille et mtime : la signature de l'index reste valide
+        print(f"✅ Succès ! Archive sauvegardée : {OUTPUT_FILE} ({os.path.getsize(OUTPUT_FILE) / 1024:.0f} Ko)")
+
+        years = [row[2] for row in index["rows"]]
+        print(f"🗂️ Index compilé : {INDEX_FILE}")
+        print(f"📊 Pays : {len(index['rows'])} | Dernières années : {min(years)} - {max(years)}")
+
     except Exception as e:
+        if os.path.exists(tmp_file): os.remove(tmp_file)
         print(f"❌ Erreur lors de la mise à jour : {e}")
 
 if __name__ == "__main__":
-    update_data()
\ No newline at end of file
+    update_data()
@@ -0,0 +1,57 @@
+"""Configuration pytest : les tests importent `modules` et `config` depuis la racine du dépôt."""
+import os
+import sys
+import struct
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# --- GGUF MINIMAL (en-tête seul, sans poids) ---
+def _gguf_string(text):
+    raw = text.encode("utf-8")
+    return struct.pack("<Q", len(raw)) + raw
+
+
+def _gguf_kv(key, value):
+    """Paire clé/valeur GGUF : str → type 8, int → uint32 (4), liste de str → tableau (9) de type 8."""
+    out = _gguf_string(key)
+    if isinstance(value, str):
+        return out + struct.pack("<I", 8) + _gguf_string(value)
+    if isinstance(value, list):
+        return out + struct.pack("<IIQ", 9, 8, len(value)) + b"".join(_gguf_string(v) for v in value)
+    return out + struct.pack("<II", 4, value)
+
+
+def write_gguf(path, vocab=1000, layers=16, embedding=2048, heads=32, kv_heads=8, ctx_train=131072, file_type=15):
+    """Écrit un GGUF v3 valide (architecture llama) dont seuls l'en-tête et quelques octets de données existent."""
+    kvs = [
+        _gguf_kv("general.architecture", "llama"), _gguf_kv("general.name", "Tiny"),
+        _gguf_kv("general.file_type", file_type), _gguf_kv("llama.block_count", layers),
+        _gguf_kv("llama.embedding_length", embedding), _gguf_kv("llama.attention.head_count", heads),
+        _gguf_kv("llama.attention.head_count_kv", kv_heads), _gguf_kv("llama.context_length", ctx_train),
+        _gguf_kv("tokenizer.ggml.model", "gpt2"), _gguf_kv("tokenizer.ggml.tokens", [f"t{i}" for i in range(vocab)]),
+    ]
+    tensors = [("token_embd.weight", [embedding, vocab]), ("blk.0.attn_q.weight", [embedding, embedding])]
+    body = b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(kvs)) + b"".join(kvs)
+    for name, dims in tensors:
+        body += _gguf_string(name) + struct.pack("<I", len(dims)) + b"".join(struct.pack("<Q", d) for d in dims)
+        body += struct.pack("<IQ", 12, 0)
+    with open(path, "wb") as f:
+        f.write(body + b"\0" * 4096)
+    return str(path)
+
+
+@pytest.fixture
+def gguf_cache(tmp_path, monkeypatch):
+    """Cache GGUF (mémoire + disque) isolé dans un dossier temporaire."""
+    from config.models_config import GGUF_SETTINGS
+    from modules import gguf_reader
+    monkeypatch.setitem(GGUF_SETTINGS, "cache_path", str(tmp_path / "gguf_cache.json"))
+    monkeypatch.setattr(gguf_reader, "_MEMO", {})
+    monkeypatch.setattr(gguf_reader, "_DISK", None)
+    monkeypatch.setattr(gguf_reader, "_DIRTY", False)
+    return tmp_path / "gguf_cache.json"
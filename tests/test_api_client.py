@@ -0,0 +1,124 @@
+"""Client API mutualisé : flux synchrone et rejeu avec backoff avant le premier token."""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from modules import api_client
+from modules.api_client import ApiClientPool
+
+
+class _HttpError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.raw_response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(data=SimpleNamespace(choices=choices, usage=usage))
+
+
+class _FakeClient:
+    """Échoue selon `failures` (codes HTTP, un par appel) puis streame « Bon » « jour »."""
+
+    def __init__(self, failures=(), fail_after_first_token=False):
+        self.failures = list(failures)
+        self.fail_after_first_token = fail_after_first_token
+        self.calls = 0
+        self.chat = SimpleNamespace(stream_async=self._stream_async)
+
+    async def _stream_async(self, **params):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+        async def _gen():
+            yield _chunk("Bon")
+            if self.fail_after_first_token: raise _HttpError(503)
+            yield _chunk("jour")
+            yield _chunk(usage=SimpleNamespace(prompt_tokens=7, completion_tokens=2))
+        return _gen()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff instantané : on note seulement les délais demandés."""
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        recorded.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(api_client.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(api_client.random, "uniform", lambda a, b: 1.0)
+    return recorded
+
+
+def _pool(client, **settings):
+    pool = ApiClientPool(settings=dict({"backoff_base_s": 0.5, "backoff_max_s": 8.0, "max_retries": 4}, **settings))
+    pool._client = lambda api_key: client
+    return pool
+
+
+def test_stream_chat_delivers_deltas_and_usage(sleeps):
+    deltas = []
+    usage = _pool(_FakeClient()).stream_chat("cle", deltas.append, model="m", messages=[])
+    assert deltas == ["Bon", "jour"] and usage == (7, 2)
+    assert sleeps == []
+
+
+def test_retryable_errors_back_off_exponentially(sleeps):
+    client = _FakeClient([_HttpError(503), _HttpError(429), _HttpError(502)])
+    pool = _pool(client)
+    deltas = []
+    assert pool.stream_chat("cle", deltas.append, model="m", messages=[]) == (7, 2)
+    assert deltas == ["Bon", "jour"]
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert client.calls == 4 and pool.metrics["retries"] == 3
+
+
+def test_retry_after_header_wins(sleeps):
+    _pool(_FakeClient([_HttpError(429, retry_after="3")])).stream_chat("cle", lambda d: None, model="m", messages=[])
+    assert sleeps == [3.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    client = _FakeClient([_HttpError(503)] * 3)
+    with pytest.raises(_HttpError):
+        _pool(client, max_retries=2).stream_chat("cle", lambda d: None, model="m", messages=[])
+    assert client.calls == 3 and len(sleeps) == 2
+
+
+def test_no_retry_once_tokens_were_sent(sleeps):
+    deltas = []
+    with pytest.raises(_HttpError):
+        _pool(_FakeClient(fail_after_first_token=True)).stream_chat("cle", deltas.append, model="m", messages=[])
+    assert deltas == ["Bon"] and sleeps == []
+
+
+def test_interrupted_consumer_cancels_the_stream():
+    closed = threading.Event()
+
+    async def endless_stream(**params):
+        async def _gen():
+            try:
+                while True:
+                    yield _chunk("mot ")
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+        return _gen()
+
+    def stop(delta):
+        raise RuntimeError("rerun")
+
+    pool = _pool(SimpleNamespace(chat=SimpleNamespace(stream_async=endless_stream)))
+    with pytest.raises(RuntimeError):
+        pool.stream_chat("cle", stop, model="m", messages=[])
+    assert closed.wait(timeout=2)
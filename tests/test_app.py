@@ -0,0 +1,52 @@
+"""Rendu de l'application (AppTest) : chaque onglet s'affiche, les panneaux en fragments gardent leurs réglages."""
+import os
+
+import pytest
+
+from conftest import ROOT
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+TABS = ["🏢 Ops", "🤖 IoT", "📝 Synthèse", "🌐 Traduction", "💻 Code", "🧠 Logique", "💬 Chat", "ℹ️ Documentation", "⚙️ Config"]
+
+
+@pytest.fixture(scope="module")
+def app():
+    return AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+
+
+def test_every_tab_renders(app):
+    assert not app.exception
+    for tab in TABS:
+        app.radio(key="nav").set_value(tab).run()
+        assert not app.exception, (tab, [e.value for e in app.exception])
+
+
+def test_parameters_live_in_session_state(app):
+    app.number_input(key="p_max_tokens").set_value(128).run()
+    assert app.session_state["p_max_tokens"] == 128
+    app.radio(key="nav").set_value("💻 Code").run()
+    # Changer d'onglet ne réinitialise pas les paramètres du fragment
+    assert app.number_input(key="p_max_tokens").value == 128
+    assert not app.exception
+
+
+def test_token_guardrail_uses_loaded_context():
+    """En local, la jauge compare au n_ctx réellement chargé, pas au contexte nominal du catalogue."""
+    from modules.utils import LOCAL_MAX_CTX
+    from modules.views import token_guardrail
+
+    conf = {"type": "local", "file": "absent.gguf", "ctx": 32768}
+    text = "x" * int((LOCAL_MAX_CTX + 500) * 2.7)
+    assert not token_guardrail(text, "", {"model_conf": conf}, display=False)
+    assert token_guardrail(text, "", {"model_conf": dict(conf, type="api")}, display=False)
+
+
+@pytest.mark.parametrize("model_type, expected", [("local", 1), ("cascade", 1), ("api", None)])
+def test_batch_workers_serialize_local_inference(model_type, expected):
+    """La cascade passe d'abord par le modèle local : un seul worker à la fois, comme le local seul."""
+    from config.models_config import TRANSLATION_SETTINGS
+    from modules.views import _batch_workers
+
+    workers = _batch_workers({"model_type": model_type}, None, None)
+    assert [w["concurrency"] for w in workers] == [expected or TRANSLATION_SETTINGS["api_concurrency"]]
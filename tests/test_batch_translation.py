@@ -0,0 +1,78 @@
+"""Traduction par lot : file de travail partagée entre workers et bilan énergie au prorata."""
+import threading
+import time
+
+import pytest
+
+from modules import batch_translation
+from modules.translation import TranslationMemory
+
+LOCAL_CONF = {"type": "local", "file": "models_gguf/qwen.gguf", "ctx": 8192}
+API_CONF = {"type": "api", "api_id": "mistral-small-latest", "ctx": 32768}
+TEXT = "Un. Deux. Trois. Quatre. Cinq. Six."
+
+
+@pytest.fixture
+def served(monkeypatch):
+    """`translate_missing` factice (majuscules) qui note quel type de worker a traité chaque segment."""
+    log, lock = [], threading.Lock()
+
+    def fake_translate(batch, lang, sys_prompt, gen_kwargs, meter, on_partial=None):
+        time.sleep(0.01)
+        with lock: log.extend((gen_kwargs["model_type"], lang, seg) for seg in batch)
+        meter.add({"input_tokens": 1, "output_tokens": 2, "energy_kwh": 0.0, "co2_g": 0.0,
+                   "duration": float(len(batch))})
+        return {seg: seg.upper() for seg in batch}
+
+    monkeypatch.setattr(batch_translation, "translate_missing", fake_translate)
+    monkeypatch.setattr(batch_translation, "_batches", lambda segments, budget: [[s] for s in segments])
+    monkeypatch.setattr(batch_translation, "start_energy_tracker", lambda: "tracker")
+    monkeypatch.setattr(batch_translation, "stop_energy_tracker", lambda tracker: 1.0)
+    return log
+
+
+def _workers():
+    return [
+        {"label": "Local", "gen_kwargs": {"model_type": "local", "model_conf": LOCAL_CONF}, "concurrency": 1},
+        {"label": "API", "gen_kwargs": {"model_type": "api", "model_conf": API_CONF}, "concurrency": 2},
+    ]
+
+
+def test_every_batch_is_translated_once(tmp_path, served):
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    out = str(tmp_path / "out" / "doc_{code}.txt")
+    results = batch_translation.batch_translate(TEXT, ["Anglais", "Espagnol"], "Vers {lang}", _workers(), tm, out)
+
+    for lang, code in (("Anglais", "en"), ("Espagnol", "es")):
+        stats = results[lang]
+        assert stats["error"] is None
+        assert stats["text"] == TEXT.upper()
+        assert stats["done_segments"] == stats["to_translate"] == 6
+        with open(stats["path"], encoding="utf-8") as f: assert f.read() == TEXT.upper()
+        assert stats["path"].endswith(f"doc_{code}.txt")
+    assert len(served) == 12 and len(set(served)) == 12
+
+
+def test_local_energy_is_split_pro_rata(tmp_path, served):
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    results = batch_translation.batch_translate(TEXT, ["Anglais", "Espagnol"], "Vers {lang}", _workers(), tm)
+
+    total_busy = sum(s["local_busy_s"] for s in results.values())
+    assert total_busy == sum(1 for kind, _, _ in served if kind == "local")
+    assert sum(s["energy_kwh"] for s in results.values()) == pytest.approx(1.0 if total_busy else 0.0)
+    for stats in results.values():
+        share = stats["local_busy_s"] / total_busy if total_busy else 0.0
+        assert stats["energy_kwh"] == pytest.approx(share)
+
+
+def test_translation_memory_short_circuits(tmp_path, served):
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    batch_translation.batch_translate(TEXT, ["Anglais"], "Vers {lang}", _workers(), tm)
+    served.clear()
+    events = []
+    results = batch_translation.batch_translate(
+        TEXT, ["Anglais"], "Vers {lang}", _workers(), tm, on_event=lambda kind, lang, stats: events.append(kind)
+    )
+    assert served == []
+    assert results["Anglais"]["tm_hits"] == 6 and results["Anglais"]["text"] == TEXT.upper()
+    assert events == ["done"]
@@ -0,0 +1,137 @@
+"""Données carbone : index OWID (zip ou CSV, reconstruit si la source change) et analyse « et ailleurs ? »."""
+import os
+import zipfile
+
+import pytest
+
+from modules import carbon
+from modules.carbon import DEFAULT_CARBON_DB, compile_rows, load_carbon_index, what_if_matrix
+
+CSV = (
+    "Entity,Code,Year,co2_intensity__gco2_kwh\n"
+    "France,FRA,2022,85.0\n"
+    "France,FRA,2023,56.0\n"
+    "Albanie,ALB,2023,\n"
+    "Suède,SWE,2021,40.0\n"
+)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    csv_path = tmp_path / "carbon.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    return str(csv_path), str(tmp_path / "cache" / "carbon_index.json")
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    counter = []
+    real_build = carbon.build_index
+
+    def counting_build(*args, **kwargs):
+        counter.append(args)
+        return real_build(*args, **kwargs)
+
+    monkeypatch.setattr(carbon, "build_index", counting_build)
+    return counter
+
+
+def test_compile_rows_keeps_latest_year_sorted():
+    header = ["Country", "Year", "Carbon intensity of electricity - gCO2/kWh"]
+    rows = [["Suède", "2021", "40"], ["France", "2020", "60"], ["France", "2023", "56"]]
+    assert compile_rows(header, rows) == [["France", 56.0, 2023, ""], ["Suède", 40.0, 2021, ""]]
+
+
+def test_schema_requires_country_and_intensity():
+    with pytest.raises(ValueError, match="intensity"):
+        compile_rows(["Entity", "Code", "Year"], [])
+
+
+def test_index_is_built_once_then_reused(paths, builds):
+    carbon_db, countries = load_carbon_index(*paths)
+    assert countries == ["France", "Suède"]  # Pays sans valeur ignoré
+    assert carbon_db["France"] == {"val": 56.0, "year": 2023, "code": "FRA"}
+    assert os.path.exists(paths[1])
+
+    assert load_carbon_index(*paths) == (carbon_db, countries)
+    assert len(builds) == 1
+
+
+def test_index_is_rebuilt_when_source_changes(paths, builds):
+    csv_path, index_path = paths
+    load_carbon_index(csv_path, index_path)
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("Pologne,POL,2023,700.0\n")
+    carbon_db, countries = load_carbon_index(csv_path, index_path)
+    assert countries == ["France", "Pologne", "Suède"]
+    assert len(builds) == 2
+
+
+def test_index_alone_is_enough(paths, builds):
+    csv_path, index_path = paths
+    expected = load_carbon_index(csv_path, index_path)
+    os.remove(csv_path)
+    assert load_carbon_index(csv_path, index_path) == expected
+    assert len(builds) == 1
+
+
+def test_defaults_without_any_data(tmp_path):
+    carbon_db, countries = load_carbon_index(str(tmp_path / "absent.csv"), str(tmp_path / "absent.json"))
+    assert carbon_db == DEFAULT_CARBON_DB and countries == ["France"]
+
+
+def test_zip_archive_is_read_without_extraction(tmp_path, builds):
+    zip_path = tmp_path / "carbon.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("datapackage.json", "{}")
+        archive.writestr("carbon-intensity-electricity.csv", CSV)
+    carbon_db, countries = load_carbon_index(str(zip_path), str(tmp_path / "index.json"))
+    assert countries == ["France", "Suède"] and carbon_db["Suède"]["year"] == 2021
+    assert sorted(os.listdir(tmp_path)) == ["carbon.zip", "index.json"]
+
+
+def test_zip_without_csv_is_rejected(tmp_path):
+    zip_path = tmp_path / "carbon.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("readme.md", "rien")
+    with pytest.raises(ValueError, match="Aucun CSV"):
+        load_carbon_index(str(zip_path), str(tmp_path / "index.json"))
+
+
+CARBON_DB = {
+    "France": {"val": 56.0, "year": 2023, "code": "FRA"},
+    "Pologne": {"val": 700.0, "year": 2023, "code": "POL"},
+    "Suède": {"val": 40.0, "year": 2023, "code": "SWE"},
+}
+
+
+def test_matrix_shape_and_reference_country():
+    runs = [
+        {"energy_kwh": 0.002, "co2_g": 0.5, "ref_intensity": 56.0},   # Local, mesuré en France
+        {"energy_kwh": 0.010, "co2_g": 1.2, "ref_intensity": 56.0},   # API (datacenter France)
+    ]
+    countries, intensity, matrix = what_if_matrix(runs, CARBON_DB)
+    assert countries == ["France", "Pologne", "Suède"]
+    assert list(intensity) == [56.0, 700.0, 40.0]
+    assert matrix.shape == (2, 3)
+    # Pays de référence : empreinte inchangée (Scope 3 compris)
+    assert list(matrix[:, 0]) == pytest.approx([0.5, 1.2])
+
+
+def test_only_scope2_follows_the_mix():
+    runs = [{"energy_kwh": 0.001, "co2_g": 0.3, "ref_intensity": 475.0}]
+    countries, _, matrix = what_if_matrix(runs, CARBON_DB)
+    for j, country in enumerate(countries):
+        expected = 0.3 + 0.001 * (CARBON_DB[country]["val"] - 475.0)
+        assert matrix[0, j] == pytest.approx(expected)
+
+
+def test_cached_runs_cost_nothing_anywhere():
+    runs = [{"energy_kwh": 0.0, "co2_g": 0.0, "ref_intensity": 56.0}]
+    _, _, matrix = what_if_matrix(runs, CARBON_DB)
+    assert not matrix.any()
+
+
+def test_empty_log():
+    countries, intensity, matrix = what_if_matrix([], CARBON_DB)
+    assert len(countries) == 3 and matrix.shape == (0, 3)
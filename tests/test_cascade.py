@@ -0,0 +1,115 @@
+"""Cascade : log-probs jusqu'au contrôle de confiance, et escalade vers le niveau suivant."""
+import pytest
+
+from modules import cascade, utils
+from modules.cascade import check_confidence, describe_attempts, run_cascade
+from modules.fake_backend import SyntheticLlama
+from modules.utils import _chunk_logprobs, _stream_local
+
+MESSAGES = [{"role": "system", "content": "Réponds en JSON"}, {"role": "user", "content": "Allume la lumière du salon"}]
+SMALL = {"type": "local", "file": "small.gguf", "ctx": 4096, "info": {"disk": 0.5}}
+API = {"type": "api", "api_id": "mistral-small-latest", "ctx": 32768}
+CONF = {"type": "cascade", "tiers": [{"label": "Petit", "conf": SMALL, "logprobs": True},
+                                     {"label": "API", "conf": API, "logprobs": False}]}
+
+
+def _result(text, logprobs=None, duration=1.0):
+    return {"text": text, "logprobs": logprobs, "error": None, "input_tokens": 10, "output_tokens": 5,
+            "duration": duration, "ttft": 0.1, "queue_s": 0.0, "energy_kwh": 0.001, "co2_g": 0.1}
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    """Réponses successives des niveaux (type du niveau appelé noté à chaque appel)."""
+    scripted, called = [], []
+
+    def fake_run_completion(model_type, model_conf, llm, api_key, messages, on_update=None, **sampling):
+        called.append((model_type, sampling.get("logprobs")))
+        return scripted.pop(0)
+
+    monkeypatch.setattr(utils, "run_completion", fake_run_completion)
+    monkeypatch.setattr(cascade, "_load_tier", lambda conf: object())
+    return scripted, called
+
+
+def test_check_confidence():
+    assert check_confidence("  ", [], expects_json=False)[:2] == (False, "réponse vide")
+    assert check_confidence("pas du json", [-0.1], expects_json=True)[:2] == (False, "JSON invalide")
+    ok, reason, avg = check_confidence("ok", [-5.0, -6.0], expects_json=False)
+    assert not ok and "log-prob" in reason and avg == -5.5
+    assert check_confidence('{"a": 1}', None, expects_json=True) == (True, "ok", None)
+
+
+def _collect(**sampling):
+    llm = SyntheticLlama(tps=1e6, ttft=0, output_tokens=8)
+    text, logprobs = [], []
+    _stream_local(llm, MESSAGES[1:], text.append, logprobs.extend, **sampling)
+    return "".join(text), logprobs
+
+
+def test_logprobs_alone_returns_nothing_like_llama_cpp():
+    _, logprobs = _collect(logprobs=True)
+    assert logprobs == []
+
+
+def test_top_logprobs_streams_one_value_per_token():
+    _, logprobs = _collect(logprobs=True, top_logprobs=1)
+    assert len(logprobs) == 8
+    assert all(v <= 0 for v in logprobs)
+
+
+def test_chunk_logprobs_reads_both_formats():
+    chat = {"logprobs": {"content": [{"token": "a", "logprob": -0.5, "bytes": None, "top_logprobs": []}], "refusal": None}}
+    completion = {"logprobs": {"tokens": ["a"], "token_logprobs": [-0.25], "top_logprobs": [{}], "text_offset": [0]}}
+    assert _chunk_logprobs(chat) == [-0.5]
+    assert _chunk_logprobs(completion) == [-0.25]
+    assert _chunk_logprobs({"logprobs": None}) == []
+
+
+def test_run_completion_requests_logprobs_for_the_cascade():
+    conf = {"type": "local", "backend": "synthetic", "file": "synthetic://default", "ctx": 8192, "info": {}}
+    llm = SyntheticLlama(tps=1e6, ttft=0, output_tokens=8)
+    res = utils.run_completion("local", conf, llm, None, MESSAGES[1:], track_energy=False, logprobs=True)
+    assert len(res["logprobs"]) == 8
+    assert check_confidence(res["text"], res["logprobs"], expects_json=False)[2] is not None
+
+
+def test_confident_first_tier_stops_the_cascade(answers):
+    scripted, called = answers
+    scripted.append(_result('{"device": "light"}', logprobs=[-0.1, -0.2]))
+    res = run_cascade(CONF, "cle", MESSAGES)
+    assert res["text"] == '{"device": "light"}'
+    assert res["tier_label"] == "1/2 · Petit"
+    assert called == [("local", True)]
+
+
+def test_low_confidence_escalates(answers):
+    scripted, called = answers
+    scripted += [_result('{"device": "light"}', logprobs=[-4.0]), _result('{"device": "light", "room": "salon"}')]
+    res = run_cascade(CONF, "cle", MESSAGES)
+    assert res["tier_label"] == "2/2 · API"
+    assert [kind for kind, _ in called] == ["local", "api"]
+    # Les deux tentatives sont facturées
+    assert res["duration"] == 2.0 and res["energy_kwh"] == pytest.approx(0.002)
+    assert describe_attempts(res["attempts"]).startswith("Petit ✗ log-prob")
+
+
+def test_without_api_key_low_confidence_answer_is_kept(answers):
+    scripted, _ = answers
+    scripted.append(_result('{"device": "light"}', logprobs=[-4.0]))
+    res = run_cascade(CONF, None, MESSAGES)
+    assert res["error"] is None and res["tier_label"] == "1/1 · Petit"
+
+
+def test_tier_ram_counts_logits_buffer(tmp_path, gguf_cache):
+    from conftest import write_gguf
+    from config.models_config import CASCADE_SETTINGS
+    from modules.cascade import tier_ram_gb, _tier_ctx
+    from modules.gguf_reader import get_gguf_metadata, estimate_ram_gb
+    path = write_gguf(tmp_path / "tiny.gguf", vocab=5000)
+    conf = {"type": "local", "file": path, "ctx": 32768, "info": {"disk": 1.0, "ram": 1.0}}
+    meta = get_gguf_metadata(path)
+    n_ctx = _tier_ctx(conf, meta)
+    assert n_ctx == CASCADE_SETTINGS["logprob_ctx"]
+    logits_gb = n_ctx * 5000 * CASCADE_SETTINGS["logits_bytes"] / (1024 ** 3)
+    assert tier_ram_gb(conf) == pytest.approx(estimate_ram_gb(meta, n_ctx) + logits_gb)
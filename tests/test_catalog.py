@@ -0,0 +1,104 @@
+"""Catalogue typé : validation du JSON, requêtes indexées et tableaux de l'onglet Documentation."""
+import itertools
+import json
+
+import pytest
+
+from config.catalog import CATALOG_VERSION, Catalog, CatalogError, ModelEntry, load_catalog
+from modules.catalog_index import LANG_MAP, ROLE_MAP, CatalogIndex
+
+API_RAW = {"type": "api", "api_id": "x", "ctx": 1000, "info": {
+    "fam": "F", "editor": "E", "desc": "D", "params_tot": 1, "params_act": 1, "disk": 0, "ram": 0,
+    "langs": ["fr"], "role_pref": ["rag"]}}
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog(model_dir="models_gguf")
+
+
+def _write(tmp_path, data):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def _brute_force(catalog, kind, langs, roles):
+    return [e for e in catalog if e.type == kind and set(langs) <= set(e.info.langs) and set(roles) <= set(e.info.roles)]
+
+
+def test_shipped_catalog_loads(catalog):
+    assert len(catalog) > 0
+    local = next(e for e in catalog if e.is_local)
+    assert local.conf["file"].startswith("models_gguf")
+    assert catalog.to_models_db()[local.family][local.name] is local.conf
+
+
+def test_query_matches_brute_force(catalog):
+    langs, roles = catalog.languages(), catalog.roles()
+    assert set(langs) == {lang for e in catalog for lang in e.info.langs}
+    for kind in ("local", "api"):
+        for lang, role in itertools.product([None] + langs[:4], [None] + roles[:4]):
+            sel_langs, sel_roles = [lang] if lang else [], [role] if role else []
+            expected = _brute_force(catalog, kind, sel_langs, sel_roles)
+            assert catalog.query(type=kind, langs=sel_langs, roles=sel_roles) == expected
+
+
+def test_query_any_role_and_budgets(catalog):
+    roles = ["rag", "code"]
+    found = catalog.query(roles=roles, any_role=True, max_ram=8)
+    assert found == [e for e in catalog if set(roles) & set(e.info.roles) and e.info.ram <= 8]
+
+
+def test_duplicate_variants_rejected(catalog):
+    entry = catalog.entries[0]
+    with pytest.raises(CatalogError):
+        Catalog([entry, entry])
+
+
+@pytest.mark.parametrize("patch, message", [
+    ({"type": "gpu"}, "type"),
+    ({"api_id": None}, "api_id"),
+    ({"ctx": "grand"}, "nombre attendu"),
+    ({"info": dict(API_RAW["info"], role_pref=["inconnu"])}, "rôle"),
+    ({"info": dict(API_RAW["info"], langs="fr")}, "liste de chaînes"),
+    ({"info": {k: v for k, v in API_RAW["info"].items() if k != "ram"}}, "manquant"),
+])
+def test_invalid_entry_rejected(patch, message):
+    with pytest.raises(CatalogError, match=message):
+        ModelEntry("F", "V", dict(API_RAW, **patch), "models_gguf")
+
+
+def test_local_gguf_requires_repo_and_filename():
+    raw = dict(API_RAW, type="local", api_id=None)
+    with pytest.raises(CatalogError, match="repo_id"):
+        ModelEntry("F", "V", raw, "models_gguf")
+    entry = ModelEntry("F", "V", dict(raw, repo_id="org/repo", filename="m.gguf"), "models")
+    assert entry.file.endswith("m.gguf") and entry.conf["repo_id"] == "org/repo"
+
+
+def test_catalog_file_errors(tmp_path):
+    with pytest.raises(CatalogError, match="illisible"):
+        load_catalog(str(tmp_path / "absent.json"))
+    with pytest.raises(CatalogError, match="Version"):
+        load_catalog(_write(tmp_path, {"version": CATALOG_VERSION + 1, "families": {}}))
+    path = _write(tmp_path, {"version": CATALOG_VERSION, "families": {"F": {"V": API_RAW}}})
+    extra = {"G": {"W": dict(API_RAW, api_id="y")}}
+    assert [e.name for e in load_catalog(path, extra=extra)] == ["V", "W"]
+
+
+def test_doc_index_filters_use_catalog_query(catalog):
+    index = CatalogIndex(catalog)
+    assert index.size == len(catalog)
+    assert len(index.query("local")) + len(index.query("api")) == len(catalog)
+    lang, role = catalog.languages()[0], catalog.roles()[0]
+    labels = ([LANG_MAP.get(lang, lang)], [ROLE_MAP.get(role, role)])
+    assert labels[0][0] in index.lang_options and labels[1][0] in index.role_options
+    for kind in ("local", "api"):
+        frame = index.query(kind, *labels)
+        expected = _brute_force(catalog, kind, [lang], [role])
+        assert list(zip(frame["Famille"], frame["Modèle"])) == [(e.family, e.name) for e in expected]
+
+
+def test_doc_index_unknown_label_gives_empty_table(catalog):
+    assert CatalogIndex(catalog).query("local", ["🏳️ Klingon"]).empty
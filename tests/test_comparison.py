@@ -0,0 +1,67 @@
+"""Comparaison multi-modèles : regroupement des modèles locaux en vagues (RAM et cœurs)."""
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+from modules import comparison
+from modules.comparison import plan_local_waves
+
+
+@pytest.fixture
+def machine(monkeypatch):
+    """Machine simulée : RAM disponible et cœurs physiques réglables ; RAM des modèles lue dans conf["need"]."""
+    spec = {"available_gb": 16.0, "cores": 8}
+    monkeypatch.setattr(psutil, "virtual_memory", lambda: SimpleNamespace(available=spec["available_gb"] * 1024 ** 3))
+    monkeypatch.setattr(psutil, "cpu_count", lambda logical=True: spec["cores"])
+    monkeypatch.setattr(comparison, "model_memory", lambda conf: (0.0, conf["need"]))
+    monkeypatch.setitem(comparison.COMPARISON_SETTINGS, "ram_margin_gb", 2.0)
+    monkeypatch.setitem(comparison.COMPARISON_SETTINGS, "min_threads", 2)
+    return spec
+
+
+def _entries(*needs):
+    return [(i, {"need": need}) for i, need in enumerate(needs)]
+
+
+def _indices(plan):
+    waves, _ = plan
+    return [[idx for idx, _ in wave] for wave in waves]
+
+
+def test_small_models_share_one_wave(machine):
+    assert _indices(plan_local_waves(_entries(3.0, 2.0, 4.0))) == [[1, 0, 2]]
+
+
+def test_ram_budget_splits_waves(machine):
+    # Budget 14 Go : 5 + 6 tiennent ensemble, 8 part dans une seconde vague
+    assert _indices(plan_local_waves(_entries(8.0, 5.0, 6.0))) == [[1, 2], [0]]
+
+
+def test_oversized_model_is_skipped(machine):
+    plan = plan_local_waves(_entries(30.0, 1.0))
+    assert _indices(plan) == [[1]]
+    [(idx, reason)] = plan[1]
+    assert idx == 0 and reason.startswith("RAM insuffisante")
+
+
+def test_cores_cap_parallelism(machine):
+    machine["cores"] = 4  # 2 modèles au plus par vague (2 cœurs minimum chacun)
+    assert [len(w) for w in _indices(plan_local_waves(_entries(1.0, 1.0, 1.0, 1.0, 1.0)))] == [2, 2, 1]
+    machine["cores"] = 1
+    assert [len(w) for w in _indices(plan_local_waves(_entries(1.0, 1.0)))] == [1, 1]
+
+
+def test_no_local_models(machine):
+    assert plan_local_waves([]) == ([], [])
+
+
+def test_compare_models_reports_oversized_model(machine, monkeypatch):
+    monkeypatch.setattr(comparison, "run_completion", lambda *a, **k: pytest.fail("modèle trop gros chargé"))
+    events = []
+    results = comparison.compare_models(
+        [("Géant", {"type": "local", "need": 30.0})], [{"role": "user", "content": "Bonjour"}], {},
+        on_event=lambda kind, idx, payload: events.append((kind, idx))
+    )
+    assert results[0]["error"].startswith("RAM insuffisante")
+    assert events == [("done", 0)]
@@ -0,0 +1,134 @@
+"""Index BM25 du RAG multi-documents : tokenisation, score, synchronisation incrémentale."""
+import math
+import os
+import subprocess
+import sys
+
+import pytest
+
+from modules import corpus_index
+from modules.corpus_index import BM25_B, BM25_K1, COMMIT_EVERY_PAGES, CorpusIndex, index_path_for, tokenize
+from modules.text_utils import count_tokens_approx, split_into_chunks
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    (folder / "chats.txt").write_text("Le chat dort sur le canapé. Le chat mange.", encoding="utf-8")
+    (folder / "chiens.md").write_text("Le chien court dans le jardin.", encoding="utf-8")
+    (folder / "ignore.csv").write_text("chat,chien", encoding="utf-8")
+    return folder
+
+
+def test_tokenize_strips_accents_and_stopwords():
+    assert tokenize("Le Café est très À la mode !") == ["cafe", "tres", "mode"]
+    assert tokenize("") == []
+
+
+def test_split_into_chunks_respects_size():
+    text = "\n\n".join(f"Paragraphe {i}. " + "mot " * 80 for i in range(10))
+    chunks = split_into_chunks(text, max_tokens=100)
+    assert len(chunks) > 1
+    assert all(len(c) <= 270 for c in chunks)
+    assert count_tokens_approx("a" * 27) == 10
+    assert split_into_chunks("") == []
+
+
+def test_corpus_index_does_not_import_streamlit():
+    code = "import sys, modules.corpus_index; sys.exit('streamlit' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
+
+
+def test_bm25_score_matches_formula(tmp_path, corpus):
+    index = CorpusIndex(str(tmp_path / "idx.sqlite"))
+    index.sync_directory(str(corpus))
+    results = index.search("chat")
+    assert [os.path.basename(r["path"]) for r in results] == ["chats.txt"]
+
+    # Un passage par document : N = 2, df(chat) = 1, tf = 2
+    lengths = {"chats.txt": len(tokenize("Le chat dort sur le canapé. Le chat mange.")),
+               "chiens.md": len(tokenize("Le chien court dans le jardin."))}
+    avg_len = sum(lengths.values()) / 2
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths["chats.txt"] / avg_len)
+    assert results[0]["score"] == pytest.approx(idf * 2 * (BM25_K1 + 1) / (2 + norm))
+
+
+def test_search_ranks_by_relevance(tmp_path, corpus):
+    index = CorpusIndex(str(tmp_path / "idx.sqlite"))
+    index.sync_directory(str(corpus))
+    paths = [os.path.basename(r["path"]) for r in index.search("chien jardin chat")]
+    assert set(paths) == {"chats.txt", "chiens.md"}
+    assert index.search("le la les") == []
+    assert index.search("inconnu") == []
+
+
+def test_sync_is_incremental(tmp_path, corpus):
+    index = CorpusIndex(str(tmp_path / "idx.sqlite"))
+    assert index.sync_directory(str(corpus))["added"] == 2
+    assert index.sync_directory(str(corpus))["unchanged"] == 2
+
+    (corpus / "chiens.md").write_text("Le chien aboie très fort la nuit.", encoding="utf-8")
+    os.remove(corpus / "chats.txt")
+    stats = index.sync_directory(str(corpus))
+    assert (stats["updated"], stats["removed"], stats["added"]) == (1, 1, 0)
+    assert index.search("chat") == []
+    assert index.search("aboie")
+    # Termes orphelins supprimés avec leur document
+    assert index.stats()["docs"] == 1 and index.stats()["terms"] == len(set(tokenize("Le chien aboie très fort la nuit.")))
+
+
+def test_sync_skips_file_deleted_after_listing(tmp_path, corpus, monkeypatch):
+    real_stat = os.stat
+    vanished = str(corpus / "chats.txt")
+
+    def racy_stat(path, *args, **kwargs):
+        if str(path) == vanished: raise FileNotFoundError(path)
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(corpus_index.os, "stat", racy_stat)
+    stats = CorpusIndex(str(tmp_path / "idx.sqlite")).sync_directory(str(corpus))
+    assert stats["added"] == 1 and not stats["errors"]
+
+
+def test_failed_document_is_not_left_partially_indexed(tmp_path, corpus, monkeypatch):
+    broken = str(corpus / "chats.txt")
+    real_iter = corpus_index.iter_document_pages
+
+    def failing_pages(path):
+        if path != broken:
+            yield from real_iter(path)
+            return
+        for page_no in range(1, COMMIT_EVERY_PAGES + 2):
+            yield page_no, f"Page {page_no} : le chat dort."
+        raise ValueError("PDF tronqué")
+
+    monkeypatch.setattr(corpus_index, "iter_document_pages", failing_pages)
+    index = CorpusIndex(str(tmp_path / "idx.sqlite"))
+    stats = index.sync_directory(str(corpus))
+    assert stats["added"] == 1 and len(stats["errors"]) == 1
+    assert index.search("chat") == []
+    assert index.stats()["docs"] == 1
+
+    # Le fichier réparé est ré-indexé à la synchro suivante
+    monkeypatch.setattr(corpus_index, "iter_document_pages", real_iter)
+    assert index.sync_directory(str(corpus))["added"] == 1
+    assert index.search("chat")
+
+
+def test_term_ids_batches_large_queries(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus_index, "SQL_MAX_VARS", 3)
+    index = CorpusIndex(str(tmp_path / "idx.sqlite"))
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    (folder / "a.txt").write_text(" ".join(f"terme{i}" for i in range(10)), encoding="utf-8")
+    index.sync_directory(str(folder))
+    with index._lock:
+        ids = index._term_ids([f"terme{i}" for i in range(10)] + ["absent"])
+    assert len(ids) == 10
+
+
+def test_index_path_is_stable(tmp_path):
+    assert index_path_for("docs", str(tmp_path)) == index_path_for("./docs", str(tmp_path))
@@ -0,0 +1,109 @@
+"""Téléchargeur GGUF : plafond de bande passante partagé (seau à jetons)."""
+import hashlib
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("huggingface_hub")
+import download_gguf_models as downloader
+from download_gguf_models import BandwidthLimiter, _fmt_eta
+
+
+class FakeClock:
+    """Horloge simulée : `sleep` fait avancer `monotonic` sans attendre."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+        self.lock = threading.Lock()
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.slept += seconds
+            self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(downloader, "time", fake)
+    return fake
+
+
+def test_no_cap_never_waits(clock):
+    limiter = BandwidthLimiter(None)
+    for _ in range(100): limiter.consume(10 ** 9)
+    assert clock.slept == 0.0
+
+
+def test_empty_bucket_means_no_initial_burst(clock):
+    limiter = BandwidthLimiter(rate=1000)
+    limiter.consume(500)
+    assert clock.slept == pytest.approx(0.5)
+
+
+def test_sustained_rate_stays_under_cap(clock):
+    limiter = BandwidthLimiter(rate=4 * downloader.MB)
+    start, total = clock.now, 0
+    for _ in range(64):
+        limiter.consume(downloader.MB)
+        total += downloader.MB
+    assert total / (clock.now - start) <= 4 * downloader.MB * 1.001
+
+
+def test_idle_time_refills_at_most_one_second(clock):
+    limiter = BandwidthLimiter(rate=1000)
+    clock.now += 60  # Longue pause : le seau est plafonné à une seconde de débit
+    limiter.consume(1000)
+    assert clock.slept == 0.0
+    limiter.consume(1000)
+    assert clock.slept == pytest.approx(1.0)
+
+
+def test_limiter_is_shared_between_threads(clock):
+    limiter = BandwidthLimiter(rate=1000)
+    workers = [threading.Thread(target=lambda: [limiter.consume(100) for _ in range(10)]) for _ in range(4)]
+    for w in workers: w.start()
+    for w in workers: w.join()
+    # 4 000 octets à 1 000 o/s : au moins 4 s d'attente cumulée, quelle que soit la répartition
+    assert clock.slept >= 4.0 - 1e-9
+
+
+def test_fmt_eta():
+    assert _fmt_eta(None) == "--"
+    assert _fmt_eta(75) == "1m15s"
+    assert _fmt_eta(3725) == "1h02"
+
+
+@pytest.fixture
+def gguf(tmp_path):
+    from modules.model_integrity import HashManifest
+    (tmp_path / "m.gguf").write_bytes(b"GGUF" + b"\0" * 1000)
+    conf = {"repo_id": "org/repo", "filename": "m.gguf"}
+    return conf, str(tmp_path), HashManifest(str(tmp_path / "manifest.json"))
+
+
+def test_verify_uses_stored_expected_without_hub(gguf, monkeypatch):
+    conf, local_dir, manifest = gguf
+    hub_calls = []
+    digest = hashlib.sha256(open(os.path.join(local_dir, "m.gguf"), "rb").read()).hexdigest()
+    monkeypatch.setattr(downloader, "upstream_sha256", lambda *a: hub_calls.append(a) or digest)
+
+    rehashed = []
+    assert downloader.download_gguf_model("m", conf, local_dir, manifest=manifest, verify_only=True, rehashed_files=rehashed)
+    assert len(hub_calls) == 1 and len(rehashed) == 1  # Empreinte inconnue : Hub interrogé, fichier haché
+
+    rehashed.clear()
+    assert downloader.download_gguf_model("m", conf, local_dir, manifest=manifest, verify_only=True, rehashed_files=rehashed)
+    assert len(hub_calls) == 1 and rehashed == []  # Empreinte mémorisée, fichier inchangé : ni réseau ni relecture
+
+
+def test_verify_skips_absent_files_without_hub(gguf, monkeypatch):
+    conf, local_dir, manifest = gguf
+    monkeypatch.setattr(downloader, "upstream_sha256", lambda *a: pytest.fail("Hub interrogé"))
+    assert downloader.download_gguf_model("m", dict(conf, filename="absent.gguf"), local_dir,
+                                          manifest=manifest, verify_only=True) is None
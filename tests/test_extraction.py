@@ -0,0 +1,88 @@
+"""Extraction PDF : streaming par plage et cache page par page (une plage déjà lue n'est pas ré-extraite)."""
+import io
+from collections import OrderedDict
+
+import pytest
+
+from config.models_config import EXTRACTION_SETTINGS
+from modules import extraction
+
+
+@pytest.fixture
+def pdf_bytes():
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for _ in range(10):
+        writer.add_blank_page(width=200, height=200)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    """Extraction simulée ("texte N") qui enregistre chaque plage demandée ; cache isolé."""
+    monkeypatch.setitem(EXTRACTION_SETTINGS, "cache_dir", str(tmp_path / "pages"))
+    monkeypatch.setattr(extraction, "_MEMORY_CACHE", OrderedDict())
+    recorded = []
+
+    def fake_iter(path, first_page=1, last_page=None):
+        recorded.append((first_page, last_page))
+        for n in range(first_page, last_page + 1):
+            yield n, f"texte {n}"
+
+    monkeypatch.setattr(extraction, "iter_pdf_pages", fake_iter)
+    return recorded
+
+
+def test_plain_text_is_decoded():
+    assert extraction.extract_text_cached("déjà du texte".encode("utf-8"), "text/plain") == "déjà du texte"
+    assert extraction.extract_text_cached(b"\x00", "image/png") == ""
+
+
+def test_page_range_is_cached(pdf_bytes, calls):
+    first = list(extraction.iter_pages_cached(pdf_bytes, 3, 5))
+    assert first == [(3, "texte 3"), (4, "texte 4"), (5, "texte 5")]
+    assert extraction.is_cached(pdf_bytes, 3, 5)
+    assert not extraction.is_cached(pdf_bytes)
+    assert list(extraction.iter_pages_cached(pdf_bytes, 3, 5)) == first
+    assert calls == [(3, 5)]
+
+
+def test_only_missing_pages_are_extracted(pdf_bytes, calls):
+    list(extraction.iter_pages_cached(pdf_bytes, 3, 5))
+    pages = list(extraction.iter_pages_cached(pdf_bytes, 1, 7))
+    assert [n for n, _ in pages] == list(range(1, 8))
+    assert calls == [(3, 5), (1, 2), (6, 7)]
+    list(extraction.iter_pages_cached(pdf_bytes))
+    assert calls[-1] == (8, 10)
+    assert extraction.is_cached(pdf_bytes)
+
+
+def test_disk_cache_survives_memory_eviction(pdf_bytes, calls):
+    list(extraction.iter_pages_cached(pdf_bytes, 2, 4))
+    extraction._MEMORY_CACHE.clear()
+    assert extraction.pdf_page_count(pdf_bytes) == 10
+    assert list(extraction.iter_pages_cached(pdf_bytes, 2, 4))[0] == (2, "texte 2")
+    assert calls == [(2, 4)]
+
+
+def test_interrupted_read_keeps_extracted_pages(pdf_bytes, calls):
+    stream = extraction.iter_pages_cached(pdf_bytes, 1, 6)
+    next(stream), next(stream)
+    stream.close()
+    assert extraction.is_cached(pdf_bytes, 1, 2)
+    assert not extraction.is_cached(pdf_bytes, 1, 3)
+
+
+def test_full_text_is_assembled_from_cached_pages(pdf_bytes, calls):
+    text = extraction.extract_text_cached(pdf_bytes, "application/pdf")
+    assert text.splitlines() == [f"texte {n}" for n in range(1, 11)]
+    assert extraction.extract_text_cached(pdf_bytes, "application/pdf") == text
+    assert calls == [(1, 10)]
+
+
+def test_real_pdf_pages(pdf_bytes, tmp_path):
+    path = tmp_path / "blank.pdf"
+    path.write_bytes(pdf_bytes)
+    assert list(extraction.iter_pdf_pages(str(path), 9)) == [(9, ""), (10, "")]
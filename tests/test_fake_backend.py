@@ -0,0 +1,49 @@
+"""Backend synthétique : déterminisme et format des chunks compatibles llama.cpp."""
+import json
+
+from modules.fake_backend import SyntheticLlama, is_synthetic
+from modules.utils import run_completion
+
+MESSAGES = [{"role": "user", "content": "Explique la sobriété numérique"}]
+CONF = {"type": "local", "backend": "synthetic", "file": "synthetic://default", "ctx": 8192, "info": {}}
+
+
+def _llm(**kwargs):
+    return SyntheticLlama(**dict({"tps": 1e6, "ttft": 0, "output_tokens": 12}, **kwargs))
+
+
+def _text(llm, messages=MESSAGES, **kwargs):
+    return llm.create_chat_completion(messages=messages, **kwargs)["choices"][0]["message"]["content"]
+
+
+def test_is_synthetic():
+    assert is_synthetic(CONF)
+    assert not is_synthetic({"type": "local", "file": "x.gguf"})
+
+
+def test_output_depends_only_on_messages_and_seed():
+    llm = _llm()
+    assert _text(llm) == _text(_llm())
+    assert _text(llm, seed=1) != _text(llm, seed=2)
+    assert _text(llm) != _text(llm, messages=[{"role": "user", "content": "Autre question"}])
+
+
+def test_stream_shape_matches_llama_cpp():
+    chunks = list(_llm().create_chat_completion(messages=MESSAGES, stream=True, max_tokens=5))
+    assert chunks[0]["choices"][0]["delta"] == {"role": "assistant"}
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+    contents = [c["choices"][0]["delta"]["content"] for c in chunks[1:-1]]
+    assert len(contents) == 5 and contents[-1].endswith(".")
+    assert all(c["choices"][0]["logprobs"] is None for c in chunks)
+
+
+def test_json_system_prompt_returns_valid_json():
+    messages = [{"role": "system", "content": "Réponds en JSON"}] + MESSAGES
+    assert set(json.loads(_text(_llm(), messages=messages))) == {"result", "confidence"}
+
+
+def test_run_completion_accepts_synthetic_llm():
+    res = run_completion("local", CONF, _llm(), None, MESSAGES, track_energy=False)
+    assert res["error"] is None
+    assert res["text"] == _text(_llm(), max_tokens=1024, seed=None)
+    assert res["output_tokens"] > 0
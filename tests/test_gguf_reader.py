@@ -0,0 +1,92 @@
+"""Lecture des en-têtes GGUF et cache de métadonnées (mémoire + disque)."""
+import json
+import logging
+import os
+
+import pytest
+
+from conftest import write_gguf
+from modules import gguf_reader
+from modules.gguf_reader import deferred_writes, estimate_ram_gb, get_gguf_metadata, kv_cache_gb, read_gguf_metadata
+
+
+def test_header_summary(tmp_path):
+    meta = read_gguf_metadata(write_gguf(tmp_path / "tiny.gguf", vocab=1000))
+    assert meta["gguf_version"] == 3
+    assert (meta["arch"], meta["name"], meta["quant"], meta["tokenizer"]) == ("llama", "Tiny", "Q4_K_M", "gpt2")
+    assert (meta["layers"], meta["embedding"], meta["heads"], meta["kv_heads"]) == (16, 2048, 32, 8)
+    assert meta["head_dim"] == 64 and meta["ctx_train"] == 131072
+    # Au-delà de _MAX_ARRAY_ITEMS, le vocabulaire n'est pas conservé : seule sa longueur l'est
+    assert meta["vocab_size"] == 1000
+    assert meta["n_tensors"] == 2
+    assert meta["params_b"] == round((2048 * 1000 + 2048 * 2048) / 1e9, 3)
+
+
+def test_small_arrays_are_kept(tmp_path):
+    assert read_gguf_metadata(write_gguf(tmp_path / "small.gguf", vocab=10))["vocab_size"] == 10
+
+
+def test_rejects_non_gguf_and_truncated(tmp_path):
+    bad = tmp_path / "bad.gguf"
+    bad.write_bytes(b"NOPE" + b"\0" * 64)
+    with pytest.raises(ValueError):
+        read_gguf_metadata(str(bad))
+    truncated = tmp_path / "truncated.gguf"
+    truncated.write_bytes(open(write_gguf(tmp_path / "full.gguf"), "rb").read()[:200])
+    with pytest.raises(ValueError):
+        read_gguf_metadata(str(truncated))
+
+
+def test_kv_cache_and_ram(tmp_path):
+    meta = read_gguf_metadata(write_gguf(tmp_path / "tiny.gguf"))
+    # 2 (K+V) x 16 couches x 8 têtes KV x 64 dims x 2 octets par token
+    assert kv_cache_gb(meta, 4096) == pytest.approx(2 * 16 * 8 * 64 * 2 * 4096 / 1024 ** 3)
+    assert estimate_ram_gb(meta, 4096) > kv_cache_gb(meta, 4096)
+    assert kv_cache_gb(None, 4096) == 0.0
+
+
+def test_cache_invalidated_when_file_changes(tmp_path, gguf_cache):
+    path = write_gguf(tmp_path / "m.gguf", layers=16)
+    assert get_gguf_metadata(path)["layers"] == 16
+    write_gguf(path, layers=24, vocab=1001)  # Taille différente → signature différente
+    assert get_gguf_metadata(path)["layers"] == 24
+
+
+def test_disk_cache_read_once_and_written_once_per_batch(tmp_path, gguf_cache, monkeypatch):
+    paths = [write_gguf(tmp_path / f"m{i}.gguf") for i in range(3)]
+    loads, saves = [], []
+    real_load, real_save = gguf_reader._load_disk_cache, gguf_reader._save_disk_cache
+    monkeypatch.setattr(gguf_reader, "_load_disk_cache", lambda: loads.append(1) or real_load())
+    monkeypatch.setattr(gguf_reader, "_save_disk_cache", lambda entries: saves.append(1) or real_save(entries))
+
+    with deferred_writes():
+        for path in paths: get_gguf_metadata(path)
+    assert (len(loads), len(saves)) == (1, 1)
+    assert set(json.loads(gguf_cache.read_text())["entries"]) == {os.path.abspath(p) for p in paths}
+
+    # Nouveau processus simulé : mémoire vide, le disque suffit (aucune réécriture)
+    monkeypatch.setattr(gguf_reader, "_MEMO", {})
+    monkeypatch.setattr(gguf_reader, "_DISK", None)
+    monkeypatch.setattr(gguf_reader, "read_gguf_metadata", lambda path: pytest.fail("en-tête relu"))
+    assert get_gguf_metadata(paths[0])["arch"] == "llama"
+    assert (len(loads), len(saves)) == (2, 1)
+
+
+def test_unreadable_file_warns_once(tmp_path, gguf_cache, caplog):
+    bad = tmp_path / "bad.gguf"
+    bad.write_bytes(b"NOPE" + b"\0" * 64)
+    with caplog.at_level(logging.WARNING, logger="modules.gguf_reader"):
+        assert get_gguf_metadata(str(bad)) is None
+        assert get_gguf_metadata(str(bad)) is None
+    assert len(caplog.records) == 1
+    assert get_gguf_metadata(str(tmp_path / "absent.gguf")) is None
+    assert get_gguf_metadata("synthetic://tiny") is None
+
+
+def test_model_memory_prefers_header(tmp_path, gguf_cache):
+    from modules.utils import model_memory
+    conf = {"type": "local", "file": write_gguf(tmp_path / "m.gguf"), "ctx": 4096, "info": {"disk": 9.0, "ram": 12.0}}
+    weights, ram = model_memory(conf)
+    assert weights == pytest.approx(os.path.getsize(conf["file"]) / 1024 ** 3)
+    assert ram == pytest.approx(estimate_ram_gb(get_gguf_metadata(conf["file"]), 4096))
+    assert model_memory(dict(conf, file=str(tmp_path / "absent.gguf"))) == (9.0, 12.0)
@@ -0,0 +1,89 @@
+"""Interpréteur IoT : grammaire, gabarits numériques et cache de commandes appris."""
+import pytest
+
+from modules.iot_router import IotRouter, extract_numbers, normalize, parse_llm_json, parse_with_grammar
+
+NS = IotRouter.namespace("Réponds en JSON")
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("Allume la lumière de la cuisine !", {"device": "light", "action": "on", "room": "cuisine", "params": {}}),
+    ("Éteins la télé", {"device": "tv", "action": "off", "room": None, "params": {}}),
+    ("Règle la clim du salon à 21 °C", {"device": "ac", "action": "set", "room": "salon", "params": {"temperature": 21}}),
+    ("Règle la clim du salon à 21°", {"device": "ac", "action": "set", "room": "salon", "params": {"temperature": 21}}),
+    ("mets le chauffage à 19,5 degrés", {"device": "heater", "action": "set", "room": None, "params": {"temperature": 19.5}}),
+    ("Monte les volets de la chambre à 40 %", {"device": "shutter", "action": "set", "room": "chambre", "params": {"level": 40}}),
+    ("Mets en marche le ventilateur de la salle de bain", {"device": "fan", "action": "on", "room": "salle de bain", "params": {}}),
+])
+def test_grammar(command, expected):
+    assert parse_with_grammar(command) == expected
+
+
+@pytest.mark.parametrize("command", ["Mets la clim", "fais un café", "le salon est froid"])
+def test_grammar_rejects_incomplete_commands(command):
+    assert parse_with_grammar(command) is None
+
+
+@pytest.mark.parametrize("command", [
+    "N'allume pas la lumière du salon",                  # Négation
+    "Ne coupe jamais le chauffage de la chambre",
+    "Allume la lumière du salon et éteins la clim",      # Deux actions, deux appareils
+    "Allume la lumière et la télé",
+    "Allume la lumière du salon et de la cuisine",       # Deux pièces
+    "Éteins la clim, il fait 19°",                       # Seconde proposition
+    "Éteins le chauffage à 19°",                         # Valeur incompatible avec « éteindre »
+    "Baisse le chauffage de 2°",                         # Variation relative
+    "Monte un peu les volets du bureau",
+])
+def test_grammar_defers_ambiguous_commands_to_llm(command):
+    assert parse_with_grammar(command) is None
+
+
+def test_normalize_and_numbers():
+    assert normalize("  Règle   l’Éclairage !") == "regle l'eclairage"
+    assert extract_numbers("Volet à 40 %, clim à 21,5 °C") == [40, 21.5]
+    assert extract_numbers("Allume tout") == []
+
+
+def test_parse_llm_json():
+    assert parse_llm_json('```json\n{"device": "tv"}\n```') == {"device": "tv"}
+    assert parse_llm_json('Voici : {"a": 1} !') == {"a": 1}
+    assert parse_llm_json("pas de JSON") is None
+    assert parse_llm_json("[1, 2]") is None
+
+
+def test_learned_template_fills_new_numbers(tmp_path):
+    router = IotRouter(str(tmp_path / "iot.sqlite"))
+    command = "Passe le thermostat de l'étage à 22 pour la nuit"
+    assert router.resolve(command, NS)[0] is None
+    router.learn(command, NS, '{"device": "thermostat", "action": "set", "params": {"temperature": 22}}')
+
+    level, payload, _ = router.resolve("passe le thermostat de l'etage a 18 pour la nuit", NS)
+    assert level == "cache"
+    assert payload["params"]["temperature"] == 18
+    assert router.stats() == {"entries": 1, "hits": 1}
+    # Autre prompt système : autre espace, pas de correspondance
+    assert router.resolve(command, IotRouter.namespace("autre"))[0] is None
+
+
+def test_ambiguous_numbers_stay_literal(tmp_path):
+    router = IotRouter(str(tmp_path / "iot.sqlite"))
+    router.learn("programme 2 cycles de 2 heures", NS, '{"cycles": 2, "hours": 2}')
+    # Valeur présente deux fois dans la commande : pas d'emplacement, la valeur apprise est rejouée
+    _, payload, _ = router.resolve("programme 3 cycles de 4 heures", NS)
+    assert payload == {"cycles": 2, "hours": 2}
+
+
+def test_invalid_llm_output_is_not_learned(tmp_path):
+    router = IotRouter(str(tmp_path / "iot.sqlite"))
+    assert router.learn("fais quelque chose", NS, "Je ne sais pas") is None
+    assert router.stats()["entries"] == 0
+
+
+def test_cache_is_bounded_lru(tmp_path):
+    router = IotRouter(str(tmp_path / "iot.sqlite"), max_entries=2)
+    for word in ("alpha", "beta", "gamma"):
+        router.learn(f"active le mode {word}", NS, f'{{"mode": "{word}"}}')
+    assert router.stats()["entries"] == 2
+    assert router.resolve("active le mode alpha", NS, use_grammar=False)[0] is None
+    assert router.resolve("active le mode gamma", NS, use_grammar=False)[0] == "cache"
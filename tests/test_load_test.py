@@ -0,0 +1,50 @@
+"""Test de charge : lecture du protocole, mélange d'onglets et agrégation des mesures."""
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def load_test(monkeypatch):
+    # Le module active le backend synthétique à l'import : on n'en laisse pas fuir la variable
+    monkeypatch.setenv("WORKBENCH_SYNTHETIC", "1")
+    return importlib.import_module("benchmarks.load_test")
+
+
+def test_protocol_prompts_cover_every_tab(load_test):
+    prompts = load_test.load_protocol_prompts()
+    assert [task for task, _ in prompts["ops"]] == ["ops_triage", "ops_pii"]
+    assert len(prompts["rag"]) == 1 and prompts["rag"][0][1].startswith("CTX:\n")
+    assert prompts["chat"] and all(task == "chat" for task, _ in prompts["chat"])
+
+
+def test_parse_mix_weights_tabs(load_test):
+    prompts = {"chat": [("chat", "q")], "ops": [("ops_triage", "mail")], "rag": []}
+    assert load_test.parse_mix("chat=2, ops", prompts) == ["chat", "chat", "ops"]
+    with pytest.raises(SystemExit):
+        load_test.parse_mix("rag=1", prompts)
+
+
+def test_summarize_ignores_errors_in_percentiles(load_test):
+    records = [
+        {"error": None, "latency": 1.0, "queue_s": 0.0, "ttft": 0.1, "output_tokens": 10},
+        {"error": None, "latency": 3.0, "queue_s": 0.5, "ttft": 0.6, "output_tokens": 30},
+        {"error": "boom", "latency": 99.0, "queue_s": None, "ttft": None, "output_tokens": 0},
+    ]
+    row = load_test.summarize(2, records, wall=2.0, rss_start=0, rss_end=1024 ** 2)
+    assert (row["Requêtes"], row["Erreurs"]) == (3, 1)
+    assert row["Débit (req/s)"] == 1.0 and row["Débit (tok/s)"] == 20.0
+    assert row["Latence p95 (s)"] == 3.0
+    assert row["_errors"] == [("boom", 1)]
+
+
+def test_run_level_with_engine_users(load_test):
+    from modules.fake_backend import SyntheticLlama
+    conf = {"type": "local", "backend": "synthetic", "file": "synthetic://default", "ctx": 8192, "info": {}}
+    gen_kwargs = {"model_type": "local", "model_conf": conf, "llm_local": SyntheticLlama(tps=1e6, ttft=0, output_tokens=8),
+                  "api_key": None, "max_tokens": 64}
+    prompts = {"chat": [("chat", "Bonjour")], "ops": [("ops_triage", "Mon colis est en retard")]}
+    row = load_test.run_level(2, lambda: load_test.EngineUser(gen_kwargs), ["chat", "ops"], prompts,
+                              think=0.0, duration=0.2, seed=0)
+    assert row["Utilisateurs"] == 2 and row["Requêtes"] > 0 and row["Erreurs"] == 0
+    assert row["Débit (tok/s)"] > 0
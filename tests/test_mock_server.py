@@ -0,0 +1,71 @@
+"""Serveur Mistral simulé : flux SSE, usage, injection d'erreurs et reprise par le client mutualisé."""
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scripts.mock_mistral_server import start_server
+
+BODY = {"model": "mock-small", "messages": [{"role": "user", "content": "Bonjour"}], "max_tokens": 5}
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def _start(**settings):
+        server, url, state = start_server(**dict({"tps": 1e4, "ttft": 0.0}, **settings))
+        servers.append(server)
+        return url, state
+
+    yield _start
+    for server in servers: server.shutdown()
+
+
+def _post(url, payload):
+    req = urllib.request.Request(f"{url}/v1/chat/completions", data=json.dumps(payload).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    return urllib.request.urlopen(req, timeout=5)
+
+
+def test_stream_sends_one_event_per_token_then_done(mock_server):
+    url, state = mock_server()
+    with _post(url, dict(BODY, stream=True)) as resp:
+        events = [line[len("data: "):] for line in resp.read().decode("utf-8").splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(e) for e in events[:-1]]
+    assert len(chunks) == 5
+    assert chunks[-1]["usage"]["completion_tokens"] == 5 and "usage" not in chunks[0]
+    assert state.stats["streams"] == 1 and state.stats["tokens"] == 5
+
+
+def test_full_response_includes_usage(mock_server):
+    url, _ = mock_server()
+    with _post(url, BODY) as resp:
+        payload = json.load(resp)
+    assert payload["usage"]["completion_tokens"] == 5
+    assert len(payload["choices"][0]["message"]["content"].split()) == 5
+
+
+def test_injected_429_carries_retry_after(mock_server):
+    url, state = mock_server(error_rate=1.0, error_status=429, retry_after=0.25)
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _post(url, BODY)
+    assert err.value.code == 429 and err.value.headers["Retry-After"] == "0.25"
+    assert state.stats["errors_injected"] == 1
+
+
+def test_pool_retries_against_mock(mock_server):
+    pytest.importorskip("httpx")
+    pytest.importorskip("mistralai")
+    from modules.api_client import ApiClientPool
+
+    url, state = mock_server(error_rate=0.5, error_status=503)
+    pool = ApiClientPool(server_url=url, settings={"backoff_base_s": 0.01, "max_retries": 10})
+    deltas = []
+    for _ in range(4):
+        usage = pool.stream_chat("cle", deltas.append, model="mock-small", messages=BODY["messages"], max_tokens=5)
+        assert usage[1] == 5
+    assert pool.metrics["retries"] == state.stats["errors_injected"]
+    assert state.stats["streams"] == 4
@@ -0,0 +1,84 @@
+"""Intégrité des GGUF : SHA-256 en streaming et manifeste (revérification sans relecture)."""
+import hashlib
+import json
+import os
+
+import pytest
+
+from modules import model_integrity
+from modules.model_integrity import (
+    MISMATCH, MISSING, OK, UNVERIFIED, HashManifest, sha256_stream, status_of, verify_file,
+)
+
+DATA = os.urandom(300_000)
+DIGEST = hashlib.sha256(DATA).hexdigest()
+
+
+@pytest.fixture
+def model(tmp_path):
+    path = tmp_path / "model.gguf"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return HashManifest(str(tmp_path / "manifest.json"))
+
+
+def test_sha256_stream_matches_hashlib(model):
+    assert sha256_stream(model, chunk_size=4096).hexdigest() == DIGEST
+    assert sha256_stream(model, chunk_size=4096, limit=1000).hexdigest() == hashlib.sha256(DATA[:1000]).hexdigest()
+    # Poursuite d'un hachage déjà commencé
+    prefix = hashlib.sha256(b"entete")
+    assert sha256_stream(model, hasher=prefix).hexdigest() == hashlib.sha256(b"entete" + DATA).hexdigest()
+
+
+def test_statuses(model, manifest):
+    assert verify_file(model, manifest, expected=DIGEST)[0] == OK
+    assert status_of({"sha256": "a", "expected": "b"}) == MISMATCH
+    assert status_of({"sha256": "a", "expected": None}) == UNVERIFIED
+    assert verify_file(model + ".absent", manifest) == (MISSING, None, False)
+
+
+def test_unchanged_file_is_not_rehashed(model, manifest, monkeypatch):
+    status, sha, rehashed = verify_file(model, manifest, expected=DIGEST)
+    assert (status, sha, rehashed) == (OK, DIGEST, True)
+    monkeypatch.setattr(model_integrity, "sha256_stream", lambda *a, **k: pytest.fail("fichier relu"))
+    # Empreinte attendue mémorisée : la revérification fonctionne hors ligne
+    assert verify_file(model, manifest) == (OK, DIGEST, False)
+
+
+def test_modified_file_is_rehashed_and_flagged(model, manifest):
+    verify_file(model, manifest, expected=DIGEST)
+    with open(model, "r+b") as f:
+        f.write(b"\xff" * 16)
+    st = os.stat(model)
+    os.utime(model, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))  # Horodatage grossier de certains FS
+    status, sha, rehashed = verify_file(model, manifest)
+    assert rehashed and sha != DIGEST and status == MISMATCH
+
+
+def test_manifest_persists_and_forgets(model, manifest, tmp_path):
+    manifest.record(model, DIGEST, expected=DIGEST)
+    reloaded = HashManifest(manifest.path)
+    entry = reloaded.lookup(model)
+    assert entry["sha256"] == DIGEST and entry["expected"] == DIGEST
+    assert isinstance(entry["checked_at"], float)
+    reloaded.forget(model)
+    assert HashManifest(manifest.path).lookup(model) is None
+    assert HashManifest(manifest.path).expected(model) is None
+
+
+def test_record_keeps_known_expected(model, manifest):
+    manifest.record(model, DIGEST, expected=DIGEST)
+    manifest.record(model, "autre")
+    assert manifest.expected(model) == DIGEST
+
+
+def test_corrupt_or_outdated_manifest_starts_empty(tmp_path, model):
+    path = tmp_path / "manifest.json"
+    path.write_text("{pas du json", encoding="utf-8")
+    assert HashManifest(str(path)).entries == {}
+    path.write_text(json.dumps({"version": 0, "files": {"model.gguf": {}}}), encoding="utf-8")
+    assert HashManifest(str(path)).entries == {}
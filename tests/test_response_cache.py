@@ -0,0 +1,60 @@
+"""Cache exact des réponses : clés, déterminisme et éviction LRU bornée en taille."""
+from modules.response_cache import ResponseCache, is_deterministic, make_key, model_identity
+
+LOCAL = {"type": "local", "file": "models_gguf/qwen.gguf"}
+API = {"type": "api", "api_id": "mistral-small-latest"}
+MESSAGES = [{"role": "user", "content": "Bonjour"}]
+
+
+def _result(text):
+    return {"text": text, "input_tokens": 3, "output_tokens": 4, "duration": 1.5, "ttft": 0.2}
+
+
+def test_deterministic_requests_only():
+    assert is_deterministic(0, None)
+    assert is_deterministic(0.7, 42)
+    assert not is_deterministic(0.7, None)
+
+
+def test_model_identity():
+    assert model_identity(LOCAL) == "local:qwen.gguf"
+    assert model_identity(API) == "api:mistral-small-latest"
+    cascade = {"type": "cascade", "tiers": [{"conf": LOCAL}, {"conf": API}]}
+    assert model_identity(cascade) == "cascade:local:qwen.gguf>api:mistral-small-latest"
+
+
+def test_key_depends_on_model_messages_and_sampling():
+    key = make_key(LOCAL, MESSAGES, temperature=0, seed=None)
+    assert key == make_key(dict(LOCAL), [dict(MESSAGES[0])], seed=None, temperature=0)
+    assert key != make_key(API, MESSAGES, temperature=0, seed=None)
+    assert key != make_key(LOCAL, [{"role": "user", "content": "Bonsoir"}], temperature=0, seed=None)
+    assert key != make_key(LOCAL, MESSAGES, temperature=0, seed=1)
+
+
+def test_put_get_roundtrip_and_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    assert cache.get("absent") is None
+    cache.put("k", "local:qwen.gguf", _result("Salut"))
+    entry = cache.get("k")
+    assert entry["text"] == "Salut" and entry["output_tokens"] == 4 and entry["duration"] == 1.5
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    # Chaque entrée pèse ~1 Ko (+ 256 o de surcoût) : le plafond de 3 Ko en garde deux
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_mb=3 / 1024)
+    cache.put("a", "m", _result("a" * 1024))
+    cache.put("b", "m", _result("b" * 1024))
+    cache.get("a")  # "a" redevient la plus récente
+    cache.put("c", "m", _result("c" * 1024))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["size_mb"] * 1024 * 1024 <= cache.max_bytes
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path).put("k", "m", _result("Persistant"))
+    assert ResponseCache(path).get("k")["text"] == "Persistant"
@@ -0,0 +1,88 @@
+"""Cache sémantique : similarité, étiquettes numériques et bornes (entrées, espaces de noms)."""
+import zlib
+
+import numpy as np
+
+from modules.iot_router import extract_numbers
+from modules.semantic_cache import SemanticCache, namespace_key
+
+
+def _embed(text):
+    """Sac de mots sans les chiffres : deux commandes qui ne diffèrent que par un nombre sont identiques."""
+    vec = np.zeros(64, dtype=np.float32)
+    for word in text.lower().split():
+        if not any(c.isdigit() for c in word):
+            vec[zlib.crc32(word.encode()) % 64] += 1.0
+    return vec
+
+
+def _entry(text):
+    return {"text": text, "input_tokens": 10, "output_tokens": 5, "duration": 1.0}
+
+
+def _store(cache, ns, query, text):
+    _, _, vec = cache.lookup(ns, query, tag=tuple(extract_numbers(query)))
+    cache.add(ns, vec, _entry(text), tag=tuple(extract_numbers(query)))
+
+
+def test_paraphrase_hits():
+    cache = SemanticCache(_embed, threshold=0.9)
+    ns = namespace_key("m", "chat", "sys")
+    _store(cache, ns, "quelle est la capitale de la France", "Paris")
+    entry, similarity, _ = cache.lookup(ns, "Quelle est la capitale de la France", tag=())
+    assert entry["text"] == "Paris" and similarity > 0.99
+    assert cache.stats()["hits"] == 1 and cache.stats()["saved_s"] > 0
+
+
+def test_distant_query_is_a_miss():
+    cache = SemanticCache(_embed, threshold=0.9)
+    ns = namespace_key("m", "chat", "sys")
+    _store(cache, ns, "quelle est la capitale de la France", "Paris")
+    entry, similarity, _ = cache.lookup(ns, "donne une recette de crêpes")
+    assert entry is None and similarity < cache.threshold
+
+
+def test_namespaces_are_isolated():
+    cache = SemanticCache(_embed, threshold=0.9)
+    _store(cache, namespace_key("m", "chat", "sys"), "bonjour", "Salut")
+    assert namespace_key("m", "chat", "sys") != namespace_key("m", "chat", "autre prompt")
+    entry, _, _ = cache.lookup(namespace_key("m", "chat", "autre prompt"), "bonjour", tag=())
+    assert entry is None
+
+
+def test_entries_are_bounded_per_namespace():
+    cache = SemanticCache(_embed, threshold=0.9, max_entries=2)
+    for word in ("lumière", "volet", "chauffage"):
+        _store(cache, "ns", f"allume le {word}", word)
+    assert cache.stats()["entries"] == 2
+    entry, _, _ = cache.lookup("ns", "allume le chauffage", tag=())
+    assert entry["text"] == "chauffage"
+
+
+def test_number_mismatch_is_a_miss():
+    cache = SemanticCache(_embed, threshold=0.9)
+    ns = namespace_key("m", "iot", "sys")
+    _store(cache, ns, "règle le chauffage du salon à 21 degrés", '{"temperature": 21}')
+    query = "règle le chauffage du salon à 19 degrés"
+    entry, similarity, _ = cache.lookup(ns, query, tag=tuple(extract_numbers(query)))
+    assert entry is None and similarity < cache.threshold
+
+
+def test_same_numbers_hit():
+    cache = SemanticCache(_embed, threshold=0.9)
+    ns = namespace_key("m", "iot", "sys")
+    _store(cache, ns, "règle le chauffage du salon à 21 degrés", '{"temperature": 21}')
+    query = "Règle le chauffage du salon à 21 degrés"
+    entry, similarity, _ = cache.lookup(ns, query, tag=tuple(extract_numbers(query)))
+    assert entry["text"] == '{"temperature": 21}'
+    assert similarity > 0.99
+
+
+def test_namespaces_are_bounded_lru():
+    cache = SemanticCache(_embed, threshold=0.9, max_namespaces=2)
+    _store(cache, "a", "allume la lumière", "A")
+    _store(cache, "b", "allume la lumière", "B")
+    cache.lookup("a", "allume la lumière")  # "a" redevient le plus récent
+    _store(cache, "c", "allume la lumière", "C")
+    assert set(cache._spaces) == {"a", "c"}
+    assert cache.stats()["namespaces"] == 2
@@ -0,0 +1,22 @@
+"""Démarrage : l'import des modules de l'application ne charge aucune bibliothèque lourde."""
+import json
+import subprocess
+import sys
+
+from conftest import ROOT
+
+HEAVY_LIBS = ["pandas", "numpy", "pypdf", "codecarbon", "llama_cpp", "mistralai", "httpx", "psutil"]
+
+
+def _loaded_after(imports):
+    code = f"{imports}; import sys, json; print(json.dumps([m for m in {HEAVY_LIBS!r} if m in sys.modules]))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_app_modules_import_no_heavy_library():
+    assert _loaded_after("import modules.views, modules.utils, modules.cascade, modules.comparison") == []
+
+
+def test_optional_flags_do_not_import():
+    assert _loaded_after("from modules.optional_deps import HAS_LOCAL_LIB, HAS_MISTRAL_LIB, HAS_CODECARBON") == []
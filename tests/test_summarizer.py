@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from modules import summarizer
+from modules.utils import count_tokens_approx
+
+API_CONF = {"type": "api", "ctx": 4096}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """`run_completion` factice : chaque appel renvoie un résumé d'environ 1000 tokens."""
+    seen, lock = [], threading.Lock()
+
+    def fake_run_completion(messages, **kwargs):
+        prompt = messages[-1]["content"]
+        with lock:
+            seen.append(prompt)
+            n = len(seen)
+        text = f"resume {n} " + "x" * 2700
+        return {"text": text, "error": None, "input_tokens": count_tokens_approx(prompt),
+                "output_tokens": count_tokens_approx(text), "energy_kwh": 0.001, "co2_g": 0.1, "queue_s": 0.0}
+
+    monkeypatch.setattr(summarizer, "run_completion", fake_run_completion)
+    return seen
+
+
+def _kwargs():
+    return {"model_type": "api", "model_conf": API_CONF, "max_tokens": 1024}
+
+
+def _document(n_paragraphs=12):
+    return "\n\n".join(f"Paragraphe {i}. " + "mot " * 2000 for i in range(n_paragraphs))
+
+
+def test_group_to_budget_keeps_order_and_budget():
+    texts = ["a" * 270, "b" * 270, "c" * 270, "d" * 270]  # 100 tokens chacun
+    groups = summarizer._group_to_budget(texts, 250)
+    assert groups == [texts[:2], texts[2:]]
+
+
+def test_hierarchical_reduce_fits_context(calls):
+    budget = summarizer.chunk_budget(API_CONF, "sys", "Résume")
+    job = summarizer.map_reduce_summarize(_document(), "Résume", "sys", _kwargs())
+
+    assert job["error"] is None
+    assert job["n_chunks"] > 4
+    # Les résumés partiels ne tiennent pas en un appel : au moins un niveau intermédiaire
+    assert job["levels"] >= 2
+    assert job["n_calls"] == len(calls)
+    assert all(count_tokens_approx(p) <= budget + summarizer.PROMPT_MARGIN_TOKENS for p in calls)
+    assert job["text"].startswith(f"resume {len(calls)} ")
+
+
+def test_short_document_single_reduce(calls):
+    job = summarizer.map_reduce_summarize("Un court paragraphe.", "Résume", "sys", _kwargs())
+    assert (job["n_chunks"], job["levels"], job["n_calls"]) == (1, 1, 2)
+
+
+def test_error_is_reported(monkeypatch):
+    def failing(messages, **kwargs):
+        return {"text": "", "error": "quota dépassé"}
+
+    monkeypatch.setattr(summarizer, "run_completion", failing)
+    job = summarizer.map_reduce_summarize(_document(2), "Résume", "sys", _kwargs())
+    assert job["error"] == "quota dépassé"
+    assert job["n_calls"] == 0
+
+
+def test_small_context_pairs_fit_final_budget(monkeypatch):
+    """Contexte étroit : les résumés sont plafonnés pour que chaque fusion tienne dans le contexte."""
+    conf = {"type": "api", "ctx": 1536}
+    seen = []
+
+    def fake_run_completion(messages, max_tokens, **kwargs):
+        seen.append((messages[-1]["content"], max_tokens))
+        text = "y" * int(min(max_tokens, 1000) * 2.7)
+        return {"text": text, "error": None, "input_tokens": 0, "output_tokens": 0,
+                "energy_kwh": 0.0, "co2_g": 0.0, "queue_s": 0.0}
+
+    monkeypatch.setattr(summarizer, "run_completion", fake_run_completion)
+    kwargs = {"model_type": "api", "model_conf": conf, "max_tokens": 1024}
+    job = summarizer.map_reduce_summarize(_document(6), "Résume", "sys", kwargs)
+
+    assert job["error"] is None
+    assert job["levels"] >= 2
+    assert all(count_tokens_approx(p) + m <= conf["ctx"] for p, m in seen)
+
+
+def test_reduce_levels_are_bounded(monkeypatch):
+    """Un modèle qui ignore `max_tokens` ne fait pas tourner la réduction indéfiniment."""
+    def verbose(messages, **kwargs):
+        return {"text": "z " * 5000, "error": None, "input_tokens": 0, "output_tokens": 0,
+                "energy_kwh": 0.0, "co2_g": 0.0, "queue_s": 0.0}
+
+    monkeypatch.setattr(summarizer, "run_completion", verbose)
+    job = summarizer.map_reduce_summarize(_document(4), "Résume", "sys", _kwargs())
+    assert "non convergente" in job["error"]
+    assert job["levels"] == summarizer.MAX_REDUCE_LEVELS
@@ -0,0 +1,63 @@
+"""Traduction : segmentation réversible, lots numérotés et affichage au fil de l'eau."""
+from modules import translation
+from modules.translation import TranslationMemory, parse_numbered, segment_text, translate_with_memory, _batches
+
+API_CONF = {"type": "api", "api_id": "test", "ctx": 32768, "info": {}}
+
+
+def test_segment_text_roundtrip():
+    text = "Bonjour.  Comment vas-tu ?\n\nTrès bien !\n  Merci: au revoir"
+    segments = segment_text(text)
+    assert "".join(seg + sep for seg, sep in segments) == text
+    assert [seg for seg, _ in segments] == ["Bonjour.", "Comment vas-tu ?", "Très bien !", "Merci:", "au revoir"]
+
+
+def test_segment_text_leading_blank():
+    segments = segment_text("\n\nTitre\nCorps.")
+    assert segments[0] == ("", "\n\n")
+    assert "".join(seg + sep for seg, sep in segments) == "\n\nTitre\nCorps."
+
+
+def test_parse_numbered_ignores_noise_and_out_of_range():
+    output = "Voici :\n[1] Hello\n  [2]World\n[3] extra\n[x] nope"
+    assert parse_numbered(output, 2) == {1: "Hello", 2: "World"}
+
+
+def test_batches_respect_budget():
+    segments = [f"phrase numéro {i} " * 5 for i in range(20)]
+    batches = _batches(segments, 60)
+    assert [s for b in batches for s in b] == segments
+    assert len(batches) > 1
+
+
+def _fake_run_completion(messages, on_update=None, **_kwargs):
+    """Traduit "[n] x" en "[n] X" et streame ligne par ligne."""
+    lines = [line.upper() for line in messages[-1]["content"].splitlines()]
+    for i in range(1, len(lines) + 1):
+        if on_update: on_update("\n".join(lines[:i]))
+    return {"text": "\n".join(lines), "error": None, "input_tokens": 1, "output_tokens": 1,
+            "energy_kwh": 0.0, "co2_g": 0.0, "queue_s": 0.0, "ttft": 0.0, "duration": 0.0}
+
+
+def test_partial_updates_keep_earlier_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation, "run_completion", _fake_run_completion)
+    monkeypatch.setattr(translation, "_batches", lambda segments, budget: [[s] for s in segments])
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    updates = []
+    gen_kwargs = {"model_type": "api", "model_conf": API_CONF, "llm_local": None, "api_key": "k"}
+    job = translate_with_memory("un. deux. trois.", "en", "sys", gen_kwargs, tm, on_update=updates.append)
+
+    assert job["text"] == "UN. DEUX. TROIS."
+    # Une fois traduit, un segment ne redevient jamais "…" pendant les lots suivants
+    assert all("UN." in u for u in updates[updates.index("UN. … …"):])
+    assert "UN. DEUX. …" in updates
+
+
+def test_translation_memory_serves_known_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation, "run_completion", _fake_run_completion)
+    tm = TranslationMemory(str(tmp_path / "tm.sqlite"))
+    gen_kwargs = {"model_type": "api", "model_conf": API_CONF, "llm_local": None, "api_key": "k"}
+    translate_with_memory("un. deux.", "en", "sys", gen_kwargs, tm)
+    job = translate_with_memory("deux. un.", "en", "sys", gen_kwargs, tm)
+    assert job["text"] == "DEUX. UN."
+    assert job["tm_hits"] == 2 and job["translated"] == 0